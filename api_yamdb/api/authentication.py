@@ -0,0 +1,139 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from api.cache import VERSION_KEY, bump_version, get_versions
+
+USER_KEY = 'api:auth-user:{}'
+USERS_TABLE = 'user'
+# Всё, что нужно аутентификации и правам доступа; пароль, код
+# подтверждения и профиль в кэш не попадают.
+USER_FIELDS = (
+    'id', 'username', 'role', 'is_active', 'is_staff', 'is_superuser'
+)
+
+
+class TokenCache:
+    """
+    LRU-кэш проверенных токенов процесса с ограничением времени жизни.
+
+    Ключ — SHA-256 токена: сами токены в памяти не хранятся. Запись
+    живёт не дольше AUTH_TOKEN_CACHE_TIMEOUT и не дольше срока
+    действия токена; сверх AUTH_TOKEN_CACHE_SIZE вытесняются давно
+    не использованные записи.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            token, expires = item
+            if expires <= time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return token
+
+    def set(self, key, token, timeout):
+        if timeout <= 0:
+            return
+        with self.lock:
+            self.items[key] = (token, time.monotonic() + timeout)
+            self.items.move_to_end(key)
+            while len(self.items) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+token_cache = TokenCache()
+
+
+def forget_user(user_id):
+    """Удаляет пользователя из кэша аутентификации."""
+    cache.delete(USER_KEY.format(user_id))
+
+
+def forget_users():
+    """Сбрасывает кэш аутентификации целиком: после update() и импорта."""
+    bump_version(USERS_TABLE)
+
+
+def restore_user(data):
+    """Пользователь из полей USER_FIELDS, остальные поля отложены."""
+    model = get_user_model()
+    names = [
+        field.attname for field in model._meta.concrete_fields
+        if field.attname in data
+    ]
+    return model.from_db(
+        DEFAULT_DB_ALIAS, names, [data[name] for name in names]
+    )
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication без повторной проверки подписи и SELECT
+    пользователя на каждый запрос.
+
+    Проверенные токены кэшируются в процессе (TokenCache), пользователи —
+    в общем кэше по id, только поля USER_FIELDS. Из кэша собирается
+    экземпляр User с отложенными остальными полями: обращение к ним
+    читает базу. Сохранение или удаление пользователя, в том числе
+    смена роли, is_active или is_staff в админке, сбрасывает его
+    запись, а update() пользователей и import_db — записи всех
+    (api/signals.py).
+    """
+
+    def get_validated_token(self, raw_token):
+        key = hashlib.sha256(raw_token).hexdigest()
+        validated_token = token_cache.get(key)
+        if validated_token is None:
+            validated_token = super().get_validated_token(raw_token)
+            token_cache.set(key, validated_token, min(
+                settings.AUTH_TOKEN_CACHE_TIMEOUT,
+                validated_token['exp'] - time.time(),
+            ))
+        return validated_token
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        key = USER_KEY.format(user_id)
+        version_key = VERSION_KEY.format(USERS_TABLE)
+        cached = cache.get_many([key, version_key])
+        version = cached.get(version_key)
+        entry = cached.get(key)
+        if entry is None or version is None or entry[0] != version:
+            # Версия читается до пользователя: сброс, пришедший между
+            # ними, делает запись устаревшей.
+            if version is None:
+                version, = get_versions([USERS_TABLE])
+            user = super().get_user(validated_token)
+            cache.set(
+                key,
+                (version, {name: getattr(user, name) for name in USER_FIELDS}),
+                settings.AUTH_USER_CACHE_TIMEOUT,
+            )
+            return user
+        user = restore_user(entry[1])
+        if not user.is_active:
+            raise AuthenticationFailed(
+                'Пользователь неактивен', code='user_inactive'
+            )
+        return user
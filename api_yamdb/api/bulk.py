@@ -0,0 +1,322 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from api.cache import bump_version
+from api.permissions import IsAdmin
+from api.serializers import (
+    CategoryBulkSerializer, GenreBulkSerializer, TitleBulkSerializer,
+    TitleViewSerializer
+)
+from reviews.models import Category, Genre, Title
+from reviews.signals import touch
+
+EMPTY_BATCH_ERROR = 'Ожидается непустой список объектов.'
+BATCH_SIZE_ERROR = 'В пакете не больше {limit} объектов.'
+REQUIRED_ERROR = 'Обязательное поле.'
+DUPLICATE_ERROR = 'Значение повторяется в пакете.'
+EXISTS_ERROR = 'Объект с таким значением уже существует.'
+NOT_FOUND_ERROR = 'Объект не найден.'
+SLUGS_NOT_FOUND_ERROR = 'Не найдены: {slugs}.'
+
+
+def bulk_create_with_pks(model, objs):
+    """bulk_create, после которого у всех объектов заполнен pk.
+
+    Вызывается внутри транзакции. Если база не возвращает id строк
+    пакетной вставки (SQLite в Django 3.2), они читаются одним
+    запросом: это последние len(objs) id таблицы. Строки пакета
+    получают возрастающие id в порядке вставки, а транзакция с записью
+    в SQLite не пускает в базу других писателей до своего конца.
+    """
+    using = router.db_for_write(model)
+    objs = model.objects.using(using).bulk_create(objs)
+    if connections[using].features.can_return_rows_from_bulk_insert:
+        return objs
+    pks = model.objects.using(using).order_by('-pk').values_list(
+        'pk', flat=True
+    )[:len(objs)]
+    for obj, pk in zip(objs, reversed(pks)):
+        obj.pk = pk
+    return objs
+
+
+class BulkWriteMixin:
+    """
+    Пакетные создание (POST), изменение (PATCH) и удаление (DELETE)
+    по адресу <ресурс>/bulk/, только для админа.
+
+    Пакет проверяется целиком до первой записи: сначала каждый элемент
+    сериализатором `bulk_serializer_class` без обращений к базе, затем
+    весь пакет в `check_batch` одним запросом на модель. Ошибка в любом
+    элементе отклоняет весь пакет: ответ 400 — список ошибок по
+    позициям элементов ({} для корректных). Запись идёт одной
+    транзакцией. Создание и изменение — через bulk_create/bulk_update:
+    сигналы моделей не срабатывают, поэтому версии кэша `bulk_tables`
+    меняются явно. Удаление — обычным delete() с каскадом и сигналами.
+    """
+
+    bulk_serializer_class = None
+    bulk_lookup_field = 'slug'
+    bulk_tables = ()
+
+    @action(detail=False, methods=['post', 'patch', 'delete'],
+            url_path=settings.RESERVED_SLUG, permission_classes=[IsAdmin])
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [EMPTY_BATCH_ERROR]
+            })
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    BATCH_SIZE_ERROR.format(limit=settings.BULK_MAX_ITEMS)
+                ]
+            })
+        with transaction.atomic():
+            if request.method == 'DELETE':
+                self.perform_bulk_delete(self.validate_lookups(items))
+                response = Response(status=status.HTTP_204_NO_CONTENT)
+            elif request.method == 'POST':
+                objs = self.perform_bulk_create(
+                    *self.validate_batch(items, partial=False)
+                )
+                response = Response(self.serialize_batch(objs),
+                                    status=status.HTTP_201_CREATED)
+            else:
+                objs = self.perform_bulk_update(
+                    *self.validate_batch(items, partial=True)
+                )
+                response = Response(self.serialize_batch(objs))
+            for table in self.bulk_tables:
+                transaction.on_commit(partial(bump_version, table))
+        return response
+
+    def validate_batch(self, items, partial):
+        """Проверенные данные пакета и результат `check_batch`."""
+        serializers = [
+            self.bulk_serializer_class(data=item, partial=partial)
+            for item in items
+        ]
+        errors = [
+            {} if serializer.is_valid() else dict(serializer.errors)
+            for serializer in serializers
+        ]
+        data = [serializer.validated_data for serializer in serializers]
+        if partial:
+            for item, item_errors in zip(data, errors):
+                if self.bulk_lookup_field not in item:
+                    item_errors.setdefault(
+                        self.bulk_lookup_field, [REQUIRED_ERROR]
+                    )
+        state = self.check_batch(data, errors, partial)
+        if any(errors):
+            raise ValidationError(errors)
+        return data, state
+
+    def validate_lookups(self, items):
+        field = self.bulk_serializer_class().fields[self.bulk_lookup_field]
+        values, errors = [], []
+        for item in items:
+            try:
+                values.append(field.run_validation(item))
+                errors.append({})
+            except ValidationError as error:
+                values.append(None)
+                errors.append({self.bulk_lookup_field: error.detail})
+        existing = set(self.queryset.model.objects.filter(**{
+            f'{self.bulk_lookup_field}__in': values
+        }).values_list(self.bulk_lookup_field, flat=True))
+        for value, item_errors in zip(values, errors):
+            if not item_errors and value not in existing:
+                item_errors[self.bulk_lookup_field] = [NOT_FOUND_ERROR]
+        if any(errors):
+            raise ValidationError(errors)
+        return values
+
+    def check_batch(self, data, errors, partial):
+        """Проверки, требующие базы; ошибки дописываются в `errors`."""
+        return None
+
+    def find_existing(self, data, errors):
+        """Объекты пакета по `bulk_lookup_field` одним запросом."""
+        lookup = self.bulk_lookup_field
+        model = self.queryset.model
+        existing = model.objects.in_bulk(
+            [item[lookup] for item in data if lookup in item],
+            field_name=lookup,
+        )
+        seen = set()
+        for item, item_errors in zip(data, errors):
+            if lookup not in item:
+                continue
+            if item[lookup] not in existing:
+                item_errors.setdefault(lookup, []).append(NOT_FOUND_ERROR)
+            elif item[lookup] in seen:
+                item_errors.setdefault(lookup, []).append(DUPLICATE_ERROR)
+            seen.add(item[lookup])
+        return existing
+
+    def perform_bulk_delete(self, values):
+        # Удалений немного, а каскад и сигналы (рейтинг, updated_at,
+        # отметки удаления) нужны, поэтому удаление — обычное delete().
+        self.queryset.model.objects.filter(**{
+            f'{self.bulk_lookup_field}__in': values
+        }).delete()
+
+    def serialize_batch(self, objs):
+        return self.get_serializer_class()(objs, many=True).data
+
+
+class NameSlugBulkMixin(BulkWriteMixin):
+    """Пакеты категорий и жанров: элементы {name, slug}, slug —
+    ключ элемента при изменении и удалении."""
+
+    def check_batch(self, data, errors, partial):
+        if partial:
+            return self.find_existing(data, errors)
+        slugs = [item['slug'] for item in data if 'slug' in item]
+        existing = set(self.queryset.model.objects.filter(
+            slug__in=slugs
+        ).values_list('slug', flat=True))
+        seen = set()
+        for item, item_errors in zip(data, errors):
+            if 'slug' not in item:
+                continue
+            if item['slug'] in existing:
+                item_errors.setdefault('slug', []).append(EXISTS_ERROR)
+            elif item['slug'] in seen:
+                item_errors.setdefault('slug', []).append(DUPLICATE_ERROR)
+            seen.add(item['slug'])
+        return None
+
+    def perform_bulk_create(self, data, state):
+        # Ответ — только name и slug, id созданных строк не нужны.
+        model = self.queryset.model
+        return model.objects.bulk_create([model(**item) for item in data])
+
+    def perform_bulk_update(self, data, existing):
+        model = self.queryset.model
+        now = timezone.now()
+        objs = []
+        for item in data:
+            obj = existing[item['slug']]
+            obj.name = item.get('name', obj.name)
+            obj.updated_at = now
+            objs.append(obj)
+        model.objects.bulk_update(objs, ['name', 'updated_at'])
+        # Как touch_titles_on_save: название входит в представление
+        # произведений, их ETag должен смениться.
+        touch(Title.objects.filter(**{
+            f'{model._meta.model_name}__in': objs
+        }).distinct())
+        return objs
+
+
+class CategoryBulkMixin(NameSlugBulkMixin):
+    bulk_serializer_class = CategoryBulkSerializer
+    bulk_tables = ('category',)
+
+
+class GenreBulkMixin(NameSlugBulkMixin):
+    bulk_serializer_class = GenreBulkSerializer
+    bulk_tables = ('genre',)
+
+
+class TitleBulkMixin(BulkWriteMixin):
+    """Пакеты произведений: элементы как у TitleWriteSerializer, при
+    изменении и удалении ключ элемента — id."""
+
+    bulk_serializer_class = TitleBulkSerializer
+    bulk_lookup_field = 'id'
+    bulk_tables = ('title',)
+
+    def check_batch(self, data, errors, partial):
+        existing = self.find_existing(data, errors) if partial else {}
+        genres = dict(Genre.objects.filter(slug__in={
+            slug for item in data for slug in item.get('genre', ())
+        }).values_list('slug', 'pk'))
+        categories = dict(Category.objects.filter(slug__in={
+            item['category'] for item in data if 'category' in item
+        }).values_list('slug', 'pk'))
+        for item, item_errors in zip(data, errors):
+            missing = [
+                slug for slug in item.get('genre', ()) if slug not in genres
+            ]
+            if missing:
+                item_errors['genre'] = [
+                    SLUGS_NOT_FOUND_ERROR.format(slugs=', '.join(missing))
+                ]
+            if 'category' in item and item['category'] not in categories:
+                item_errors['category'] = [
+                    SLUGS_NOT_FOUND_ERROR.format(slugs=item['category'])
+                ]
+        return existing, genres, categories
+
+    def perform_bulk_create(self, data, state):
+        _, genres, categories = state
+        titles = bulk_create_with_pks(Title, [
+            Title(
+                name=item['name'],
+                year=item['year'],
+                description=item.get('description', ''),
+                category_id=categories[item['category']],
+            )
+            for item in data
+        ])
+        self.add_genres(titles, data, genres)
+        return titles
+
+    def perform_bulk_update(self, data, state):
+        existing, genres, categories = state
+        now = timezone.now()
+        fields = {'updated_at'}
+        titles = []
+        for item in data:
+            title = existing[item['id']]
+            for name in ('name', 'year', 'description'):
+                if name in item:
+                    setattr(title, name, item[name])
+                    fields.add(name)
+            if 'category' in item:
+                title.category_id = categories[item['category']]
+                fields.add('category')
+            title.updated_at = now
+            titles.append(title)
+        Title.objects.bulk_update(titles, sorted(fields))
+        replaced = [
+            (title, item) for title, item in zip(titles, data)
+            if 'genre' in item
+        ]
+        if replaced:
+            Title.genre.through.objects.filter(
+                title_id__in=[title.pk for title, _ in replaced]
+            ).delete()
+            self.add_genres(*zip(*replaced), genres)
+        return titles
+
+    def add_genres(self, titles, data, genres):
+        """Жанры всех произведений пакета одной вставкой в
+        промежуточную таблицу."""
+        through = Title.genre.through
+        through.objects.bulk_create([
+            through(title_id=title.pk, genre_id=genres[slug])
+            for title, item in zip(titles, data)
+            for slug in dict.fromkeys(item['genre'])
+        ])
+
+    def serialize_batch(self, titles):
+        loaded = Title.objects.select_related('category').prefetch_related(
+            'genre'
+        ).in_bulk([title.pk for title in titles])
+        return TitleViewSerializer(
+            [loaded[title.pk] for title in titles], many=True
+        ).data
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from api.fieldsets import FIELDS_PARAM, OMIT_PARAM
+from api.replicas import REPLICA, read_source
+
+VERSION_KEY = 'api:version:{}'
+RESPONSE_KEY = 'api:response:{}'
+STATS_KEY = 'api:stats:{}'
+HIT = 'hit'
+MISS = 'miss'
+PAGINATION_PARAMS = ('limit', 'offset', 'page', 'cursor')
+# Заголовки ответа, которые хранятся вместе с данными.
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+
+
+def _incr(key, initial):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, initial(), timeout=None)
+        return cache.incr(key)
+
+
+def _initial_version():
+    # Счётчик вытеснен или ещё не создан: начальное значение берётся
+    # из часов, чтобы после потери счётчика версии не повторялись.
+    return time.time_ns()
+
+
+def bump_version(table):
+    """Инвалидирует все ответы, построенные по таблице `table`."""
+    _incr(VERSION_KEY.format(table), _initial_version)
+
+
+def get_versions(tables):
+    keys = [VERSION_KEY.format(table) for table in tables]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_stats():
+    """Счётчики попаданий и промахов кэша ответов."""
+    keys = {STATS_KEY.format(name): name for name in (HIT, MISS)}
+    values = cache.get_many(keys)
+    return {name: values.get(key, 0) for key, name in keys.items()}
+
+
+def _record(name):
+    _incr(STATS_KEY.format(name), int)
+
+
+def normalize_params(query_params, allowed):
+    return sorted(
+        (name, value.strip())
+        for name in allowed
+        for value in query_params.getlist(name)
+    )
+
+
+def cache_response(tables):
+    """
+    Кэширует успешные ответы list/retrieve вьюсета.
+
+    Ключ строится из действия, URL-параметров, нормализованных
+    параметров фильтра и пагинации, источника чтения (основная база
+    или реплика) и версий таблиц `tables`;
+    запись в любую из таблиц меняет версию и делает ключ недостижимым.
+    Ответ с реплики живёт не дольше REPLICA_STICKY_SECONDS: реплика
+    могла ещё не получить запись, сменившую версию, и без этого
+    устаревшие данные остались бы под новым ключом на весь
+    API_CACHE_TIMEOUT.
+
+    Вместе с данными хранятся ETag и Last-Modified ответа, поэтому
+    декоратор ставится над conditional_response: попадание в кэш,
+    в том числе ответ 304, обходится без запросов к базе.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.accepted_renderer.format != 'json':
+                return method(self, request, *args, **kwargs)
+            source = read_source()
+            allowed = {*PAGINATION_PARAMS, FIELDS_PARAM, OMIT_PARAM}
+            if getattr(self, 'filterset_class', None) is not None:
+                allowed.update(self.filterset_class.base_filters)
+            key = RESPONSE_KEY.format(hashlib.sha1(json.dumps([
+                self.basename,
+                self.action,
+                request.get_host(),
+                request.accepted_renderer.format,
+                sorted(kwargs.items()),
+                normalize_params(request.query_params, allowed),
+                get_versions(tables),
+                # Ответ с отстающей реплики не должен попасть тому, кто
+                # после записи читает из основной базы.
+                source,
+            ]).encode()).hexdigest())
+
+            cached = cache.get(key)
+            if cached is not None:
+                _record(HIT)
+                data, headers = cached
+                response = get_conditional_response(
+                    request, etag=headers.get('ETag'),
+                    last_modified=parse_http_date_safe(
+                        headers.get('Last-Modified', '')
+                    ),
+                ) or Response(data)
+                for name, value in headers.items():
+                    response[name] = value
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _record(MISS)
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                timeout = settings.API_CACHE_TIMEOUT
+                if source == REPLICA:
+                    timeout = min(timeout, settings.REPLICA_STICKY_SECONDS)
+                headers = {
+                    name: response[name] for name in CACHED_HEADERS
+                    if response.has_header(name)
+                }
+                cache.set(key, (response.data, headers), timeout)
+            response['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+
+    return decorator
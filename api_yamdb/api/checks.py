@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """Предупреждает о кэше `default` одного процесса (см. CACHES)."""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or backend not in PROCESS_CACHES:
+        return []
+    return [Warning(
+        f'Кэш default ({backend}) не общий для процессов.',
+        hint='Укажите общий бэкенд кэша (Redis, Memcached), если API '
+             'работает в нескольких процессах: иначе у каждого процесса '
+             'свои версии таблиц и отметки удалений (устаревшие ответы и '
+             '304), отметки записи для реплик, ведра ограничения частоты '
+             'и статистика запросов.',
+        id='api.W001',
+    )]
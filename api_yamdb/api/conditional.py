@@ -0,0 +1,98 @@
+import hashlib
+import json
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+DELETED_KEY = 'api:deleted:{}'
+
+
+def mark_deleted(table):
+    """Запоминает время последнего удаления из таблицы `table`."""
+    cache.set(DELETED_KEY.format(table), time.time(), timeout=None)
+
+
+def get_deleted(table):
+    # Отметка вытеснена или ещё не создана: удаление могло быть
+    # когда угодно, поэтому берётся текущее время.
+    key = DELETED_KEY.format(table)
+    cache.add(key, time.time(), timeout=None)
+    return cache.get(key, time.time())
+
+
+def conditional_response(max_age_setting=None):
+    """
+    Условный GET для list/retrieve вьюсета: сильный ETag,
+    Last-Modified и Cache-Control.
+
+    До сериализации выполняется один агрегирующий запрос по тому же
+    queryset (с фильтрами): число записей и последний updated_at.
+    Совпадение с If-None-Match или If-Modified-Since даёт 304 без
+    обращения к самому представлению; несуществующий объект retrieve
+    даёт 404 до проверки условий. Удаления учитываются через отметку
+    времени в кэше `default` (mark_deleted). Если задан
+    `max_age_setting`, Cache-Control получает max-age из этой
+    настройки, иначе клиент должен проверять ответ каждый раз.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            queryset = self.filter_queryset(self.get_queryset())
+            try:
+                if self.detail:
+                    lookup_url_kwarg = (
+                        self.lookup_url_kwarg or self.lookup_field
+                    )
+                    queryset = queryset.filter(
+                        **{self.lookup_field: kwargs[lookup_url_kwarg]}
+                    )
+                state = queryset.aggregate(
+                    count=Count('pk'), updated=Max('updated_at')
+                )
+            except (TypeError, ValueError, ValidationError):
+                # Как get_object_or_404 в DRF: id не того типа — 404.
+                raise Http404
+            if self.detail and not state['count']:
+                # Иначе If-None-Match: * или ETag пустой выборки дали бы
+                # 304 вместо 404.
+                raise Http404
+            updated = state['updated'].timestamp() if state['updated'] else 0
+            last_modified = int(max(
+                updated, get_deleted(queryset.model._meta.model_name)
+            ))
+            etag = '"{}"'.format(hashlib.sha1(json.dumps([
+                self.basename,
+                self.detail,
+                request.accepted_renderer.format,
+                sorted(kwargs.items()),
+                sorted(request.query_params.lists()),
+                state['count'],
+                updated,
+            ]).encode()).hexdigest())
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            response['Cache-Control'] = (
+                f'max-age={getattr(settings, max_age_setting)}'
+                if max_age_setting else 'no-cache'
+            )
+            return response
+
+        return wrapper
+
+    return decorator
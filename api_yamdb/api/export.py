@@ -0,0 +1,133 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.fields import DateTimeField
+from rest_framework.utils.encoders import JSONEncoder
+
+from reviews.models import Comment, Review, Title
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+# Даты в том же виде и часовом поясе, что и в ответах API.
+pub_date = DateTimeField().to_representation
+
+
+def keyset_chunks(queryset, chunk_size):
+    """Строки `queryset.values()` пачками по первичному ключу.
+
+    Каждая пачка — отдельный запрос `pk > последний` с LIMIT, поэтому
+    в памяти одна пачка, а строки, добавленные или удалённые во время
+    выгрузки, не сдвигают остальные.
+    """
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = list(page[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]['id']
+
+
+def title_chunks(chunk_size):
+    """Произведения как в API: жанры пачки — одним запросом."""
+    rows = Title.objects.values(
+        'id', 'name', 'year', 'rating', 'description',
+        'category__name', 'category__slug',
+    )
+    for chunk in keyset_chunks(rows, chunk_size):
+        genres = defaultdict(list)
+        for title_id, name, slug in Title.genre.through.objects.filter(
+            title_id__in=[row['id'] for row in chunk]
+        ).order_by('genre__name').values_list(
+            'title_id', 'genre__name', 'genre__slug'
+        ):
+            genres[title_id].append({'name': name, 'slug': slug})
+        yield [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'year': row['year'],
+                'rating': row['rating'],
+                'description': row['description'],
+                'genre': genres[row['id']],
+                'category': {
+                    'name': row['category__name'],
+                    'slug': row['category__slug'],
+                } if row['category__slug'] is not None else None,
+            }
+            for row in chunk
+        ]
+
+
+def review_chunks(chunk_size):
+    rows = Review.objects.values(
+        'id', 'title_id', 'text', 'author__username', 'score', 'pub_date',
+    )
+    for chunk in keyset_chunks(rows, chunk_size):
+        yield [
+            {
+                'id': row['id'],
+                'title': row['title_id'],
+                'text': row['text'],
+                'author': row['author__username'],
+                'score': row['score'],
+                'pub_date': pub_date(row['pub_date']),
+            }
+            for row in chunk
+        ]
+
+
+def comment_chunks(chunk_size):
+    rows = Comment.objects.values(
+        'id', 'review_id', 'review__title_id', 'text', 'author__username',
+        'pub_date',
+    )
+    for chunk in keyset_chunks(rows, chunk_size):
+        yield [
+            {
+                'id': row['id'],
+                'title': row['review__title_id'],
+                'review': row['review_id'],
+                'text': row['text'],
+                'author': row['author__username'],
+                'pub_date': pub_date(row['pub_date']),
+            }
+            for row in chunk
+        ]
+
+
+EXPORTS = {
+    'titles': title_chunks,
+    'reviews': review_chunks,
+    'comments': comment_chunks,
+}
+
+
+def ndjson_lines(chunks):
+    """По одному фрагменту ответа на пачку: объекты по строке."""
+    encoder = JSONEncoder(ensure_ascii=False)
+    for chunk in chunks:
+        yield ''.join(
+            encoder.encode(item) + '\n' for item in chunk
+        ).encode()
+
+
+def ndjson_response(resource):
+    """
+    Потоковая выгрузка `resource` в формате NDJSON.
+
+    Запросы к базе выполняются только при чтении ответа, пачками по
+    EXPORT_CHUNK_SIZE строк: первый байт уходит после первой пачки, а
+    память не растёт с размером таблицы. Выгрузка идёт вне транзакции,
+    поэтому изменения во время чтения могут попасть в неё частично.
+    """
+    response = StreamingHttpResponse(
+        ndjson_lines(EXPORTS[resource](settings.EXPORT_CHUNK_SIZE)),
+        content_type=NDJSON_CONTENT_TYPE,
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{resource}.ndjson"'
+    )
+    return response
@@ -0,0 +1,92 @@
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse_fields(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetSerializerMixin:
+    """Оставляет в ответе только поля из context['fields']."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.context.get('fields')
+        if selected is None:
+            return fields
+        return {
+            name: field for name, field in fields.items() if name in selected
+        }
+
+
+class SparseFieldsetMixin:
+    """
+    Выбор полей ответа параметрами ?fields=a,b и ?omit=c для GET.
+
+    Выбор сужает не только ответ сериализатора, но и запрос к базе:
+    `sparse_columns` — поле ответа -> столбцы для only(),
+    `sparse_select_related` и `sparse_prefetch_related` — поле ответа ->
+    связь, которая загружается, только если поле запрошено.
+    """
+
+    sparse_columns = {}
+    sparse_select_related = {}
+    sparse_prefetch_related = {}
+
+    def get_sparse_fields(self):
+        """Запрошенные поля или None, если выбора нет."""
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+        self._sparse_fields = None
+        params = self.request.query_params
+        if (
+            self.request.method not in permissions.SAFE_METHODS
+            or not (FIELDS_PARAM in params or OMIT_PARAM in params)
+        ):
+            return None
+        available = set(self.sparse_columns)
+        selected = parse_fields(params.get(FIELDS_PARAM, '')) or available
+        omitted = parse_fields(params.get(OMIT_PARAM, ''))
+        unknown = (selected | omitted) - available
+        if unknown:
+            raise ValidationError({
+                FIELDS_PARAM: [
+                    f'Неизвестные поля: {", ".join(sorted(unknown))}. '
+                    f'Доступны: {", ".join(self.sparse_columns)}.'
+                ]
+            })
+        self._sparse_fields = selected - omitted
+        return self._sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_sparse_fields()
+        return context
+
+    def apply_sparse_fieldset(self, queryset):
+        selected = self.get_sparse_fields()
+        fields = set(self.sparse_columns) if selected is None else selected
+        select_related = {
+            self.sparse_select_related[name]
+            for name in fields if name in self.sparse_select_related
+        }
+        if select_related:
+            # select_related() без аргументов присоединил бы все связи.
+            queryset = queryset.select_related(*select_related)
+        queryset = queryset.prefetch_related(*{
+            self.sparse_prefetch_related[name]
+            for name in fields if name in self.sparse_prefetch_related
+        })
+        if selected is None:
+            return queryset
+        # Поля сортировки нужны курсорной пагинации.
+        columns = {
+            field.lstrip('-')
+            for field in getattr(self, 'keyset_ordering', ())
+        }
+        for name in selected:
+            columns.update(self.sparse_columns[name])
+        return queryset.only(*columns)
@@ -1,6 +1,19 @@
+from django.db import connections
+from django.db.models.expressions import RawSQL
 from django_filters import rest_framework as filters
 from reviews.models import Title
 
+TITLE_SEARCH_TABLE = 'reviews_title_fts'
+
+
+def build_match_query(value):
+    '''Превращает пользовательский ввод в безопасный запрос FTS5:
+    каждое слово — строка с префиксным поиском, слова объединяются по И.
+    '''
+    return ' '.join(
+        '"{}"*'.format(word.replace('"', '""')) for word in value.split()
+    )
+
 
 class TitleFilter(filters.FilterSet):
     '''Фильтры для произведений.'''
@@ -15,7 +28,39 @@ class TitleFilter(filters.FilterSet):
     genre = create_char_filter('genre__slug')
     name = create_char_filter('name')
     year = filters.NumberFilter(field_name='year')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
         fields = '__all__'
+
+    def filter_search(self, queryset, name, value):
+        '''Полнотекстовый поиск по названию и описанию.
+
+        На SQLite используется индекс FTS5 (см. миграцию 0004_title_fts),
+        результаты упорядочены по релевантности (bm25).
+        На других СУБД — поиск подстроки в названии.
+        '''
+        match = build_match_query(value)
+        if not match:
+            return queryset
+        # Чтение может идти с реплики (api.replicas): СУБД берётся
+        # у базы самого queryset.
+        if connections[queryset.db].vendor != 'sqlite':
+            return queryset.filter(name__icontains=value)
+        matches = RawSQL(
+            f'SELECT rowid FROM {TITLE_SEARCH_TABLE} '
+            f'WHERE {TITLE_SEARCH_TABLE} MATCH %s',
+            (match,),
+        )
+        # Ранг вычисляется только для найденных строк: подзапрос
+        # выполняется после фильтра id IN (...).
+        rank = RawSQL(
+            f'SELECT rank FROM {TITLE_SEARCH_TABLE} '
+            f'WHERE {TITLE_SEARCH_TABLE} MATCH %s '
+            f'AND rowid = {Title._meta.db_table}.id',
+            (match,),
+        )
+        return queryset.filter(id__in=matches).annotate(
+            search_rank=rank
+        ).order_by('search_rank', 'id')
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+ROUTES_KEY = 'api:query-stats:routes'
+FIELD_KEY = 'api:query-stats:{}:{}'
+FIELDS = ('requests', 'queries', 'db_time_us', 'total_time_us')
+UNRESOLVED = 'unresolved'
+
+
+def _add(key, value):
+    if not cache.add(key, value, timeout=None):
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            cache.add(key, value, timeout=None)
+
+
+class QueryStatsCollector:
+    """
+    Агрегирует статистику запросов по маршрутам.
+
+    Счётчики копятся в памяти процесса и не чаще раза в
+    QUERY_STATS_FLUSH_INTERVAL секунд сливаются в кэш `default`,
+    откуда их читают команда query_stats и эндпоинт статистики.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(lambda: [0] * len(FIELDS))
+        self.last_flush = time.monotonic()
+
+    def record(self, route, queries, db_time, total_time):
+        with self.lock:
+            values = self.pending[route]
+            values[0] += 1
+            values[1] += queries
+            values[2] += int(db_time * 1_000_000)
+            values[3] += int(total_time * 1_000_000)
+            due = (
+                time.monotonic() - self.last_flush
+                >= settings.QUERY_STATS_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(
+                lambda: [0] * len(FIELDS)
+            )
+            self.last_flush = time.monotonic()
+        if not pending:
+            return
+        routes = set(cache.get(ROUTES_KEY, ()))
+        if not routes.issuperset(pending):
+            cache.set(ROUTES_KEY, sorted(routes | set(pending)), None)
+        for route, values in pending.items():
+            for field, value in zip(FIELDS, values):
+                _add(FIELD_KEY.format(route, field), value)
+
+    def snapshot(self):
+        """Статистика по маршрутам: суммы и средние значения."""
+        routes = cache.get(ROUTES_KEY, ())
+        keys = [
+            FIELD_KEY.format(route, field)
+            for route in routes for field in FIELDS
+        ]
+        values = cache.get_many(keys)
+        stats = {}
+        for route in routes:
+            row = {
+                field: values.get(FIELD_KEY.format(route, field), 0)
+                for field in FIELDS
+            }
+            requests = row['requests'] or 1
+            stats[route] = {
+                'requests': row['requests'],
+                'queries': row['queries'],
+                'avg_queries': round(row['queries'] / requests, 2),
+                'avg_db_time_ms': round(
+                    row['db_time_us'] / requests / 1000, 3
+                ),
+                'avg_total_time_ms': round(
+                    row['total_time_us'] / requests / 1000, 3
+                ),
+            }
+        return stats
+
+    def reset(self):
+        with self.lock:
+            self.pending.clear()
+        routes = cache.get(ROUTES_KEY, ())
+        cache.delete_many([
+            FIELD_KEY.format(route, field)
+            for route in routes for field in FIELDS
+        ] + [ROUTES_KEY])
+
+
+collector = QueryStatsCollector()
+
+
+class QueryCounter:
+    """Обёртка connection.execute_wrapper: считает запросы и время БД."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+@contextmanager
+def count_queries(counter):
+    """Считает `counter` запросы всех подключений к базам."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield
+
+
+class QueryStatsMiddleware:
+    """
+    Для каждого запроса учитывает маршрут (имя URL и действие
+    вьюсета), число SQL-запросов, время БД и полное время ответа.
+    Работает и при DEBUG=False: запросы считаются через
+    execute_wrapper, а не через connection.queries. У потокового
+    ответа (выгрузки) запросы идут при чтении тела, поэтому он
+    учитывается, когда тело прочитано или ответ закрыт.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_STATS_ENABLED:
+            return self.get_response(request)
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with count_queries(counter):
+            response = self.get_response(request)
+        route = self.get_route(request)
+        if response.streaming:
+            response.streaming_content = self.count_streaming(
+                response.streaming_content, route, counter, started
+            )
+            return response
+        collector.record(
+            route, counter.queries, counter.db_time,
+            time.perf_counter() - started,
+        )
+        return response
+
+    @staticmethod
+    def count_streaming(content, route, counter, started):
+        iterator = iter(content)
+        try:
+            while True:
+                with count_queries(counter):
+                    chunk = next(iterator, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            collector.record(
+                route, counter.queries, counter.db_time,
+                time.perf_counter() - started,
+            )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        actions = getattr(view_func, 'actions', None) or {}
+        request.query_stats_action = actions.get(request.method.lower())
+
+    @staticmethod
+    def get_route(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return UNRESOLVED
+        action = getattr(request, 'query_stats_action', None)
+        name = match.view_name or match._func_path
+        return f'{name}:{action}' if action else f'{name}:{request.method}'
@@ -0,0 +1,507 @@
+import json
+import random
+import time
+from itertools import count
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver, resolve
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import urls
+from reviews.models import ADMIN, Category, Comment, Genre, Review, Title, User
+
+PERCENTILES = (50, 95, 99)
+SKIPPED_METHODS = ('head', 'options', 'trace')
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(values, share):
+    values = sorted(values)
+    index = min(len(values) - 1, round(share / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def url_patterns(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from url_patterns(pattern.url_patterns)
+        else:
+            yield pattern
+
+
+def api_routes():
+    '''Все пары (имя маршрута, метод) из api/urls.py.'''
+    routes = set()
+    for pattern in url_patterns(urls.urlpatterns):
+        view = pattern.callback.cls
+        allowed = [
+            method for method in view.http_method_names
+            if method not in SKIPPED_METHODS
+        ]
+        actions = getattr(pattern.callback, 'actions', None)
+        if actions is None:
+            methods = [method for method in allowed if hasattr(view, method)]
+        else:
+            methods = [method for method in actions if method in allowed]
+        routes.update((pattern.name, method) for method in methods)
+    return routes
+
+
+def read_response(response):
+    '''Дочитывает потоковый ответ: его запросы к базе идут при чтении.'''
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+class Command(BaseCommand):
+    '''Замер времени ответа и числа SQL-запросов всех эндпоинтов API.'''
+
+    help = (
+        'Прогон всех маршрутов api/urls.py на синтетических данных; '
+        'результат сохраняется в JSON и сравнивается с базовым'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--titles', type=int, default=200,
+            help='Число произведений в наборе данных (default: 200)'
+        )
+        parser.add_argument(
+            '--reviews', type=int, default=20,
+            help='Отзывов и комментариев на объект (default: 20)'
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=30,
+            help='Замеров на маршрут (default: 30)'
+        )
+        parser.add_argument(
+            '--save', metavar='PATH',
+            help='Сохранить результат как базовый JSON'
+        )
+        parser.add_argument(
+            '--compare', metavar='PATH',
+            help='Сравнить с базовым JSON и завершиться ошибкой при регрессии'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый рост медианы времени ответа (default: 0.25)'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] <= 0:
+            raise CommandError('--iterations должен быть больше нуля')
+        self.counter = count()
+        # Замеряется путь без кэша ответов (записи истекают сразу),
+        # кэш аутентификации работает, письма не отправляются.
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'benchmark-api',
+            }},
+            API_CACHE_TIMEOUT=0,
+            # Ограничения частоты проверяются, но не срабатывают.
+            REST_FRAMEWORK={
+                **settings.REST_FRAMEWORK,
+                'DEFAULT_THROTTLE_RATES': {
+                    scope: '1000000/s' for scope
+                    in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+                },
+            },
+        ):
+            try:
+                with transaction.atomic():
+                    self.fill(options['titles'], options['reviews'])
+                    results = self.run_routes(options['iterations'])
+                    raise Rollback
+            except Rollback:
+                pass
+
+        report = {
+            'dataset': {
+                'titles': options['titles'],
+                'reviews': options['reviews'],
+                'iterations': options['iterations'],
+            },
+            'routes': results,
+        }
+        self.print_report(results)
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результат сохранён в {options["save"]}')
+        if options['compare']:
+            self.compare(report, options['compare'], options['tolerance'])
+
+    def fill(self, titles, reviews):
+        self.stdout.write('Подготовка данных...')
+        rng = random.Random(0)
+        self.admin = User.objects.create(
+            username='bench_admin', email='bench_admin@yamdb.fake',
+            role=ADMIN,
+        )
+        User.objects.bulk_create(
+            User(username=f'bench{index}', email=f'bench{index}@yamdb.fake')
+            for index in range(reviews)
+        )
+        authors = list(User.objects.filter(username__startswith='bench'))
+        Category.objects.bulk_create(
+            Category(name=f'Категория {index}', slug=f'bench-c{index}')
+            for index in range(5)
+        )
+        Genre.objects.bulk_create(
+            Genre(name=f'Жанр {index}', slug=f'bench-g{index}')
+            for index in range(10)
+        )
+        categories = list(Category.objects.all())
+        genres = list(Genre.objects.all())
+        Title.objects.bulk_create(
+            Title(
+                name=f'Произведение {index}', year=2000,
+                description='Описание ' * 20,
+                category=rng.choice(categories),
+            )
+            for index in range(titles)
+        )
+        title_ids = list(Title.objects.values_list('id', flat=True))
+        Title.genre.through.objects.bulk_create(
+            Title.genre.through(title_id=title_id, genre_id=genre.id)
+            for title_id in title_ids
+            for genre in rng.sample(genres, 2)
+        )
+        Review.objects.bulk_create(
+            Review(title_id=title_id, author=author, text='Отзыв',
+                   score=rng.randint(1, 10))
+            for title_id in title_ids
+            for author in authors[:reviews]
+        )
+        Title.objects.recalculate_ratings()
+        self.title = Title.objects.first()
+        self.review = self.title.reviews.first()
+        Comment.objects.bulk_create(
+            Comment(review=self.review, author=author, text='Комментарий')
+            for author in authors
+        )
+        self.comment = self.review.comments.first()
+
+        self.anonymous = APIClient()
+        self.admin_client = APIClient()
+        self.admin_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}'
+        )
+        self.signup_user = User.objects.create(
+            username='bench_signup', email='bench_signup@yamdb.fake',
+            confirmation_code='000000',
+        )
+
+    def get_routes(self):
+        '''Маршрут: имя -> (клиент, метод, url, фабрика тела запроса).
+
+        Если url не задан, фабрика возвращает пару (url, тело) —
+        так готовятся объекты для изменения и удаления.
+        '''
+        title_url = f'/api/v1/titles/{self.title.id}/'
+        reviews_url = f'{title_url}reviews/'
+        review_url = f'{reviews_url}{self.review.id}/'
+        comments_url = f'{review_url}comments/'
+        user_url = f'/api/v1/users/{self.signup_user.username}/'
+        anonymous, admin = self.anonymous, self.admin_client
+
+        def unique(prefix):
+            return f'{prefix}{next(self.counter)}'
+
+        def new_title():
+            return {
+                'name': unique('Новое '), 'year': 2000,
+                'category': 'bench-c0', 'genre': ['bench-g0', 'bench-g1'],
+            }
+
+        def new_user():
+            name = unique('bench_new')
+            return {'username': name, 'email': f'{name}@yamdb.fake'}
+
+        def new_review():
+            # На каждое произведение — один отзыв автора.
+            title = Title.objects.create(
+                name=unique('Для отзыва '), year=2000,
+            )
+            return f'/api/v1/titles/{title.id}/reviews/', {
+                'text': 'Отзыв', 'score': 7,
+            }
+
+        def delete_title():
+            title = Title.objects.create(name=unique('Удалить '), year=2000)
+            return f'/api/v1/titles/{title.id}/', None
+
+        def delete_slug(resource, model, prefix):
+            slug = model.objects.create(
+                name='Удалить', slug=unique(prefix)
+            ).slug
+            return f'/api/v1/{resource}/{slug}/', None
+
+        def delete_review():
+            url, body = new_review()
+            review = Review.objects.create(
+                title_id=url.split('/')[4], author=self.admin, **body
+            )
+            return f'{url}{review.id}/', None
+
+        def delete_comment():
+            comment = Comment.objects.create(
+                review=self.review, author=self.admin, text='Удалить'
+            )
+            return f'{comments_url}{comment.id}/', None
+
+        def delete_user():
+            user = User.objects.create(**new_user())
+            return f'/api/v1/users/{user.username}/', None
+
+        return {
+            'categories-list': (anonymous, 'get', '/api/v1/categories/', None),
+            'categories-search': (
+                anonymous, 'get', '/api/v1/categories/?search=1', None
+            ),
+            'categories-create': (
+                admin, 'post', '/api/v1/categories/',
+                lambda: {'name': 'Категория', 'slug': unique('new-c')},
+            ),
+            'categories-delete': (
+                admin, 'delete', None,
+                lambda: delete_slug('categories', Category, 'del-c'),
+            ),
+            'genres-list': (anonymous, 'get', '/api/v1/genres/', None),
+            'genres-create': (
+                admin, 'post', '/api/v1/genres/',
+                lambda: {'name': 'Жанр', 'slug': unique('new-g')},
+            ),
+            'genres-delete': (
+                admin, 'delete', None,
+                lambda: delete_slug('genres', Genre, 'del-g'),
+            ),
+            'titles-list': (anonymous, 'get', '/api/v1/titles/', None),
+            'titles-list-cursor': (
+                anonymous, 'get', '/api/v1/titles/?cursor=', None
+            ),
+            'titles-filter': (
+                anonymous, 'get',
+                '/api/v1/titles/?genre=bench-g1&category=bench-c2&year=2000',
+                None,
+            ),
+            'titles-search': (
+                anonymous, 'get', '/api/v1/titles/?search=произведение',
+                None,
+            ),
+            'titles-detail': (anonymous, 'get', title_url, None),
+            'titles-create': (admin, 'post', '/api/v1/titles/', new_title),
+            'titles-update': (
+                admin, 'patch', title_url,
+                lambda: {'description': unique('Описание ')},
+            ),
+            'titles-delete': (admin, 'delete', None, delete_title),
+            'reviews-list': (anonymous, 'get', reviews_url, None),
+            'reviews-detail': (anonymous, 'get', review_url, None),
+            'reviews-create': (admin, 'post', None, new_review),
+            'reviews-update': (
+                admin, 'patch', None,
+                lambda: (delete_review()[0], {'score': 3}),
+            ),
+            'reviews-delete': (admin, 'delete', None, delete_review),
+            'comments-list': (anonymous, 'get', comments_url, None),
+            'comments-detail': (
+                anonymous, 'get', f'{comments_url}{self.comment.id}/', None
+            ),
+            'comments-create': (
+                admin, 'post', comments_url, lambda: {'text': 'Комментарий'}
+            ),
+            'comments-update': (
+                admin, 'patch', None,
+                lambda: (delete_comment()[0], {'text': 'Изменено'}),
+            ),
+            'comments-delete': (admin, 'delete', None, delete_comment),
+            'users-list': (admin, 'get', '/api/v1/users/', None),
+            'users-detail': (admin, 'get', user_url, None),
+            'users-update': (
+                admin, 'patch', user_url, lambda: {'bio': unique('О себе ')},
+            ),
+            'users-me': (admin, 'get', '/api/v1/users/me/', None),
+            'users-me-update': (
+                admin, 'patch', '/api/v1/users/me/',
+                lambda: {'bio': unique('О себе ')},
+            ),
+            'users-create': (admin, 'post', '/api/v1/users/', new_user),
+            'users-delete': (admin, 'delete', None, delete_user),
+            'export-titles': (admin, 'get', '/api/v1/export/titles/', None),
+            'export-reviews': (
+                admin, 'get', '/api/v1/export/reviews/', None
+            ),
+            'export-comments': (
+                admin, 'get', '/api/v1/export/comments/', None
+            ),
+            'stats-queries': (admin, 'get', '/api/v1/stats/queries/', None),
+            'api-root': (anonymous, 'get', '/api/v1/', None),
+            **self.get_bulk_routes(unique, new_title),
+            'auth-signup': (anonymous, 'post', '/api/v1/auth/signup/',
+                            new_user),
+            'auth-token': (
+                anonymous, 'post', '/api/v1/auth/token/',
+                lambda: {'username': 'bench_signup',
+                         'confirmation_code': '000000'},
+            ),
+        }
+
+    def get_bulk_routes(self, unique, new_title):
+        '''Маршруты <ресурс>/bulk/ в формате get_routes.'''
+        admin = self.admin_client
+
+        def new_slugs(prefix):
+            return [
+                {'name': 'Пакет', 'slug': unique(prefix)} for _ in range(3)
+            ]
+
+        def delete_slugs(resource, model, prefix):
+            items = new_slugs(prefix)
+            model.objects.bulk_create(model(**item) for item in items)
+            return f'/api/v1/{resource}/bulk/', [
+                item['slug'] for item in items
+            ]
+
+        def delete_titles():
+            return '/api/v1/titles/bulk/', [
+                Title.objects.create(name=unique('Удалить '), year=2000).id
+                for _ in range(3)
+            ]
+
+        return {
+            'categories-bulk-create': (
+                admin, 'post', '/api/v1/categories/bulk/',
+                lambda: new_slugs('bulk-c'),
+            ),
+            'categories-bulk-update': (
+                admin, 'patch', '/api/v1/categories/bulk/',
+                lambda: [{'slug': 'bench-c0', 'name': unique('Категория ')}],
+            ),
+            'categories-bulk-delete': (
+                admin, 'delete', None,
+                lambda: delete_slugs('categories', Category, 'del-bc'),
+            ),
+            'genres-bulk-create': (
+                admin, 'post', '/api/v1/genres/bulk/',
+                lambda: new_slugs('bulk-g'),
+            ),
+            'genres-bulk-update': (
+                admin, 'patch', '/api/v1/genres/bulk/',
+                lambda: [{'slug': 'bench-g0', 'name': unique('Жанр ')}],
+            ),
+            'genres-bulk-delete': (
+                admin, 'delete', None,
+                lambda: delete_slugs('genres', Genre, 'del-bg'),
+            ),
+            'titles-bulk-create': (
+                admin, 'post', '/api/v1/titles/bulk/',
+                lambda: [new_title() for _ in range(3)],
+            ),
+            'titles-bulk-update': (
+                admin, 'patch', '/api/v1/titles/bulk/',
+                lambda: [{'id': self.title.id,
+                          'description': unique('Описание ')}],
+            ),
+            'titles-bulk-delete': (admin, 'delete', None, delete_titles),
+        }
+
+    def run_routes(self, iterations):
+        results = {}
+        covered = set()
+        cache.clear()
+        for name, (client, method, url, data) in self.get_routes().items():
+            timings = []
+            queries = []
+            # Первый, прогревочный запрос в замеры не входит.
+            for _ in range(iterations + 1):
+                request_url, body = url, data() if data else None
+                if url is None:
+                    request_url, body = body
+                with CaptureQueriesContext(connection) as context:
+                    started = time.perf_counter()
+                    response = read_response(getattr(client, method)(
+                        request_url, data=body, format='json'
+                    ))
+                    timings.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    raise CommandError(
+                        f'{name}: ответ {response.status_code} '
+                        f'{getattr(response, "data", "")}'
+                    )
+                queries.append(len(context.captured_queries))
+            covered.add((resolve(request_url.split('?')[0]).url_name, method))
+            del timings[0], queries[0]
+            results[name] = {
+                **{
+                    f'p{share}_ms': round(
+                        percentile(timings, share) * 1000, 3
+                    )
+                    for share in PERCENTILES
+                },
+                'queries': max(queries),
+            }
+        missing = api_routes() - covered
+        if missing:
+            raise CommandError(
+                'Не замерены маршруты api/urls.py: ' + ', '.join(
+                    f'{method.upper()} {name}'
+                    for name, method in sorted(missing)
+                )
+            )
+        return results
+
+    def print_report(self, results):
+        self.stdout.write(
+            f'{"маршрут":<22}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"p99, мс":>10}{"SQL":>6}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<22}{result["p50_ms"]:>10.2f}'
+                f'{result["p95_ms"]:>10.2f}{result["p99_ms"]:>10.2f}'
+                f'{result["queries"]:>6}'
+            )
+
+    def compare(self, report, path, tolerance):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if baseline['dataset'] != report['dataset']:
+            self.stdout.write(self.style.WARNING(
+                'Размер данных отличается от базового: '
+                f'{baseline["dataset"]} != {report["dataset"]}'
+            ))
+        regressions = []
+        for name, base in baseline['routes'].items():
+            current = report['routes'].get(name)
+            if current is None:
+                regressions.append(f'{name}: маршрут не замерен')
+                continue
+            if current['queries'] > base['queries']:
+                regressions.append(
+                    f'{name}: SQL-запросов {base["queries"]} -> '
+                    f'{current["queries"]}'
+                )
+            if current['p50_ms'] > base['p50_ms'] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: p50 {base["p50_ms"]} -> '
+                    f'{current["p50_ms"]} мс'
+                )
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(line))
+            raise CommandError(
+                f'Обнаружены регрессии: {len(regressions)}'
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий не обнаружено'))
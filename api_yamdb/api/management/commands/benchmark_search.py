@@ -0,0 +1,95 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.filters import TitleFilter
+from reviews.models import Title
+
+WORDS = (
+    'побег', 'крестный', 'отец', 'война', 'мир', 'звёздные', 'войны',
+    'хроники', 'марсианские', 'пух', 'сказка', 'рок', 'драма', 'комедия',
+    'ночь', 'город', 'море', 'остров', 'король', 'лев', 'тень', 'свет',
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    '''Сравнение полнотекстового поиска FTS5 и фильтра icontains.'''
+
+    help = (
+        'Замер фильтров search (FTS5) и name (icontains) на '
+        'синтетическом каталоге; данные откатываются после замера'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--titles', type=int, default=100_000,
+            help='Размер синтетического каталога (default: 100000)'
+        )
+        parser.add_argument(
+            '--queries', type=int, default=50,
+            help='Число поисковых запросов (default: 50)'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора случайных чисел (default: 0)'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        try:
+            with transaction.atomic():
+                self.fill(rng, options['titles'])
+                terms = [
+                    self.word(rng, options['titles'])
+                    for _ in range(options['queries'])
+                ]
+                for filter_name in ('name', 'search'):
+                    self.measure(filter_name, terms)
+                raise Rollback
+        except Rollback:
+            pass
+
+    @staticmethod
+    def word(rng, count):
+        # Словарь растёт вместе с каталогом: каждое слово встречается
+        # примерно в десятке произведений, как имена собственные.
+        return f'{rng.choice(WORDS)}{rng.randrange(max(count // 10, 1))}'
+
+    def fill(self, rng, count):
+        self.stdout.write(f'Генерация {count} произведений...')
+        batch = []
+        for _ in range(count):
+            batch.append(Title(
+                name=' '.join(self.word(rng, count) for _ in range(3)),
+                description=' '.join(
+                    self.word(rng, count) for _ in range(20)
+                ),
+                year=rng.randint(1900, 2020),
+            ))
+            if len(batch) == 1000:
+                Title.objects.bulk_create(batch)
+                batch = []
+        Title.objects.bulk_create(batch)
+
+    def measure(self, filter_name, terms):
+        timings = []
+        for term in terms:
+            queryset = TitleFilter(
+                {filter_name: term}, queryset=Title.objects.all()
+            ).qs
+            started = time.perf_counter()
+            list(queryset.values_list('id', flat=True)[:10])
+            queryset.count()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        self.stdout.write(
+            f'{filter_name:>8}: '
+            f'p50={timings[len(timings) // 2] * 1000:.2f} мс, '
+            f'max={timings[-1] * 1000:.2f} мс'
+        )
@@ -0,0 +1,85 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import modify_settings
+
+from api.instrumentation import collector
+
+MIDDLEWARE = 'api.instrumentation.QueryStatsMiddleware'
+OVERHEAD_URL = '/api/v1/categories/'
+ROUNDS = 5
+
+
+class Command(BaseCommand):
+    '''Статистика SQL-запросов по маршрутам и действиям вьюсетов.'''
+
+    help = 'Вывод статистики QueryStatsMiddleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Сбросить накопленную статистику'
+        )
+        parser.add_argument(
+            '--overhead',
+            type=int,
+            metavar='N',
+            help='Замерить накладные расходы middleware на N запросах'
+        )
+
+    def handle(self, *args, **options):
+        if options['overhead']:
+            self.measure_overhead(options['overhead'])
+            return
+        if options['reset']:
+            collector.reset()
+            self.stdout.write(self.style.SUCCESS('Статистика сброшена'))
+            return
+        stats = collector.snapshot()
+        if not stats:
+            self.stdout.write('Статистика пуста')
+            return
+        self.stdout.write(
+            f'{"маршрут":<40}{"запросов":>10}{"SQL/запр.":>11}'
+            f'{"БД, мс":>10}{"всего, мс":>11}'
+        )
+        for route, row in sorted(
+            stats.items(), key=lambda item: -item[1]['queries']
+        ):
+            self.stdout.write(
+                f'{route:<40}{row["requests"]:>10}'
+                f'{row["avg_queries"]:>11.2f}'
+                f'{row["avg_db_time_ms"]:>10.3f}'
+                f'{row["avg_total_time_ms"]:>11.3f}'
+            )
+
+    def time_requests(self, count):
+        '''Среднее время ответа, сек. Клиент создаётся заново: его
+        обработчик собирает цепочку middleware из текущих настроек при
+        первом запросе, который не замеряется.'''
+        client = Client()
+        client.get(OVERHEAD_URL)
+        started = time.perf_counter()
+        for _ in range(count):
+            client.get(OVERHEAD_URL)
+        return (time.perf_counter() - started) / count
+
+    def measure_overhead(self, count):
+        '''Сравнивает время ответа с middleware и без него.'''
+        # Режимы чередуются, берётся лучший раунд каждого — так
+        # меньше влияет фоновый шум.
+        without, with_stats = [], []
+        for _ in range(ROUNDS):
+            with modify_settings(MIDDLEWARE={'remove': MIDDLEWARE}):
+                without.append(self.time_requests(count))
+            with modify_settings(MIDDLEWARE={'append': MIDDLEWARE}):
+                with_stats.append(self.time_requests(count))
+        without, with_stats = min(without), min(with_stats)
+        collector.reset()
+        self.stdout.write(
+            f'без middleware: {without * 1000:.3f} мс/запрос, '
+            f'с middleware: {with_stats * 1000:.3f} мс/запрос, '
+            f'накладные расходы: {(with_stats - without) * 1e6:.1f} мкс'
+        )
@@ -0,0 +1,131 @@
+import hashlib
+import random
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.module_loading import import_string
+
+STICKY_KEY = 'api:replica-sticky:{}'
+READ_METHODS = ('GET', 'HEAD')
+PRIMARY = 'primary'
+REPLICA = 'replica'
+
+
+class ReplicaState:
+    """Маршрутизация текущего запроса: выбранная реплика и была ли запись."""
+
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+_state = ContextVar('replica_state', default=None)
+
+
+def random_replica(replicas, request):
+    """Выбор реплики по умолчанию: случайная из DATABASE_REPLICAS."""
+    return random.choice(replicas)
+
+
+@lru_cache(maxsize=None)
+def _load_selector(path):
+    return import_string(path)
+
+
+def get_selector():
+    return _load_selector(settings.DATABASE_REPLICA_SELECTOR)
+
+
+def read_source():
+    """Откуда читает текущий запрос: PRIMARY или REPLICA."""
+    state = _state.get()
+    if state is None or state.replica is None or state.wrote:
+        return PRIMARY
+    return REPLICA
+
+
+class ReplicaRouter:
+    """
+    Роутер баз данных: чтение выбранных запросов — с реплики.
+
+    Реплику запросу назначает ReplicaMiddleware; без неё (команды,
+    фоновые задачи, запросы на запись) роутер ничего не решает, и
+    Django выбирает базу сам: по умолчанию или базу объекта. После
+    первой записи в запросе чтение до его конца идёт в основную базу,
+    чтобы видеть только что записанное.
+    """
+
+    def db_for_read(self, model, **hints):
+        if read_source() == REPLICA:
+            return _state.get().replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is None:
+            return None
+        state.wrote = True
+        # Объект, прочитанный с реплики, записывается в основную базу.
+        return DEFAULT_DB_ALIAS if state.replica is not None else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        state = _state.get()
+        if state is None or state.replica is None:
+            return None
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Направляет GET и HEAD вьюсетов с read_from_replica = True на
+    реплику из DATABASE_REPLICAS (выбирает DATABASE_REPLICA_SELECTOR).
+
+    Клиент, который записал в базу, ещё REPLICA_STICKY_SECONDS читает
+    из основной базы: реплика могла не успеть получить запись. Клиент
+    определяется по заголовку Authorization, без него — по адресу.
+    Отметка о записи хранится в кэше `default`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = ReplicaState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote and settings.DATABASE_REPLICAS:
+            cache.set(
+                self.get_sticky_key(request), True,
+                settings.REPLICA_STICKY_SECONDS,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        replicas = settings.DATABASE_REPLICAS
+        view = getattr(view_func, 'cls', None)
+        if (
+            replicas
+            and request.method in READ_METHODS
+            and getattr(view, 'read_from_replica', False)
+            and not cache.get(self.get_sticky_key(request))
+        ):
+            _state.get().replica = get_selector()(list(replicas), request)
+
+    @staticmethod
+    def get_sticky_key(request):
+        client = (
+            request.META.get('HTTP_AUTHORIZATION')
+            or request.META.get('REMOTE_ADDR', '')
+        )
+        return STICKY_KEY.format(hashlib.sha256(client.encode()).hexdigest())
@@ -1,11 +1,12 @@
 from django.conf import settings
 from rest_framework import serializers
 
+from api.fieldsets import SparseFieldsetSerializerMixin
 from reviews.models import (
     Category, Comment, EMAIL_MAX_LENGTH, Genre, Review,
     Title, USERNAME_MAX_LENGTH, User
 )
-from reviews.validators import validate_username_value
+from reviews.validators import validate_slug_value, validate_username_value
 
 
 class UsernameValidatorMixin:
@@ -14,6 +15,12 @@ class UsernameValidatorMixin:
         return value
 
 
+class SlugValidatorMixin:
+    def validate_slug(self, value):
+        validate_slug_value(value)
+        return value
+
+
 class UserSerializer(UsernameValidatorMixin, serializers.ModelSerializer):
     class Meta:
         model = User
@@ -51,21 +58,22 @@ class TokenSerializer(UsernameValidatorMixin, serializers.Serializer):
     )
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SlugValidatorMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         lookup_field = 'slug'
         fields = ('name', 'slug')
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(SlugValidatorMixin, serializers.ModelSerializer):
     class Meta:
         model = Genre
         lookup_field = 'slug'
         fields = ('name', 'slug')
 
 
-class TitleViewSerializer(serializers.ModelSerializer):
+class TitleViewSerializer(SparseFieldsetSerializerMixin,
+                          serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(
         read_only=True,
@@ -110,7 +118,49 @@ class TitleWriteSerializer(serializers.ModelSerializer):
         return TitleViewSerializer(instance).data
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class CategoryBulkSerializer(SlugValidatorMixin,
+                             serializers.ModelSerializer):
+    """Элемент пакета категорий: уникальность slug проверяется пакетом."""
+
+    slug = serializers.SlugField(max_length=50)
+
+    class Meta:
+        model = Category
+        fields = ('name', 'slug')
+
+
+class GenreBulkSerializer(CategoryBulkSerializer):
+    class Meta(CategoryBulkSerializer.Meta):
+        model = Genre
+
+
+class TitleBulkSerializer(serializers.ModelSerializer):
+    """Элемент пакета произведений: slug жанров и категории
+    разрешаются одним запросом на весь пакет."""
+
+    id = serializers.IntegerField(required=False)
+    genre = serializers.ListField(
+        child=serializers.SlugField(), allow_empty=False
+    )
+    category = serializers.SlugField()
+
+    class Meta:
+        model = Title
+        fields = (
+            'id', 'name', 'year', 'description', 'genre', 'category'
+        )
+
+    def validate_id(self, value):
+        # id — ключ элемента при изменении; при создании его выдаёт база.
+        if not self.partial:
+            raise serializers.ValidationError(
+                'id задаётся базой при создании.'
+            )
+        return value
+
+
+class ReviewSerializer(SparseFieldsetSerializerMixin,
+                       serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username'
@@ -126,20 +176,9 @@ class ReviewSerializer(serializers.ModelSerializer):
             'pub_date'
         )
 
-    def validate(self, data):
-        if self.context['request'].method != 'POST':
-            return data
-        title_id = self.context['view'].kwargs['title_id']
-        author = self.context['request'].user
-        if Review.objects.filter(title_id=title_id, author=author).exists():
-            title = Title.objects.get(id=title_id)
-            raise serializers.ValidationError(
-                f'Вы уже оставляли отзыв на произведение "{title.name}"'
-            )
-        return data
-
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetSerializerMixin,
+                        serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username'
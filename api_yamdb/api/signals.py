@@ -0,0 +1,69 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from api.authentication import forget_user, forget_users
+from api.cache import bump_version
+from api.conditional import mark_deleted
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.signals import data_imported, users_updated
+
+CACHED_MODELS = (Title, Genre, Category, Review)
+
+
+def invalidate(sender, **kwargs):
+    """Меняет версию таблицы после фиксации транзакции."""
+    if kwargs.get('raw'):
+        return
+    transaction.on_commit(
+        partial(bump_version, sender._meta.model_name)
+    )
+
+
+def invalidate_title_genre(sender, action, **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(partial(bump_version, 'title'))
+
+
+def remember_deletion(sender, **kwargs):
+    """Удаление меняет Last-Modified списков (api/conditional.py)."""
+    transaction.on_commit(
+        partial(mark_deleted, sender._meta.model_name)
+    )
+
+
+def invalidate_user(sender, instance, **kwargs):
+    """Сбрасывает пользователя в кэше аутентификации."""
+    if kwargs.get('raw'):
+        return
+    transaction.on_commit(partial(forget_user, instance.pk))
+
+
+def invalidate_users(sender, **kwargs):
+    forget_users()
+
+
+def invalidate_imported(sender, models, **kwargs):
+    """import_db пишет мимо сигналов моделей: сбрасывает всё сразу."""
+    if User in models:
+        forget_users()
+    for model in models:
+        if model in CACHED_MODELS:
+            bump_version(model._meta.model_name)
+        elif model is Title.genre.through:
+            bump_version('title')
+        if model in CACHED_MODELS or model is Comment:
+            mark_deleted(model._meta.model_name)
+
+
+for model in CACHED_MODELS:
+    post_save.connect(invalidate, sender=model)
+    post_delete.connect(invalidate, sender=model)
+m2m_changed.connect(invalidate_title_genre, sender=Title.genre.through)
+post_save.connect(invalidate_user, sender=User)
+post_delete.connect(invalidate_user, sender=User)
+users_updated.connect(invalidate_users, sender=User)
+for model in (*CACHED_MODELS, Comment):
+    post_delete.connect(remember_deletion, sender=model)
+data_imported.connect(invalidate_imported)
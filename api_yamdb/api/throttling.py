@@ -0,0 +1,147 @@
+import hashlib
+import math
+import time
+from collections.abc import Mapping
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Ограничение частоты запросов «ведром токенов».
+
+    Частота задаётся как в DRF: 'N/период' в DEFAULT_THROTTLE_RATES —
+    в ведре до N токенов, за период оно наполняется целиком. В кэше на
+    ключ хранится одна пара (токены, время), поэтому проверка занимает
+    O(1), а запись живёт, лишь пока ведро не наполнится, и память
+    ограничена числом недавно активных клиентов.
+
+    Пополнение и списание токена выполняются под блокировкой ключа
+    (cache.add), иначе параллельные запросы клиента читают одно и то же
+    ведро и проходят сверх лимита.
+    """
+
+    cache_format = 'api:throttle:%(scope)s:%(ident)s'
+    lock_format = '%s:lock'
+    # Запись блокировки упавшего процесса живёт не дольше, сек.
+    lock_timeout = 1
+    # Сколько запрос ждёт блокировку, прежде чем получить отказ, сек.
+    lock_wait = 0.5
+
+    def get_rate(self):
+        # THROTTLE_RATES базового класса читается один раз при импорте,
+        # здесь частоты берутся из текущих настроек.
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        return super().get_rate()
+
+    def get_ident_key(self, ident):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': hashlib.sha1(str(ident).encode()).hexdigest(),
+        }
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        lock = self.lock_format % key
+        deadline = time.monotonic() + self.lock_wait
+        while not self.cache.add(lock, True, self.lock_timeout):
+            if time.monotonic() >= deadline:
+                self.wait_time = self.lock_wait
+                return False
+            time.sleep(0.001)
+        try:
+            return self.take_token(key)
+        finally:
+            self.cache.delete(lock)
+
+    def take_token(self, key):
+        now = self.timer()
+        refill = self.num_requests / self.duration
+        tokens, updated = self.cache.get(key, (self.num_requests, now))
+        tokens = min(
+            self.num_requests, tokens + (now - updated) * refill
+        )
+        if tokens < 1:
+            self.wait_time = (1 - tokens) / refill
+            return False
+        tokens -= 1
+        self.cache.set(
+            key, (tokens, now),
+            math.ceil((self.num_requests - tokens) / refill),
+        )
+        return True
+
+    def wait(self):
+        return getattr(self, 'wait_time', None)
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Ведро на IP-адрес клиента."""
+
+    def get_cache_key(self, request, view):
+        return self.get_ident_key(self.get_ident(request))
+
+
+class UsernameThrottle(TokenBucketThrottle):
+    """Ведро на имя пользователя из тела запроса (signup, token)."""
+
+    def get_cache_key(self, request, view):
+        # Тело не объект (например, массив JSON): ограничивает только
+        # ведро адреса, ответ 400 даст сериализатор.
+        if not isinstance(request.data, Mapping):
+            return None
+        username = request.data.get('username')
+        if not isinstance(username, str) or not username:
+            return None
+        return self.get_ident_key(username.lower())
+
+
+class UserThrottle(TokenBucketThrottle):
+    """Ведро на пользователя, для анонимов — на IP-адрес."""
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return self.get_ident_key(f'user:{request.user.pk}')
+        return self.get_ident_key(f'ip:{self.get_ident(request)}')
+
+
+class SignupIPThrottle(IPThrottle):
+    scope = 'signup-ip'
+
+
+class SignupUsernameThrottle(UsernameThrottle):
+    scope = 'signup-username'
+
+
+class TokenIPThrottle(IPThrottle):
+    scope = 'token-ip'
+
+
+class TokenUsernameThrottle(UsernameThrottle):
+    scope = 'token-username'
+
+
+class ContentWriteUserThrottle(UserThrottle):
+    scope = 'content-write-user'
+
+
+class ContentWriteIPThrottle(IPThrottle):
+    scope = 'content-write-ip'
+
+
+class CreateThrottleMixin:
+    """Ограничивает частоту только создания объектов вьюсета."""
+
+    create_throttle_classes = (
+        ContentWriteUserThrottle, ContentWriteIPThrottle
+    )
+
+    def get_throttles(self):
+        if self.action == 'create':
+            return [throttle() for throttle in self.create_throttle_classes]
+        return super().get_throttles()
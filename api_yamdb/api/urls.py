@@ -1,4 +1,4 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
 from api.views import (
@@ -9,6 +9,8 @@ from api.views import (
     ReviewViewSet,
     signup,
     get_token,
+    export,
+    query_stats,
     UserViewSet
 )
 
@@ -35,4 +37,7 @@ auth_patterns = [
 urlpatterns = [
     path('v1/', include(router_v1.urls)),
     path('v1/auth/', include(auth_patterns)),
+    path('v1/stats/queries/', query_stats, name='query-stats'),
+    re_path(r'^v1/export/(?P<resource>titles|reviews|comments)/$', export,
+            name='export'),
 ]
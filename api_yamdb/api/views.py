@@ -3,20 +3,29 @@ import random
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
 from django.db import IntegrityError
-from django.db.models import Avg
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, mixins, permissions, status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (
+    action, api_view, permission_classes, throttle_classes
+)
 from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import (
     LimitOffsetPagination, PageNumberPagination
 )
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.tokens import AccessToken
 
+from api.bulk import CategoryBulkMixin, GenreBulkMixin, TitleBulkMixin
+from api.cache import cache_response
+from api.conditional import conditional_response
+from api.export import ndjson_response
+from api.fieldsets import SparseFieldsetMixin
 from api.filters import TitleFilter
+from api.instrumentation import collector
+from api.pagination import KeysetPaginationMixin
 from api.permissions import (
     IsAdmin, IsAdminOrReadOnly, IsAuthorModeratorAdminOrReadOnly
 )
@@ -27,7 +36,17 @@ from api.serializers import (
     TitleWriteSerializer, TokenSerializer,
     UserProfileSerializer, UserSerializer
 )
-from reviews.models import Category, Genre, Review, Title, User
+from api.throttling import (
+    CreateThrottleMixin, SignupIPThrottle, SignupUsernameThrottle,
+    TokenIPThrottle, TokenUsernameThrottle
+)
+from reviews.models import (
+    Category, Comment, Genre, OutboxEmail, Review, Title, User
+)
+
+
+TITLE_CACHE_TABLES = ('title', 'genre', 'category', 'review')
+REVIEW_EXISTS_ERROR = 'Вы уже оставляли отзыв на произведение "{title}"'
 
 
 def generate_confirmation_code():
@@ -37,6 +56,23 @@ def generate_confirmation_code():
     ))
 
 
+def violates_constraint(error, model, name):
+    """Нарушено ли ограничение модели `name` (по тексту IntegrityError).
+
+    PostgreSQL называет ограничение, SQLite перечисляет его столбцы.
+    """
+    constraint = next(
+        constraint for constraint in model._meta.constraints
+        if constraint.name == name
+    )
+    columns = ', '.join(
+        f'{model._meta.db_table}.{model._meta.get_field(field).column}'
+        for field in constraint.fields
+    )
+    message = str(error)
+    return name in message or columns in message
+
+
 def send_confirmation_email(user):
     subject = 'Код подтверждения YaMDb!'
     from_email = settings.DEFAULT_FROM_EMAIL
@@ -63,11 +99,16 @@ def send_confirmation_email(user):
 
     msg = EmailMultiAlternatives(subject, text_content, from_email, to)
     msg.attach_alternative(html_content, "text/html")
-    msg.send()
+    if settings.EMAIL_OUTBOX_ENABLED:
+        # Письмо уходит командой send_outbox, регистрация не ждёт SMTP.
+        OutboxEmail.objects.enqueue(msg)
+    else:
+        msg.send()
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([SignupIPThrottle, SignupUsernameThrottle])
 def signup(request):
     USERNAME_ERROR = "Это имя уже занято другим пользователем."
     EMAIL_ERROR = "Этот email уже используется другим пользователем."
@@ -98,6 +139,7 @@ def signup(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([TokenIPThrottle, TokenUsernameThrottle])
 def get_token(request):
     serializer = TokenSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
@@ -117,6 +159,20 @@ def get_token(request):
     raise ValidationError('Неверный код.')
 
 
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def query_stats(request):
+    collector.flush()
+    return Response(collector.snapshot())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def export(request, resource):
+    """Потоковая NDJSON-выгрузка произведений, отзывов или комментариев."""
+    return ndjson_response(resource)
+
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all().order_by('id')
     serializer_class = UserSerializer
@@ -130,11 +186,16 @@ class UserViewSet(viewsets.ModelViewSet):
             url_path=settings.RESERVED_NAME,
             permission_classes=[IsAuthenticated])
     def self_profile(self, request):
+        user = request.user
+        if user.get_deferred_fields():
+            # Пользователь из кэша аутентификации: в нём только поля
+            # для прав доступа, профиль читается из базы.
+            user = get_object_or_404(User, pk=user.pk)
         if request.method == 'GET':
-            return Response(UserProfileSerializer(request.user).data)
+            return Response(UserProfileSerializer(user).data)
 
         serializer = UserProfileSerializer(
-            request.user,
+            user,
             data=request.data,
             partial=True,
         )
@@ -143,24 +204,48 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(TitleBulkMixin, SparseFieldsetMixin,
+                   KeysetPaginationMixin, viewsets.ModelViewSet):
     """Получить список всех произведений."""
 
-    queryset = (
-        Title.objects.annotate(rating=Avg("reviews__score"))
-        .order_by(*Title._meta.ordering)
-    )
+    queryset = Title.objects.all()
     pagination_class = LimitOffsetPagination
+    read_from_replica = True
+    keyset_ordering = ('name', 'id')
     permission_classes = (IsAdminOrReadOnly,)
     http_method_names = ['get', 'post', 'patch', 'delete']
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
+    sparse_columns = {
+        'id': ('id',),
+        'name': ('name',),
+        'year': ('year',),
+        'rating': ('rating',),
+        'description': ('description',),
+        'genre': (),
+        'category': ('category', 'category__name', 'category__slug'),
+    }
+    sparse_select_related = {'category': 'category'}
+    sparse_prefetch_related = {'genre': 'genre'}
+
+    def get_queryset(self):
+        return self.apply_sparse_fieldset(super().get_queryset())
 
     def get_serializer_class(self):
         if self.request.method in permissions.SAFE_METHODS:
             return TitleViewSerializer
         return TitleWriteSerializer
 
+    @cache_response(TITLE_CACHE_TABLES)
+    @conditional_response()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(TITLE_CACHE_TABLES)
+    @conditional_response()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class BaseCategoryGenreView(
     mixins.ListModelMixin,
@@ -172,56 +257,123 @@ class BaseCategoryGenreView(
     search_fields = ('name',)
     permission_classes = (IsAdminOrReadOnly,)
     lookup_field = 'slug'
+    read_from_replica = True
+
+    @conditional_response('REFERENCE_DATA_MAX_AGE')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
 
-class CategoryViewSet(BaseCategoryGenreView):
+class CategoryViewSet(CategoryBulkMixin, BaseCategoryGenreView):
     """Получить список всех категорий."""
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
 
-class GenreViewSet(BaseCategoryGenreView):
+class GenreViewSet(GenreBulkMixin, BaseCategoryGenreView):
     """Получить список всех жанров."""
 
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(SparseFieldsetMixin, CreateThrottleMixin,
+                    KeysetPaginationMixin, viewsets.ModelViewSet):
     """Получить список всех отзывов."""
 
     serializer_class = ReviewSerializer
     permission_classes = (IsAuthorModeratorAdminOrReadOnly,)
+    read_from_replica = True
     http_method_names = ['get', 'post', 'patch', 'delete']
     pagination_class = PageNumberPagination
+    keyset_ordering = ('-pub_date', '-id')
+    sparse_columns = {
+        'id': ('id',),
+        'text': ('text',),
+        'author': ('author', 'author__username'),
+        'score': ('score',),
+        'pub_date': ('pub_date',),
+    }
+    sparse_select_related = {'author': 'author'}
 
     def get_title(self):
-        return get_object_or_404(Title, id=self.kwargs['title_id'])
+        # Произведение проверяется один раз за запрос: и выборкой,
+        # и сериализатором, и при сохранении.
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(Title, id=self.kwargs['title_id'])
+        return self._title
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return self.apply_sparse_fieldset(
+            Review.objects.filter(title=self.get_title())
+        )
 
-    def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.get_title())
+    @conditional_response()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
+    @conditional_response()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
-class CommentViewSet(viewsets.ModelViewSet):
+    def perform_create(self, serializer):
+        # Повторный отзыв отсекает ограничение reviews_unique, а не
+        # предварительный SELECT: так одна вставка и нет гонки.
+        title = self.get_title()
+        try:
+            serializer.save(author=self.request.user, title=title)
+        except IntegrityError as error:
+            if not violates_constraint(error, Review, 'reviews_unique'):
+                raise
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    REVIEW_EXISTS_ERROR.format(title=title.name)
+                ],
+            })
+
+
+class CommentViewSet(SparseFieldsetMixin, CreateThrottleMixin,
+                     KeysetPaginationMixin, viewsets.ModelViewSet):
     """Получить список всех комментариев."""
 
     serializer_class = CommentSerializer
     permission_classes = (IsAuthorModeratorAdminOrReadOnly,)
+    read_from_replica = True
     http_method_names = ['get', 'post', 'patch', 'delete']
     pagination_class = PageNumberPagination
+    keyset_ordering = ('-pub_date', '-id')
+    sparse_columns = {
+        'id': ('id',),
+        'text': ('text',),
+        'author': ('author', 'author__username'),
+        'pub_date': ('pub_date',),
+    }
+    sparse_select_related = {'author': 'author'}
 
     def get_review(self):
-        return get_object_or_404(
-            Review,
-            id=self.kwargs['review_id'],
-        )
+        # Отзыв ищется по первичному ключу вместе с произведением из URL:
+        # несовпадающая пара даёт 404 за один запрос.
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review.objects.only('id', 'title_id'),
+                id=self.kwargs['review_id'],
+                title_id=self.kwargs['title_id'],
+            )
+        return self._review
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        return self.apply_sparse_fieldset(
+            Comment.objects.filter(review=self.get_review())
+        )
+
+    @conditional_response()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user, review=self.get_review())
@@ -27,6 +27,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.instrumentation.QueryStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -34,6 +35,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.replicas.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
@@ -65,6 +67,44 @@ DATABASES = {
     }
 }
 
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+# Псевдонимы реплик из DATABASES: с них читают GET и HEAD вьюсетов
+# с read_from_replica = True. Пустой список — всё в основную базу.
+DATABASE_REPLICAS = []
+# Выбор реплики для запроса: функция (реплики, запрос) -> псевдоним.
+DATABASE_REPLICA_SELECTOR = 'api.replicas.random_replica'
+# Ожидаемое отставание реплик, сек.: столько после записи клиент
+# читает из основной базы, и не дольше хранятся в кэше ответы,
+# прочитанные с реплики.
+REPLICA_STICKY_SECONDS = 5
+
+# LocMemCache — кэш одного процесса. При нескольких процессах
+# (воркеры gunicorn) нужен общий бэкенд (Redis, Memcached), иначе
+# каждый процесс ведёт своё состояние: версии таблиц и отметки
+# удалений (ETag, Last-Modified, кэш ответов), отметки записи для
+# чтения с реплик, ведра ограничения частоты, статистику
+# SQL-запросов. При DEBUG = False проверка api.W001 предупреждает
+# о кэше процесса.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Время жизни закэшированных ответов API, сек.
+API_CACHE_TIMEOUT = 300
+# Cache-Control: max-age справочников (жанры, категории), сек.
+REFERENCE_DATA_MAX_AGE = 3600
+# Наибольшее число объектов в пакете <ресурс>/bulk/.
+BULK_MAX_ITEMS = 1000
+# Размер пачки строк потоковой выгрузки /api/v1/export/.
+EXPORT_CHUNK_SIZE = 1000
+
+# Статистика SQL-запросов по маршрутам (api.instrumentation).
+QUERY_STATS_ENABLED = True
+# Как часто процесс сливает накопленную статистику в кэш, сек.
+QUERY_STATS_FLUSH_INTERVAL = 10
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -101,7 +141,7 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -111,6 +151,19 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Ведра токенов api/throttling.py: 'N/период' — до N запросов подряд,
+    # за период ведро наполняется целиком. None отключает ограничение.
+    'DEFAULT_THROTTLE_RATES': {
+        'signup-ip': '20/hour',
+        'signup-username': '5/hour',
+        'token-ip': '60/hour',
+        'token-username': '10/hour',
+        'content-write-user': '30/min',
+        'content-write-ip': '60/min',
+    },
+    # Адрес клиента — REMOTE_ADDR; за обратным прокси укажите число
+    # прокси, чтобы брать адрес из X-Forwarded-For.
+    'NUM_PROXIES': 0,
 }
 
 SIMPLE_JWT = {
@@ -118,8 +171,25 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Кэш аутентификации: проверенные токены хранятся в памяти процесса,
+# пользователи — в общем кэше.
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TIMEOUT = 300
+AUTH_USER_CACHE_TIMEOUT = 300
+
 CONFIRMATION_CODE_LENGTH = 6
 ALLOWED_CONFIRMATION_SYMBOLS = "1234567890"
 RESERVED_NAME = 'me'
+# Адрес пакетных операций <ресурс>/bulk/: такой slug у жанра или
+# категории перекрыл бы их детальный маршрут.
+RESERVED_SLUG = 'bulk'
 DEFAULT_FROM_EMAIL = 'noreply@yamdb.fake'
+
+# Письма ставятся в очередь (модель OutboxEmail) и отправляются
+# командой send_outbox; False — отправка прямо в запросе.
+EMAIL_OUTBOX_ENABLED = True
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+
 USERNAME_REGEX = r'[\w.@+-]'
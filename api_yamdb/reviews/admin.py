@@ -3,7 +3,9 @@ from django.urls import reverse
 from django.utils.http import urlencode
 from django.utils.safestring import mark_safe
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.models import (
+    Category, Comment, Genre, OutboxEmail, Review, Title, User
+)
 
 MAX_LENGTH_DISPLAY_TEXT = 50
 
@@ -15,6 +17,7 @@ class TitleAdmin(admin.ModelAdmin):
         'category',
         'name',
         'year',
+        'rating',
         'description'
     )
     list_display_links = ('name',)
@@ -128,3 +131,19 @@ class UserAdmin(admin.ModelAdmin):
         return (
             obj.bio[:MAX_LENGTH_DISPLAY_TEXT]
         )
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'recipients',
+        'subject',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'sent_at',
+    )
+    list_filter = ('status',)
+    search_fields = ('recipients',)
+    readonly_fields = ('created_at', 'sent_at', 'claimed_by', 'claimed_at')
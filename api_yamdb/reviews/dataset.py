@@ -0,0 +1,210 @@
+"""Описание CSV-выгрузки базы (static/data/*.csv) для импорта и экспорта."""
+from collections import namedtuple
+from datetime import datetime, timezone
+from operator import itemgetter
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+CSV_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+def parse_timestamp(value):
+    """Разбирает дату вида 2019-09-24T21:08:21.567Z (время в UTC)."""
+    if not value.endswith('Z'):
+        raise ValueError(f'Некорректная дата: {value!r}')
+    return datetime.fromisoformat(value[:-1]).replace(tzinfo=timezone.utc)
+
+
+def nullable(value):
+    return value or None
+
+
+class CsvTable(namedtuple(
+    'CsvTable',
+    'name filename model columns convert depends_on verbose_name '
+    'csv_columns optional_columns',
+    defaults=((), '', (), ()),
+)):
+    """Соответствие CSV-файла таблице базы.
+
+    `csv_columns` — пары (столбец CSV, поле модели): по ним пишет
+    экспорт, и в этом же порядке значения строки получает
+    `convert(values, context)`, возвращающий кортеж значений `columns`;
+    `context` — общие для импорта значения (`now`, `adapt_datetime`).
+    Столбцов из `optional_columns` в файле может не быть.
+    """
+
+    __slots__ = ()
+
+    @property
+    def db_table(self):
+        return self.model._meta.db_table
+
+    def row_getter(self, header):
+        """Функция: строка файла -> кортеж значений `csv_columns`.
+
+        Позиции столбцов вычисляются один раз по заголовку, строки
+        остаются списками, без словаря на каждую. KeyError, если в
+        заголовке нет обязательного столбца.
+        """
+        positions = {name: index for index, name in enumerate(header)}
+        indices = []
+        for name, _ in self.csv_columns:
+            if name not in positions and name not in self.optional_columns:
+                raise KeyError(name)
+            indices.append(positions.get(name))
+        if None not in indices and len(indices) > 1:
+            return itemgetter(*indices)
+        return lambda row: tuple(
+            '' if index is None else row[index] for index in indices
+        )
+
+
+def convert_user(values, context):
+    pk, username, email, role, bio, first_name, last_name = values
+    return (
+        pk, '', None, False, username, first_name or '', last_name or '',
+        email, False, True, context['now'], role or 'user', bio or '', '',
+    )
+
+
+def convert_name_slug(values, context):
+    return (*values, context['now'])
+
+
+def convert_title(values, context):
+    pk, name, year, category, description = values
+    return (
+        pk, name, year, nullable(category), description or '',
+        None, 0, 0, context['now'],
+    )
+
+
+def convert_genre_title(values, context):
+    return values
+
+
+def convert_review(values, context):
+    pk, title_id, text, author, score, pub_date = values
+    return (
+        pk, title_id, text, author, score,
+        context['adapt_datetime'](parse_timestamp(pub_date)),
+        context['now'],
+    )
+
+
+def convert_comment(values, context):
+    pk, review_id, text, author, pub_date = values
+    return (
+        pk, review_id, text, author,
+        context['adapt_datetime'](parse_timestamp(pub_date)),
+        context['now'],
+    )
+
+
+TABLES = (
+    CsvTable(
+        'users', 'users.csv', User,
+        (
+            'id', 'password', 'last_login', 'is_superuser', 'username',
+            'first_name', 'last_name', 'email', 'is_staff', 'is_active',
+            'date_joined', 'role', 'bio', 'confirmation_code',
+        ),
+        convert_user,
+        verbose_name='Пользователи',
+        csv_columns=(
+            ('id', 'id'), ('username', 'username'), ('email', 'email'),
+            ('role', 'role'), ('bio', 'bio'), ('first_name', 'first_name'),
+            ('last_name', 'last_name'),
+        ),
+        optional_columns=('role', 'bio', 'first_name', 'last_name'),
+    ),
+    CsvTable(
+        'categories', 'category.csv', Category,
+        ('id', 'name', 'slug', 'updated_at'),
+        convert_name_slug,
+        verbose_name='Категории',
+        csv_columns=(('id', 'id'), ('name', 'name'), ('slug', 'slug')),
+    ),
+    CsvTable(
+        'genres', 'genre.csv', Genre,
+        ('id', 'name', 'slug', 'updated_at'),
+        convert_name_slug,
+        verbose_name='Жанры',
+        csv_columns=(('id', 'id'), ('name', 'name'), ('slug', 'slug')),
+    ),
+    CsvTable(
+        'titles', 'titles.csv', Title,
+        (
+            'id', 'name', 'year', 'category_id', 'description',
+            'rating', 'review_count', 'score_sum', 'updated_at',
+        ),
+        convert_title,
+        depends_on=('categories',),
+        verbose_name='Произведения',
+        csv_columns=(
+            ('id', 'id'), ('name', 'name'), ('year', 'year'),
+            ('category', 'category_id'), ('description', 'description'),
+        ),
+        optional_columns=('description',),
+    ),
+    CsvTable(
+        'genre_title', 'genre_title.csv', Title.genre.through,
+        ('id', 'title_id', 'genre_id'),
+        convert_genre_title,
+        depends_on=('titles', 'genres'),
+        verbose_name='Связи жанр-произведение',
+        csv_columns=(
+            ('id', 'id'), ('title_id', 'title_id'), ('genre_id', 'genre_id'),
+        ),
+    ),
+    CsvTable(
+        'reviews', 'review.csv', Review,
+        (
+            'id', 'title_id', 'text', 'author_id', 'score', 'pub_date',
+            'updated_at',
+        ),
+        convert_review,
+        depends_on=('titles', 'users'),
+        verbose_name='Отзывы',
+        csv_columns=(
+            ('id', 'id'), ('title_id', 'title_id'), ('text', 'text'),
+            ('author', 'author_id'), ('score', 'score'),
+            ('pub_date', 'pub_date'),
+        ),
+    ),
+    CsvTable(
+        'comments', 'comments.csv', Comment,
+        ('id', 'review_id', 'text', 'author_id', 'pub_date', 'updated_at'),
+        convert_comment,
+        depends_on=('reviews', 'users'),
+        verbose_name='Комментарии',
+        csv_columns=(
+            ('id', 'id'), ('review_id', 'review_id'), ('text', 'text'),
+            ('author', 'author_id'), ('pub_date', 'pub_date'),
+        ),
+    ),
+)
+
+
+def dependency_levels(tables):
+    """Группирует таблицы по уровням графа зависимостей.
+
+    Таблицы одного уровня не ссылаются друг на друга и могут
+    загружаться независимо; каждый уровень зависит только от предыдущих.
+    """
+    pending = {table.name: table for table in tables}
+    levels = []
+    while pending:
+        level = [
+            table for table in pending.values()
+            if not pending.keys() & set(table.depends_on)
+        ]
+        if not level:
+            raise ValueError(
+                f'Циклическая зависимость таблиц: {", ".join(pending)}'
+            )
+        levels.append(level)
+        for table in level:
+            del pending[table.name]
+    return levels
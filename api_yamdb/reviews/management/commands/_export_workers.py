@@ -0,0 +1,32 @@
+'''Запись пачек CSV для export_db, общая для последовательного и
+параллельного режимов. Модуль не зависит от Django, поэтому функции
+можно выполнять в дочерних процессах без django.setup().'''
+import csv
+import gzip
+import io
+from datetime import datetime, timezone
+
+
+def format_value(value, timestamp_format):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).strftime(timestamp_format)
+    return value
+
+
+def format_chunk(rows, timestamp_format, compress):
+    '''Превращает строки таблицы в байты CSV без заголовка.
+
+    При `compress` пачка сжимается отдельным членом gzip: склеенные
+    члены — корректный gzip-файл, поэтому пачки можно сжимать
+    независимо и дописывать в файл по порядку.
+    '''
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerows(
+        [format_value(value, timestamp_format) for value in row]
+        for row in rows
+    )
+    data = buffer.getvalue().encode('utf-8')
+    return gzip.compress(data, mtime=0) if compress else data
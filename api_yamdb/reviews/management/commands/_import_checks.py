@@ -0,0 +1,417 @@
+'''Проверка входных файлов import_db до первой записи в базу.
+
+Таблицы читаются один раз в порядке зависимостей, в памяти остаются
+только ключи: id (IdSet) и множества значений уникальных полей,
+упакованных в одно число. Таблица, где числа совпали, читается
+повторно: сравниваются сами значения и находятся номера строк.
+Правила выводятся из моделей: внешние ключи, уникальные поля и
+ограничения, валидаторы целых полей (оценка, год) и формат дат.
+Пачки проверяются по столбцам: значение, которое повторяется в
+столбце (оценка, автор, произведение), проверяется один раз.'''
+from array import array
+from bisect import bisect_left
+from collections import defaultdict, deque
+from datetime import datetime
+from itertools import repeat
+from operator import itemgetter
+
+from django.core.exceptions import ValidationError
+from django.db import models
+
+from reviews.dataset import dependency_levels, parse_timestamp
+from reviews.management.commands._import_workers import CONVERT_ERRORS
+from reviews.models import ImportManifest, User
+
+CHECK_ERRORS = (ValueError, ValidationError)
+# Сколько строк базы сверяется одним запросом в confirm_conflicts.
+CONFLICTS_BATCH_SIZE = 500
+INT64_RANGE = range(-1 << 63, 1 << 63)
+
+
+class IdSet:
+    '''Множество id. Id в файлах и в базе обычно идут по возрастанию:
+    такие хранятся в array('q') по 8 байт, остальные — в set.'''
+
+    def __init__(self, ids=()):
+        self.ordered = array('q')
+        self.other = set()
+        for pk in ids:
+            self.add(pk)
+
+    def add(self, pk):
+        '''Добавляет id; False, если он уже был.'''
+        if pk in INT64_RANGE and (
+            not self.ordered or pk > self.ordered[-1]
+        ):
+            self.ordered.append(pk)
+            return True
+        if pk in self:
+            return False
+        self.other.add(pk)
+        return True
+
+    def __contains__(self, pk):
+        index = bisect_left(self.ordered, pk)
+        return (
+            index < len(self.ordered) and self.ordered[index] == pk
+            or pk in self.other
+        )
+
+
+def pack_key(key):
+    '''Ключ уникальности одним 64-битным числом. Пара неотрицательных
+    id меньше 2**31 упаковывается без потерь, остальное — хешем:
+    совпадение чисел ещё не значит совпадения значений.'''
+    if len(key) == 1 and type(key[0]) is int and abs(key[0]) < 1 << 63:
+        return key[0]
+    if (
+        len(key) == 2 and type(key[0]) is type(key[1]) is int
+        and 0 <= key[0] < 1 << 31 and 0 <= key[1] < 1 << 31
+    ):
+        return key[0] << 32 | key[1]
+    return hash(key)
+
+
+def parse_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'некорректное число {value!r}')
+
+
+def error_message(error):
+    if isinstance(error, ValidationError):
+        return ' '.join(error.messages)
+    return str(error)
+
+
+def check_each(check, column):
+    '''Проверка столбца по одному значению: (значения, [(индекс, ошибка)]).
+    Значение ошибочной строки заменяется на None.'''
+    values, errors = [], []
+    for index, value in enumerate(column):
+        try:
+            values.append(check(value))
+        except CHECK_ERRORS as error:
+            values.append(None)
+            errors.append((index, error_message(error)))
+    return values, errors
+
+
+def by_distinct(check):
+    '''Проверка столбца с повторяющимися значениями: каждое различное
+    значение проверяется один раз.'''
+    def check_column(column):
+        distinct = list(set(column))
+        checked, errors = check_each(check, distinct)
+        results = dict(zip(distinct, checked))
+        values = [results[value] for value in column]
+        if not errors:
+            return values, []
+        bad = {distinct[index]: message for index, message in errors}
+        return values, [
+            (index, bad[value]) for index, value in enumerate(column)
+            if value in bad
+        ]
+    return check_column
+
+
+def all_at_once(check, fallback=None):
+    '''Проверка столбца с различными значениями (id): весь
+    столбец одним map, по одному значению — только при ошибке.'''
+    def check_column(column):
+        try:
+            return list(map(check, column)), []
+        except CHECK_ERRORS:
+            return check_each(fallback or check, column)
+    return check_column
+
+
+def check_timestamps(column):
+    '''Даты столбца: тот же разбор, что в parse_timestamp, но без
+    вызова функции и aware-значения на каждую строку.'''
+    try:
+        if all(map(str.endswith, column, repeat('Z'))):
+            deque(map(
+                datetime.fromisoformat,
+                map(itemgetter(slice(None, -1)), column),
+            ), maxlen=0)
+            return column, []
+    except (TypeError, ValueError):
+        pass
+    return check_each(parse_timestamp, column)
+
+
+class InputChecks:
+    '''Проверка всех таблиц импорта одним проходом.
+
+    `read_chunks(table)` отдаёт пачки (заголовок, [(строка, значения)]),
+    как в import_db. Найденные ошибки — список
+    (таблица, номер строки, сообщение), по одной записи на строку.
+    Строки базы учитываются: на них можно ссылаться, с ними не должны
+    совпадать уникальные значения. После `clear` в базе остаются только
+    суперпользователи; при `incremental` строки базы с id из CSV
+    будут перезаписаны, а строки из манифеста, которых нет в CSV, —
+    удалены.
+    '''
+
+    def __init__(self, tables, read_chunks, database,
+                 clear=False, incremental=False):
+        self.tables = tables
+        self.read_chunks = read_chunks
+        self.database = database
+        self.clear = clear
+        self.incremental = incremental
+        self.by_model = {table.model: table for table in tables}
+        self.ids = {}
+        self.errors = []
+        self.rows = 0
+
+    def run(self):
+        for level in dependency_levels(self.tables):
+            for table in level:
+                self.check_table(table)
+        return self.errors
+
+    def existing(self, table):
+        queryset = table.model._base_manager.using(self.database)
+        if not self.clear:
+            return queryset
+        if table.model is User:
+            return queryset.filter(is_superuser=True)
+        return queryset.none()
+
+    def unique_fields(self, table):
+        '''Наборы полей `csv_columns`, значения которых уникальны.'''
+        meta = table.model._meta
+        groups = [
+            (field.name,) for field in meta.concrete_fields
+            if field.unique and not field.primary_key
+        ]
+        groups.extend(tuple(fields) for fields in meta.unique_together)
+        groups.extend(
+            tuple(constraint.fields) for constraint in meta.constraints
+            if isinstance(constraint, models.UniqueConstraint)
+            and not constraint.condition
+        )
+        attnames = [attname for _, attname in table.csv_columns]
+        result = []
+        for group in groups:
+            columns = [meta.get_field(name).attname for name in group]
+            if set(columns) <= set(attnames):
+                result.append((
+                    ', '.join(table.csv_columns[attnames.index(column)][0]
+                              for column in columns),
+                    [attnames.index(column) for column in columns],
+                ))
+        return result
+
+    def column_check(self, table, attname):
+        '''Функция: столбец пачки -> (значения, [(индекс, ошибка)]).'''
+        field = table.model._meta.get_field(attname)
+        if field.primary_key:
+            return all_at_once(int, parse_int)
+        if field.is_relation:
+            return by_distinct(self.reference_check(field))
+        if isinstance(field, models.DateTimeField):
+            return check_timestamps
+        if isinstance(field, models.IntegerField):
+            def check_integer(value):
+                value = parse_int(value)
+                field.run_validators(value)
+                return value
+            return by_distinct(check_integer)
+        return None
+
+    def reference_check(self, field):
+        target = self.by_model[field.related_model]
+
+        def check_reference(value):
+            if not value and field.null:
+                return None
+            key = parse_int(value)
+            csv_ids, db_ids = self.ids[target.name]
+            if key not in csv_ids and key not in db_ids:
+                raise ValueError(
+                    f'{key}: нет связанной записи в {target.db_table}'
+                )
+            return key
+        return check_reference
+
+    def check_table(self, table):
+        checks = [
+            (position, name, check)
+            for position, (name, attname) in enumerate(table.csv_columns)
+            for check in [self.column_check(table, attname)]
+            if check
+        ]
+        unique = [
+            (label, positions, set(),
+             self.existing_keys(table, positions), set())
+            for label, positions in self.unique_fields(table)
+        ]
+        csv_ids = IdSet()
+        self.ids[table.name] = (csv_ids, IdSet(
+            self.existing(table).order_by('pk')
+            .values_list('pk', flat=True).iterator()
+        ))
+        # Сообщения об ошибках по номерам строк: только ошибочные строки.
+        found = defaultdict(list)
+        conflicts = []
+        for header, chunk in self.read_chunks(table):
+            try:
+                getter = table.row_getter(header)
+            except KeyError as error:
+                for line_num, _ in chunk:
+                    found[line_num].append(str(error))
+                continue
+            self.rows += len(chunk)
+            chunk, columns, problems = self.check_columns(
+                chunk, getter, checks, found
+            )
+            if not chunk:
+                continue
+            self.check_ids(columns[0], problems, csv_ids)
+            for group in unique:
+                self.check_unique(chunk, columns, problems, group, conflicts)
+            for index, messages in problems.items():
+                found[chunk[index][0]].extend(messages)
+        if any(group[4] for group in unique):
+            self.find_duplicates(table, checks, unique, found)
+        self.check_conflicts(table, csv_ids, conflicts, found)
+        self.errors.extend(
+            (table, line_num, '; '.join(found[line_num]))
+            for line_num in sorted(found)
+        )
+
+    def check_ids(self, column, problems, csv_ids):
+        for index, pk in enumerate(column):
+            # id запоминается и у ошибочной строки: ссылки на неё
+            # не должны давать в отчёте каскад ошибок.
+            if pk is not None and not csv_ids.add(pk):
+                problems[index].append(f'повторяющийся id={pk}')
+
+    def existing_keys(self, table, positions):
+        '''Упакованные значения уникальных полей строк базы -> pk.'''
+        keys = {}
+        for row in self.existing(table).values_list(*(
+            table.csv_columns[position][1] for position in positions
+        ), 'pk').iterator():
+            keys.setdefault(pack_key(row[:-1]), row[-1])
+        return keys
+
+    def check_columns(self, chunk, getter, checks, found):
+        '''Разобранные строки пачки, их столбцы и ошибки значений:
+        {индекс строки: [сообщения]}. Строка, которую не удалось
+        разобрать (короче заголовка), попадает в `found`, как ошибка
+        строки в convert_chunk.'''
+        rows, values = [], []
+        for line_num, row in chunk:
+            try:
+                values.append(getter(row))
+            except CONVERT_ERRORS as error:
+                found[line_num].append(str(error))
+                continue
+            rows.append((line_num, row))
+        problems = defaultdict(list)
+        if not rows:
+            return rows, [], problems
+        columns = list(zip(*values))
+        for position, name, check in checks:
+            columns[position], errors = check(columns[position])
+            for index, message in errors:
+                problems[index].append(f'{name}: {message}')
+        return rows, columns, problems
+
+    def check_unique(self, chunk, columns, problems, group, conflicts):
+        '''Ключи строк пачки: совпавшие с прежними строками CSV
+        запоминаются для повторного чтения, совпавшие со строкой базы
+        с другим id — для сверки значений в check_conflicts.'''
+        label, positions, seen, existing, collided = group
+        keys = zip(*(columns[position] for position in positions))
+        for index, key in enumerate(keys):
+            if index in problems or None in key:
+                continue
+            packed = pack_key(key)
+            if packed in seen:
+                collided.add(packed)
+            seen.add(packed)
+            pk = existing.get(packed)
+            if pk is not None and pk != columns[0][index]:
+                conflicts.append(
+                    (chunk[index][0], label, positions, key, pk)
+                )
+
+    def find_duplicates(self, table, checks, unique, found):
+        '''Повторное чтение таблицы ради строк с совпавшими ключами:
+        значения сравниваются сами по себе, повтор получает номер
+        строки, где значение встретилось впервые.'''
+        skip = set(found)
+        groups = [
+            (label, positions, collided, {})
+            for label, positions, _, _, collided in unique if collided
+        ]
+        for header, chunk in self.read_chunks(table):
+            chunk, columns, _ = self.check_columns(
+                chunk, table.row_getter(header), checks, defaultdict(list)
+            )
+            if not chunk:
+                continue
+            for label, positions, collided, first in groups:
+                keys = zip(*(columns[position] for position in positions))
+                for (line_num, _), key in zip(chunk, keys):
+                    if (
+                        line_num in skip or None in key
+                        or pack_key(key) not in collided
+                    ):
+                        continue
+                    if key in first:
+                        found[line_num].append(
+                            f'{label}: значение уже есть в строке '
+                            f'{first[key]}'
+                        )
+                    else:
+                        first[key] = line_num
+
+    def check_conflicts(self, table, csv_ids, conflicts, found):
+        '''Совпадения уникальных значений со строками базы.
+
+        Совпадение упакованных ключей сверяется со значениями строки
+        базы. При инкрементальном импорте строка базы не мешает, если
+        она будет перезаписана (её id есть в CSV) или удалена.
+        '''
+        conflicts = self.confirm_conflicts(table, conflicts)
+        if self.incremental and conflicts:
+            managed = set(
+                ImportManifest.objects.using(self.database)
+                .filter(table=table.name)
+                .values_list('row_id', flat=True).iterator()
+            )
+            conflicts = [
+                conflict for conflict in conflicts
+                if conflict[2] not in csv_ids
+                and str(conflict[2]) not in managed
+            ]
+        for line_num, label, pk in conflicts:
+            found[line_num].append(
+                f'{label}: значение занято строкой базы id={pk}'
+            )
+
+    def confirm_conflicts(self, table, conflicts):
+        '''(строка, поля, id строки базы) для настоящих совпадений.'''
+        confirmed = []
+        for start in range(0, len(conflicts), CONFLICTS_BATCH_SIZE):
+            batch = conflicts[start:start + CONFLICTS_BATCH_SIZE]
+            rows = {
+                row[0]: row[1:] for row in self.existing(table).filter(
+                    pk__in=[pk for *_, pk in batch]
+                ).values_list('pk', *(
+                    attname for _, attname in table.csv_columns
+                ))
+            }
+            confirmed.extend(
+                (line_num, label, pk)
+                for line_num, label, positions, key, pk in batch
+                if tuple(rows[pk][position] for position in positions) == key
+            )
+        return confirmed
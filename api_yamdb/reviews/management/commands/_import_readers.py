@@ -0,0 +1,164 @@
+'''Потоковое чтение входных файлов import_db: CSV и JSON Lines, в том
+числе сжатых gzip, bz2 и xz. Строки читаются по одной и отдаются
+списками значений в порядке заголовка, без словаря на строку, поэтому
+память не зависит от размера файла. Модуль не зависит от Django.'''
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import mmap
+import os
+from contextlib import contextmanager
+from itertools import chain
+
+OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+FORMATS = ('.csv', '.jsonl')
+# Несжатые файлы от этого размера читаются через mmap.
+MMAP_THRESHOLD = 64 * 1024 * 1024
+# Прочитанные страницы mmap отдаются ядру шагами такого размера.
+MMAP_RELEASE_STEP = 4 * 1024 * 1024
+
+
+def find_input(directory, filename):
+    '''Путь к файлу таблицы в любом поддерживаемом виде.
+
+    Для 'review.csv' проверяются review.csv, review.csv.gz, ...,
+    review.jsonl.xz; если ни одного нет, возвращается путь к CSV.
+    '''
+    stem = os.path.splitext(filename)[0]
+    for extension in FORMATS:
+        for suffix in ('', *OPENERS):
+            path = os.path.join(directory, stem + extension + suffix)
+            if os.path.exists(path):
+                return path
+    return os.path.join(directory, filename)
+
+
+class MappedLines:
+    '''Строки файла через mmap: без копий в буфер чтения.
+
+    Страницы, которые уже прочитаны, периодически отдаются ядру
+    (MADV_DONTNEED), чтобы отображение не копилось в RSS процесса.
+    '''
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.released = 0
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            self.map.madvise(mmap.MADV_SEQUENTIAL)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.map.readline()
+        if not line:
+            raise StopIteration
+        self.release()
+        return line.decode('utf-8')
+
+    def release(self):
+        position = (
+            self.map.tell() // mmap.ALLOCATIONGRANULARITY
+            * mmap.ALLOCATIONGRANULARITY
+        )
+        if (
+            position - self.released >= MMAP_RELEASE_STEP
+            and hasattr(mmap, 'MADV_DONTNEED')
+        ):
+            self.map.madvise(
+                mmap.MADV_DONTNEED, self.released, position - self.released
+            )
+            self.released = position
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_lines(path, mmap_threshold=MMAP_THRESHOLD):
+    '''Текстовый поток строк файла с учётом сжатия.'''
+    opener = OPENERS.get(os.path.splitext(path)[1])
+    if opener:
+        return opener(path, 'rt', encoding='utf-8', newline='')
+    if os.path.getsize(path) >= max(mmap_threshold, 1):
+        return MappedLines(path)
+    return open(path, encoding='utf-8', newline='')
+
+
+def csv_rows(lines):
+    reader = csv.reader(lines)
+    header = next(reader, [])
+    return header, ((reader.line_num, row) for row in reader if row)
+
+
+def json_value(value):
+    # Значения приводятся к строкам, как в CSV: пустая строка — NULL.
+    if value is None:
+        return ''
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+class BadRow(list):
+    '''Строка JSON Lines, которую не удалось разобрать. Обращение к
+    значению даёт ValueError с причиной — как IndexError у строки CSV
+    короче заголовка, это становится ошибкой строки с её номером.'''
+
+    def __init__(self, message):
+        super().__init__()
+        self.message = message
+
+    def __getitem__(self, index):
+        raise ValueError(self.message)
+
+
+def parse_object(line):
+    '''Объект строки JSON Lines или BadRow.'''
+    try:
+        item = json.loads(line)
+    except ValueError as error:
+        return BadRow(f'некорректный JSON: {error}')
+    if not isinstance(item, dict):
+        return BadRow('строка JSON Lines должна быть объектом')
+    return item
+
+
+def jsonl_rows(lines):
+    '''JSON Lines: заголовок — ключи первого объекта.'''
+    rows = (
+        (line_num, parse_object(line))
+        for line_num, line in enumerate(lines, 1)
+        if line.strip()
+    )
+    bad = []
+    for line_num, item in rows:
+        if not isinstance(item, BadRow):
+            break
+        bad.append((line_num, item))
+    else:
+        return [], iter(bad)
+    header = list(item)
+    return header, chain(bad, (
+        (line_num, item if isinstance(item, BadRow) else [
+            json_value(item.get(name)) for name in header
+        ])
+        for line_num, item in chain([(line_num, item)], rows)
+    ))
+
+
+@contextmanager
+def open_rows(path, mmap_threshold=MMAP_THRESHOLD):
+    '''Заголовок и итератор строк файла: (номер строки, значения).'''
+    with open_lines(path, mmap_threshold) as lines:
+        if '.jsonl' in os.path.basename(path):
+            yield jsonl_rows(lines)
+        else:
+            yield csv_rows(lines)
@@ -0,0 +1,51 @@
+'''Разбор CSV для import_db, общий для последовательного и параллельного
+режимов. Модуль не импортирует модели на верхнем уровне, чтобы его можно
+было загрузить в дочернем процессе до django.setup().'''
+
+CONVERT_ERRORS = (
+    AttributeError, IndexError, KeyError, TypeError, ValueError
+)
+
+_worker_state = {}
+
+
+def convert_chunk(table, header, chunk, context):
+    '''Превращает строки CSV в кортежи значений таблицы.
+
+    Возвращает пару: [(номер строки, значения)], [(номер строки, ошибка)].
+    '''
+    try:
+        getter = table.row_getter(header)
+    except KeyError as error:
+        # В заголовке нет обязательного столбца: ошибочна каждая строка.
+        return [], [(line_num, str(error)) for line_num, _ in chunk]
+    converted = []
+    errors = []
+    for line_num, row in chunk:
+        try:
+            converted.append((line_num, table.convert(getter(row), context)))
+        except CONVERT_ERRORS as error:
+            errors.append((line_num, str(error)))
+    return converted, errors
+
+
+def init_worker(database, now):
+    import django
+    django.setup()
+
+    from django.db import connections
+
+    from reviews.dataset import TABLES
+
+    _worker_state['tables'] = {table.name: table for table in TABLES}
+    _worker_state['context'] = {
+        'now': now,
+        'adapt_datetime': connections[database].ops.adapt_datetimefield_value,
+    }
+
+
+def convert_chunk_in_worker(table_name, header, chunk):
+    return convert_chunk(
+        _worker_state['tables'][table_name], header, chunk,
+        _worker_state['context'],
+    )
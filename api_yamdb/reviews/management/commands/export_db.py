@@ -0,0 +1,146 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from reviews.dataset import CSV_TIMESTAMP_FORMAT, TABLES
+from reviews.management.commands._export_workers import format_chunk
+
+GZIP_SUFFIX = '.gz'
+
+
+class Command(BaseCommand):
+    '''Команда для выгрузки базы в CSV файлы в формате import_db.'''
+
+    help = 'Выгрузка данных из базы данных в csv'
+    # Не каталог import_db (static/data/): выгрузка без --path не
+    # должна перезаписывать исходные CSV.
+    DEFAULT_CSV_PATH = 'static/export/'
+    DEFAULT_CHUNK_SIZE = 1000
+    tables = TABLES
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            type=str,
+            default=self.DEFAULT_CSV_PATH,
+            help=f'Каталог для файлов csv (default: '
+                 f'\'{self.DEFAULT_CSV_PATH}\')'
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help=f'База данных для выгрузки (default: \'{DEFAULT_DB_ALIAS}\')'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=self.DEFAULT_CHUNK_SIZE,
+            help='Число строк, читаемых и записываемых за раз '
+                 f'(default: {self.DEFAULT_CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Число процессов для записи CSV (default: 1 — без пула)'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжимать файлы (имена с суффиксом .gz)'
+        )
+
+    def handle(self, *args, **options):
+        self.csv_path = options['path']
+        self.chunk_size = options['chunk_size']
+        self.database = connections[options['database']].alias
+        self.compress = options['gzip']
+
+        if self.chunk_size <= 0:
+            raise CommandError('--chunk-size должен быть больше нуля')
+        if options['workers'] <= 0:
+            raise CommandError('--workers должен быть больше нуля')
+        os.makedirs(self.csv_path, exist_ok=True)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Старт выгрузки в \'{self.csv_path}\'...')
+        )
+        if options['workers'] == 1:
+            for table in self.tables:
+                self.export_table(table, self.format_serial)
+        else:
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                for table in self.tables:
+                    self.export_table(
+                        table, self.format_parallel(pool, options['workers'])
+                    )
+        self.stdout.write(self.style.SUCCESS('Данные успешно выгружены!'))
+
+    def get_csv_path(self, table):
+        filename = table.filename + (GZIP_SUFFIX if self.compress else '')
+        return os.path.join(self.csv_path, filename)
+
+    def read_chunks(self, table):
+        '''Строки таблицы пачками по chunk_size через iterator().'''
+        rows = table.model.objects.using(self.database).order_by(
+            'pk'
+        ).values_list(
+            *(field for _, field in table.csv_columns)
+        ).iterator(chunk_size=self.chunk_size)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def format_serial(self, chunks):
+        for chunk in chunks:
+            yield len(chunk), format_chunk(
+                chunk, CSV_TIMESTAMP_FORMAT, self.compress
+            )
+
+    def format_parallel(self, pool, workers):
+        '''Пачки таблицы форматируются и сжимаются в пуле процессов.
+
+        Результаты записываются в порядке чтения, поэтому файл
+        совпадает с последовательной выгрузкой.
+        '''
+        def format_chunks(chunks):
+            pending = deque()
+            for chunk in chunks:
+                pending.append((len(chunk), pool.submit(
+                    format_chunk, chunk, CSV_TIMESTAMP_FORMAT, self.compress
+                )))
+                # Окно из нескольких пачек на процесс ограничивает память.
+                if len(pending) >= workers * 2:
+                    size, future = pending.popleft()
+                    yield size, future.result()
+            while pending:
+                size, future = pending.popleft()
+                yield size, future.result()
+
+        return format_chunks
+
+    def export_table(self, table, format_chunks):
+        '''Пишет таблицу во временный файл и подменяет им прежний.'''
+        started = time.perf_counter()
+        path = self.get_csv_path(table)
+        total = 0
+        with open(f'{path}.tmp', 'wb') as file:
+            header = [[name for name, _ in table.csv_columns]]
+            file.write(format_chunk(header, CSV_TIMESTAMP_FORMAT,
+                                    self.compress))
+            for size, data in format_chunks(self.read_chunks(table)):
+                file.write(data)
+                total += size
+        os.replace(f'{path}.tmp', path)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{table.verbose_name} выгружены: {total} строк, '
+            f'{total / elapsed if elapsed else 0:.0f} строк/с'
+        ))
@@ -1,17 +1,85 @@
-import csv
+import hashlib
 import os
-import sqlite3
-from datetime import datetime
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.utils import timezone
+
+from reviews.dataset import TABLES, dependency_levels
+from reviews.management.commands._import_checks import InputChecks
+from reviews.management.commands._import_readers import (
+    MMAP_THRESHOLD, find_input, open_rows
+)
+from reviews.management.commands._import_workers import (
+    CONVERT_ERRORS, convert_chunk, convert_chunk_in_worker, init_worker
+)
+from reviews.models import (
+    ImportCheckpoint, ImportManifest, Review, Title, User
+)
+from reviews.signals import data_imported
+
+# Настройки SQLite на время импорта: журнал транзакции остаётся,
+# но без fsync на каждую страницу и с большим кэшем страниц.
+IMPORT_PRAGMAS = {
+    'synchronous': 'OFF',
+    'cache_size': '-65536',
+    'temp_store': 'MEMORY',
+}
+# С контрольными точками зафиксированные пачки должны пережить сбой.
+CHECKPOINT_PRAGMAS = {**IMPORT_PRAGMAS, 'synchronous': 'NORMAL'}
+MAX_REPORTED_ERRORS = 20
+# Сколько ключей подставляется в один запрос `id IN (...)`.
+LOOKUP_BATCH_SIZE = 500
+
+
+def batched(items, size):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def hash_row(header, row):
+    '''Хэш строки CSV, не зависящий от порядка столбцов.'''
+    return hashlib.blake2b(
+        '\x1e'.join(
+            f'{name}\x1f{value}' for name, value in sorted(zip(header, row))
+        ).encode(),
+        digest_size=16,
+    ).hexdigest()
+
+
+class ImportFailed(Exception):
+    '''Откатывает транзакцию импорта, если найдены ошибочные строки.'''
+
+
+def skip_rows(chunks, count):
+    '''Пачки (заголовок, строки) без первых `count` строк.'''
+    for header, chunk in chunks:
+        if count >= len(chunk):
+            count -= len(chunk)
+            continue
+        yield header, chunk[count:]
+        count = 0
 
 
 class Command(BaseCommand):
-    '''Команда для импорта данных из CSV файлов напрямую в SQLite.'''
+    '''Команда для пакетного импорта данных из CSV файлов в базу.'''
 
-    help = 'Загрузка данных из csv в SQLite'
+    help = 'Загрузка данных из csv в базу данных'
     DEFAULT_CSV_PATH = 'static/data/'
-    DB_PATH = 'db.sqlite3'
+    DEFAULT_CHUNK_SIZE = 1000
+    DEFAULT_COMMIT_EVERY = 100000
+    mmap_threshold = MMAP_THRESHOLD
+    tables = TABLES
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -25,232 +93,596 @@ class Command(BaseCommand):
             action='store_true',
             help='Очистить базу перед импортом'
         )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help=f'База данных для импорта (default: \'{DEFAULT_DB_ALIAS}\')'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=self.DEFAULT_CHUNK_SIZE,
+            help='Число строк в одном executemany '
+                 f'(default: {self.DEFAULT_CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Число процессов для разбора CSV (default: 1 — без пула)'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Применить только строки, изменившиеся с прошлого '
+                 'импорта с --incremental'
+        )
+        parser.add_argument(
+            '--commit-every',
+            type=int,
+            help='Фиксировать импорт пачками по столько строк и '
+                 'записывать контрольную точку для --resume'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Продолжить прерванный импорт с --commit-every с '
+                 'контрольной точки'
+        )
+        parser.add_argument(
+            '--no-validate',
+            action='store_true',
+            help='Не проверять файлы перед импортом: ошибки найдутся '
+                 'только при записи'
+        )
 
     def handle(self, *args, **options):
         self.csv_path = options['path']
-
-        if not os.path.exists(self.csv_path):
-            self.stdout.write(
-                self.style.ERROR(f'Каталог \'{self.csv_path}\' не существует!')
-            )
-            return
+        self.chunk_size = options['chunk_size']
+        self.connection = connections[options['database']]
+        self.errors = {}
+        self.rating_titles = set()
+        self.check_options(options)
+        self.commit_every = options['commit_every'] or (
+            options['resume'] and self.DEFAULT_COMMIT_EVERY
+        )
 
         self.stdout.write(
             self.style.SUCCESS(f'Старт импорта из \'{self.csv_path}\'...')
         )
+        self.context = {
+            'now': self.connection.ops.adapt_datetimefield_value(
+                timezone.now()
+            ),
+            'adapt_datetime': self.connection.ops.adapt_datetimefield_value,
+        }
+        if not options['no_validate']:
+            self.validate_inputs(options)
 
+        saved_pragmas = self.set_pragmas(
+            CHECKPOINT_PRAGMAS if self.commit_every else IMPORT_PRAGMAS
+        )
         try:
-            conn = sqlite3.connect(self.DB_PATH)
-            cursor = conn.cursor()
-
-            if options['clear']:
-                self.clear_data(cursor)
-
-            self.import_users(cursor)
-            self.import_categories(cursor)
-            self.import_genres(cursor)
-            self.import_titles(cursor)
-            self.import_genre_title(cursor)
-            self.import_reviews(cursor)
-            self.import_comments(cursor)
-
-            conn.commit()
-            self.stdout.write(
-                self.style.SUCCESS('Данные успешно загружены!')
-            )
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f'Ошибка импорта: {str(e)}')
+            if self.commit_every:
+                self.import_checkpointed(options)
+            else:
+                self.import_atomic(options)
+        except ImportFailed as error:
+            self.report_errors()
+            raise CommandError(
+                str(error) or 'Импорт отменён, база не изменена.'
             )
         finally:
-            conn.close()
+            self.set_pragmas(saved_pragmas)
+
+        self.stdout.write(self.style.SUCCESS('Данные успешно загружены!'))
+
+    def check_options(self, options):
+        if not os.path.exists(self.csv_path):
+            raise CommandError(f'Каталог \'{self.csv_path}\' не существует!')
+        if self.chunk_size <= 0:
+            raise CommandError('--chunk-size должен быть больше нуля')
+        if options['workers'] <= 0:
+            raise CommandError('--workers должен быть больше нуля')
+        if options['incremental'] and (
+            options['clear'] or options['workers'] != 1
+        ):
+            raise CommandError(
+                '--incremental несовместим с --clear и --workers'
+            )
+        checkpointed = options['commit_every'] or options['resume']
+        if checkpointed and (
+            options['incremental'] or options['workers'] != 1
+        ):
+            raise CommandError(
+                '--commit-every и --resume несовместимы с --incremental '
+                'и --workers'
+            )
+        if (options['commit_every'] or 1) <= 0:
+            raise CommandError('--commit-every должен быть больше нуля')
+        if options['resume'] and options['clear']:
+            raise CommandError('--resume несовместим с --clear')
+
+    def validate_inputs(self, options):
+        '''Проверка всех файлов до записи: внешние ключи, уникальность,
+        диапазоны значений и даты. При ошибках база не открывается
+        на запись, а отчёт перечисляет все ошибочные строки.'''
+        started = time.perf_counter()
+        checks = InputChecks(
+            self.tables, self.read_chunks, self.connection.alias,
+            clear=options['clear'], incremental=options['incremental'],
+        )
+        for table, line_num, error in checks.run():
+            self.add_error(table, line_num, error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлы проверены: {checks.rows} строк за '
+            f'{time.perf_counter() - started:.2f} с'
+        ))
+        if self.errors:
+            self.report_errors()
+            raise CommandError('Импорт отменён, база не изменена.')
+
+    def import_atomic(self, options):
+        '''Весь импорт одной транзакцией.'''
+        with transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                if options['clear']:
+                    self.clear_data(cursor)
+                if options['incremental']:
+                    self.import_incremental(cursor)
+                elif options['workers'] == 1:
+                    for table in self.tables:
+                        self.import_table(cursor, table)
+                else:
+                    self.import_parallel(cursor, options['workers'])
+                self.check_foreign_keys(cursor)
+                if self.errors:
+                    raise ImportFailed
+                self.finish_import(cursor, options['incremental'])
+
+    def import_checkpointed(self, options):
+        '''Импорт пачками по commit_every строк, каждая в своей транзакции.
+
+        Вместе с пачкой фиксируется контрольная точка: таблица и число
+        её загруженных строк. `--resume` пропускает загруженное и
+        продолжает с точки; вставки игнорируют уже существующие строки,
+        так что повтор пачки после сбоя безопасен. Рейтинг,
+        последовательности и внешние ключи проверяются в последней
+        транзакции, которая и удаляет контрольную точку.
+        '''
+        source = os.path.abspath(self.csv_path)
+        checkpoints = ImportCheckpoint.objects.using(self.connection.alias)
+        names = [table.name for table in self.tables]
+        if options['resume']:
+            checkpoint = checkpoints.filter(source=source).first()
+            if checkpoint is None or checkpoint.table not in names:
+                raise CommandError(
+                    f'Нет контрольной точки импорта из \'{source}\''
+                )
+            self.stdout.write(self.style.WARNING(
+                f'Продолжение с таблицы {checkpoint.table}, '
+                f'строка {checkpoint.offset + 1}'
+            ))
+        else:
+            checkpoint = ImportCheckpoint(
+                source=source, table=names[0], offset=0
+            )
+            with transaction.atomic(using=self.connection.alias):
+                if options['clear']:
+                    with self.connection.cursor() as cursor:
+                        self.clear_data(cursor)
+                checkpoints.filter(source=source).delete()
+                checkpoint.save(using=self.connection.alias)
+        start = names.index(checkpoint.table)
+        for table in self.tables[start:]:
+            offset = checkpoint.offset if table.name == checkpoint.table else 0
+            self.import_table_checkpointed(checkpoint, table, offset)
+        with transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                self.check_foreign_keys(cursor)
+                if self.errors:
+                    raise ImportFailed(self.checkpoint_message(checkpoint))
+                self.finish_import(cursor)
+            checkpoint.delete(using=self.connection.alias)
+
+    def import_table_checkpointed(self, checkpoint, table, offset):
+        sql = self.get_insert_sql(table)
+        stats = self.start_stats(table)
+        chunks = skip_rows(self.read_chunks(table), offset)
+        while True:
+            batch, rows = [], 0
+            for header, chunk in chunks:
+                batch.append((header, chunk))
+                rows += len(chunk)
+                if rows >= self.commit_every:
+                    break
+            if not batch:
+                break
+            with transaction.atomic(using=self.connection.alias):
+                with self.connection.cursor() as cursor:
+                    for header, chunk in batch:
+                        self.load_chunk(
+                            cursor, table, sql,
+                            convert_chunk(table, header, chunk, self.context),
+                            stats,
+                        )
+                if self.errors:
+                    raise ImportFailed(self.checkpoint_message(checkpoint))
+                checkpoint.table = table.name
+                checkpoint.offset = offset = offset + rows
+                checkpoint.save(using=self.connection.alias)
+        self.report_stats(table, stats)
+
+    def checkpoint_message(self, checkpoint):
+        return (
+            'Импорт остановлен, зафиксировано до контрольной точки: '
+            f'{checkpoint.table}, строк {checkpoint.offset}. После '
+            'исправления продолжите с --resume.'
+        )
+
+    def set_pragmas(self, pragmas):
+        '''Устанавливает PRAGMA SQLite и возвращает прежние значения.'''
+        if self.connection.vendor != 'sqlite':
+            return {}
+        saved = {}
+        with self.connection.cursor() as cursor:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}')
+                saved[name] = cursor.fetchone()[0]
+                cursor.execute(f'PRAGMA {name} = {value}')
+        return saved
 
     def clear_data(self, cursor):
         '''Очистка существующих данных перед импортом.'''
         self.stdout.write(self.style.WARNING('Очистка базы...'))
-        tables = [
-            'reviews_comment',
-            'reviews_review',
-            'reviews_title_genre',
-            'reviews_title',
-            'reviews_genre',
-            'reviews_category',
-        ]
-        for table in tables:
-            cursor.execute(f'DELETE FROM {table};')
+        quote_name = self.connection.ops.quote_name
+        for table in reversed(self.tables):
+            if table.model is User:
+                continue
+            cursor.execute(f'DELETE FROM {quote_name(table.db_table)}')
+        for model in (ImportManifest, ImportCheckpoint):
+            cursor.execute(f'DELETE FROM {quote_name(model._meta.db_table)}')
         cursor.execute(
-            'DELETE FROM reviews_user WHERE is_superuser = 0;'
+            f'DELETE FROM {quote_name(User._meta.db_table)} '
+            'WHERE is_superuser = %s',
+            [False],
         )
         self.stdout.write(
             self.style.SUCCESS('База очищена!')
         )
 
-    def get_csv_path(self, filename):
-        return os.path.join(self.csv_path, filename)
-
-    def import_users(self, cursor):
-        with open(
-            self.get_csv_path('users.csv'),
-            mode='r',
-            encoding='utf-8'
-        ) as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                cursor.execute(
-                    '''
-                    INSERT OR IGNORE INTO reviews_user (
-                        id, password, last_login, is_superuser, username,
-                        first_name, last_name, email, is_staff, is_active,
-                        date_joined, role, bio
-                    ) VALUES (?, \'\', NULL, 0, ?, \'\', ?, ?, 0, 1, ?, ?, ?)
-                    ''',
-                    (
-                        row['id'],
-                        row['username'],
-                        row['email'],
-                        row['email'],
-                        datetime.now().isoformat(),
-                        row.get('role', 'user'),
-                        row.get('bio', ''),
-                    )
-                )
-        self.stdout.write(
-            self.style.SUCCESS('Пользователи загружены')
+    def get_insert_sql(self, table):
+        ops = self.connection.ops
+        return '{} {} ({}) VALUES ({}) {}'.format(
+            ops.insert_statement(ignore_conflicts=True),
+            ops.quote_name(table.db_table),
+            ', '.join(map(ops.quote_name, table.columns)),
+            ', '.join(['%s'] * len(table.columns)),
+            ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+        ).rstrip()
+
+    def read_chunks(self, table):
+        '''Читает файл таблицы пачками по chunk_size строк:
+        (заголовок, пачка). Формат и сжатие — по имени файла.'''
+        with open_rows(
+            find_input(self.csv_path, table.filename), self.mmap_threshold
+        ) as (header, rows):
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    return
+                yield header, chunk
+
+    def import_table(self, cursor, table):
+        sql = self.get_insert_sql(table)
+        stats = self.start_stats(table)
+        for header, chunk in self.read_chunks(table):
+            self.load_chunk(
+                cursor, table, sql,
+                convert_chunk(table, header, chunk, self.context), stats,
+            )
+        self.report_stats(table, stats)
+
+    def import_parallel(self, cursor, workers):
+        '''Разбор CSV в пуле процессов, загрузка по уровням зависимостей.
+
+        Пачки всех таблиц одного уровня разбираются одновременно,
+        а вставка идёт в одной транзакции в порядке чтения, поэтому
+        результат совпадает с последовательным импортом.
+        '''
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(self.connection.alias, self.context['now']),
+        ) as pool:
+            for level in dependency_levels(self.tables):
+                self.import_level(cursor, pool, workers, level)
+
+    def import_level(self, cursor, pool, workers, level):
+        sql = {table.name: self.get_insert_sql(table) for table in level}
+        stats = {table.name: self.start_stats(table) for table in level}
+        readers = deque(
+            (table, self.read_chunks(table)) for table in level
         )
+        pending = deque()
+        while readers or pending:
+            # Окно из нескольких пачек на процесс ограничивает память.
+            while readers and len(pending) < workers * 2:
+                table, chunks = readers.popleft()
+                chunk = next(chunks, None)
+                if chunk is None:
+                    continue
+                pending.append((table, pool.submit(
+                    convert_chunk_in_worker, table.name, *chunk
+                )))
+                readers.append((table, chunks))
+            if not pending:
+                break
+            table, future = pending.popleft()
+            self.load_chunk(
+                cursor, table, sql[table.name], future.result(),
+                stats[table.name],
+            )
+            stats[table.name]['elapsed'] = (
+                time.perf_counter() - stats[table.name]['started']
+            )
+        for table in level:
+            self.report_stats(table, stats[table.name])
 
-    def import_categories(self, cursor):
-        with open(
-            self.get_csv_path('category.csv'),
-            mode='r',
-            encoding='utf-8'
-        ) as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                cursor.execute(
-                    '''
-                    INSERT OR IGNORE INTO reviews_category
-                    (id, name, slug) VALUES (?, ?, ?)
-                    ''',
-                    (row['id'], row['name'], row['slug'])
-                )
-        self.stdout.write(
-            self.style.SUCCESS('Категории загружены')
+    def start_stats(self, table):
+        return {
+            'total': 0, 'inserted': 0, 'elapsed': 0,
+            'started': time.perf_counter(),
+        }
+
+    def load_chunk(self, cursor, table, sql, result, stats):
+        converted, errors = result
+        for line_num, error in errors:
+            self.add_error(table, line_num, error)
+        stats['total'] += len(converted) + len(errors)
+        if converted:
+            stats['inserted'] += self.insert_chunk(
+                cursor, table, sql, converted
+            )
+
+    def report_stats(self, table, stats):
+        elapsed = (
+            stats['elapsed'] or time.perf_counter() - stats['started']
         )
+        total = stats['total']
+        self.stdout.write(self.style.SUCCESS(
+            f'{table.verbose_name} загружены: {stats["inserted"]} из '
+            f'{total} строк, {total / elapsed if elapsed else 0:.0f} строк/с'
+        ))
+
+    def insert_chunk(self, cursor, table, sql, chunk):
+        '''Вставляет пачку одним executemany.
+
+        Если пачка не прошла, строки повторяются по одной, чтобы
+        указать в отчёте конкретные ошибочные строки.
+        '''
+        try:
+            with transaction.atomic(using=self.connection.alias):
+                cursor.executemany(sql, [values for _, values in chunk])
+                return max(cursor.rowcount, 0)
+        except DatabaseError:
+            pass
+        inserted = 0
+        for line_num, values in chunk:
+            try:
+                with transaction.atomic(using=self.connection.alias):
+                    cursor.execute(sql, values)
+                    inserted += max(cursor.rowcount, 0)
+            except DatabaseError as error:
+                self.add_error(table, line_num, error)
+        return inserted
 
-    def import_genres(self, cursor):
-        with open(
-            self.get_csv_path('genre.csv'),
-            mode='r',
-            encoding='utf-8'
-        ) as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                cursor.execute(
-                    '''
-                    INSERT OR IGNORE INTO reviews_genre
-                    (id, name, slug) VALUES (?, ?, ?)
-                    ''',
-                    (row['id'], row['name'], row['slug'])
+    def check_foreign_keys(self, cursor):
+        '''Проверка внешних ключей до фиксации транзакции.'''
+        if self.connection.vendor != 'sqlite':
+            try:
+                self.connection.check_constraints(
+                    [table.db_table for table in self.tables]
                 )
-        self.stdout.write(
-            self.style.SUCCESS('Жанры загружены')
+            except DatabaseError as error:
+                self.errors.setdefault('constraints', []).append(
+                    (None, str(error))
+                )
+            return
+        by_db_table = {table.db_table: table for table in self.tables}
+        for table in self.tables:
+            cursor.execute(
+                'PRAGMA foreign_key_check(%s)'
+                % self.connection.ops.quote_name(table.db_table)
+            )
+            for _, rowid, parent, _ in cursor.fetchall():
+                self.add_error(
+                    by_db_table[table.db_table], f'id={rowid}',
+                    f'нет связанной записи в {parent}',
+                )
+
+    def import_incremental(self, cursor):
+        '''Применяет только строки CSV, изменившиеся с прошлого импорта.
+
+        Хэши загруженных строк хранятся в ImportManifest. Сначала для
+        всех таблиц вычисляется разница с манифестом, затем исчезнувшие
+        из CSV строки удаляются (от зависимых таблиц к основным), а
+        новые и изменённые вставляются или обновляются. CSV читаются
+        целиком, но в базу пишется только разница.
+        '''
+        diffs = [(table, self.diff_table(table)) for table in self.tables]
+        for table, diff in reversed(diffs):
+            self.delete_rows(cursor, table, diff['deleted'])
+        for table, diff in diffs:
+            self.upsert_rows(cursor, table, diff)
+            self.save_manifest(table, diff)
+
+    def diff_table(self, table):
+        '''Строки CSV, которых нет в манифесте или чей хэш изменился,
+        и ключи манифеста, которых больше нет в CSV.'''
+        manifest = dict(
+            ImportManifest.objects.using(self.connection.alias)
+            .filter(table=table.name).values_list('row_id', 'row_hash')
         )
+        header, changed, hashes = [], [], {}
+        for header, chunk in self.read_chunks(table):
+            key_index = header.index('id')
+            for line_num, row in chunk:
+                try:
+                    key = row[key_index]
+                except CONVERT_ERRORS:
+                    # Ошибку строки сообщит convert_chunk.
+                    changed.append((line_num, row))
+                    continue
+                row_hash = hash_row(header, row)
+                if manifest.pop(key, None) != row_hash:
+                    changed.append((line_num, row))
+                    hashes[key] = row_hash
+        return {
+            'header': header,
+            'changed': changed,
+            'hashes': hashes,
+            'deleted': list(manifest),
+        }
 
-    def import_titles(self, cursor):
-        with open(
-            self.get_csv_path('titles.csv'),
-            mode='r',
-            encoding='utf-8'
-        ) as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                cursor.execute(
-                    '''
-                    INSERT OR IGNORE INTO reviews_title (
-                        id, name, year, category_id, description
-                    ) VALUES (?, ?, ?, ?, ?)
-                    ''',
-                    (row['id'], row['name'], row['year'], row['category'], '')
-                )
-        self.stdout.write(
-            self.style.SUCCESS('Произведения загружены')
+    def select_column(self, cursor, table, column, ids):
+        '''Значения `column` строк таблицы с данными id.'''
+        quote_name = self.connection.ops.quote_name
+        values = set()
+        for batch in batched(ids, LOOKUP_BATCH_SIZE):
+            cursor.execute(
+                f'SELECT {quote_name(column)} '
+                f'FROM {quote_name(table.db_table)} '
+                f'WHERE id IN ({", ".join(["%s"] * len(batch))})',
+                batch,
+            )
+            values.update(value for value, in cursor.fetchall())
+        return values
+
+    def remember_rating_titles(self, cursor, table, ids):
+        '''Произведения, чей рейтинг изменится вместе с отзывами `ids`.'''
+        if table.model is Review:
+            self.rating_titles.update(map(str, self.select_column(
+                cursor, table, 'title_id', ids
+            )))
+
+    def delete_rows(self, cursor, table, ids):
+        if not ids:
+            return
+        self.remember_rating_titles(cursor, table, ids)
+        quote_name = self.connection.ops.quote_name
+        for batch in batched(ids, LOOKUP_BATCH_SIZE):
+            cursor.execute(
+                f'DELETE FROM {quote_name(table.db_table)} '
+                f'WHERE id IN ({", ".join(["%s"] * len(batch))})',
+                batch,
+            )
+        self.stdout.write(self.style.WARNING(
+            f'{table.verbose_name}: удалено {len(ids)} строк'
+        ))
+
+    def get_update_sql(self, table, columns):
+        quote_name = self.connection.ops.quote_name
+        return 'UPDATE {} SET {} WHERE id = %s'.format(
+            quote_name(table.db_table),
+            ', '.join(f'{quote_name(column)} = %s' for column in columns),
         )
 
-    def import_genre_title(self, cursor):
-        with open(
-            self.get_csv_path('genre_title.csv'),
-            mode='r',
-            encoding='utf-8'
-        ) as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                cursor.execute(
-                    '''
-                    INSERT OR IGNORE INTO reviews_title_genre (
-                        id, title_id, genre_id
-                    ) VALUES (?, ?, ?)
-                    ''',
-                    (row['id'], row['title_id'], row['genre_id'])
-                )
-        self.stdout.write(
-            self.style.SUCCESS('Связи жанр-произведение загружены')
+    def upsert_rows(self, cursor, table, diff):
+        '''Вставляет новые строки и обновляет изменённые.
+
+        Обновляются только столбцы из CSV (и updated_at), поэтому
+        пароли пользователей и рейтинг произведений сохраняются.
+        '''
+        converted, errors = convert_chunk(
+            table, diff['header'], diff['changed'], self.context
         )
+        for line_num, error in errors:
+            self.add_error(table, line_num, error)
+        ids = [values[0] for _, values in converted]
+        existing = set(map(str, self.select_column(cursor, table, 'id', ids)))
+        self.remember_rating_titles(cursor, table, existing)
+        columns = [
+            field for _, field in table.csv_columns if field != 'id'
+        ] + [column for column in table.columns if column == 'updated_at']
+        positions = [table.columns.index(column) for column in columns]
+        inserts, updates = [], []
+        for line_num, values in converted:
+            if str(values[0]) in existing:
+                updates.append((line_num, (
+                    *(values[position] for position in positions), values[0]
+                )))
+            else:
+                inserts.append((line_num, values))
+            if table.model is Review:
+                self.rating_titles.add(str(values[1]))
+        inserted = updated = 0
+        for chunk in batched(inserts, self.chunk_size):
+            inserted += self.insert_chunk(
+                cursor, table, self.get_insert_sql(table), chunk
+            )
+        for chunk in batched(updates, self.chunk_size):
+            updated += self.insert_chunk(
+                cursor, table, self.get_update_sql(table, columns), chunk
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{table.verbose_name}: добавлено {inserted}, '
+            f'обновлено {updated} строк'
+        ))
 
-    def import_reviews(self, cursor):
-        with open(
-            self.get_csv_path('review.csv'),
-            mode='r',
-            encoding='utf-8'
-        ) as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                pub_date = datetime.strptime(
-                    row['pub_date'], '%Y-%m-%dT%H:%M:%S.%fZ'
-                ).isoformat()
-                cursor.execute(
-                    '''
-                    INSERT OR IGNORE INTO reviews_review (
-                        id, title_id, text, author_id, score, pub_date
-                    ) VALUES (?, ?, ?, ?, ?, ?)
-                    ''',
-                    (
-                        row['id'],
-                        row['title_id'],
-                        row['text'],
-                        row['author'],
-                        row['score'],
-                        pub_date
-                    )
-                )
-        self.stdout.write(
-            self.style.SUCCESS('Отзывы загружены')
+    def save_manifest(self, table, diff):
+        manifest = ImportManifest.objects.using(self.connection.alias)
+        for batch in batched(
+            diff['deleted'] + list(diff['hashes']), LOOKUP_BATCH_SIZE
+        ):
+            manifest.filter(table=table.name, row_id__in=batch).delete()
+        manifest.bulk_create(
+            (
+                ImportManifest(table=table.name, row_id=key, row_hash=value)
+                for key, value in diff['hashes'].items()
+            ),
+            batch_size=self.chunk_size,
         )
 
-    def import_comments(self, cursor):
-        with open(
-            self.get_csv_path('comments.csv'),
-            mode='r',
-            encoding='utf-8'
-        ) as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                pub_date = datetime.strptime(
-                    row['pub_date'], '%Y-%m-%dT%H:%M:%S.%fZ'
-                ).isoformat()
-                cursor.execute(
-                    '''
-                    INSERT OR IGNORE INTO reviews_comment (
-                        id, review_id, text, author_id, pub_date
-                    ) VALUES (?, ?, ?, ?, ?)
-                    ''',
-                    (
-                        row['id'],
-                        row['review_id'],
-                        row['text'],
-                        row['author'],
-                        pub_date
-                    )
-                )
+    def finish_import(self, cursor, incremental=False):
+        '''Пересчёт рейтинга и последовательностей после сырых вставок
+        и сигнал data_imported после фиксации транзакции.
+
+        После инкрементального импорта рейтинг пересчитывается только
+        у произведений, чьи отзывы изменились.
+        '''
+        titles = Title.objects.using(self.connection.alias)
+        if not incremental:
+            titles.recalculate_ratings()
+        for batch in batched(sorted(self.rating_titles), LOOKUP_BATCH_SIZE):
+            titles.filter(pk__in=batch).recalculate_ratings()
         self.stdout.write(
-            self.style.SUCCESS('Комментарии загружены')
+            self.style.SUCCESS('Рейтинг произведений пересчитан')
+        )
+        models = [table.model for table in self.tables]
+        for sql in self.connection.ops.sequence_reset_sql(
+            no_style(), models
+        ):
+            cursor.execute(sql)
+        transaction.on_commit(
+            partial(data_imported.send, sender=self.__class__,
+                    models=models),
+            using=self.connection.alias,
         )
+
+    def add_error(self, table, line_num, error):
+        self.errors.setdefault(table.name, []).append((line_num, str(error)))
+
+    def report_errors(self):
+        self.stdout.write(self.style.ERROR('Ошибки импорта:'))
+        for name, errors in self.errors.items():
+            self.stdout.write(self.style.ERROR(
+                f'  {name}: {len(errors)} ошибочных строк'
+            ))
+            for line_num, message in errors[:MAX_REPORTED_ERRORS]:
+                location = f'строка {line_num}: ' if line_num else ''
+                self.stdout.write(f'    {location}{message}')
+            if len(errors) > MAX_REPORTED_ERRORS:
+                self.stdout.write(
+                    f'    ... и ещё {len(errors) - MAX_REPORTED_ERRORS}'
+                )
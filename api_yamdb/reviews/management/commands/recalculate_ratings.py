@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    '''Команда для пересчёта хранимого рейтинга произведений.'''
+
+    help = 'Пересчёт rating, review_count и score_sum по таблице отзывов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='База данных для пересчёта (default: \'default\')'
+        )
+
+    def handle(self, *args, **options):
+        updated = (
+            Title.objects.using(options['database']).recalculate_ratings()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Рейтинг пересчитан: {updated} произведений')
+        )
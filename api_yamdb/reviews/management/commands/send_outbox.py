@@ -0,0 +1,158 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django.utils import timezone
+
+from reviews.models import OutboxEmail
+
+# Захват пачки, не освобождённый за это время (обработчик упал),
+# снимается, и письма берёт другой обработчик.
+CLAIM_LEASE = timedelta(minutes=10)
+
+
+class Command(BaseCommand):
+    '''Фоновая отправка писем из очереди OutboxEmail.'''
+
+    help = (
+        'Отправка писем из очереди пачками через одно соединение '
+        'с почтовым сервером, с повторами и экспоненциальной паузой'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            help='Писем в пачке '
+                 f'(default: {settings.EMAIL_OUTBOX_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+            help='Попыток до пометки письма неотправленным '
+                 f'(default: {settings.EMAIL_OUTBOX_MAX_ATTEMPTS})'
+        )
+        parser.add_argument(
+            '--retry-delay',
+            type=float,
+            default=settings.EMAIL_OUTBOX_RETRY_DELAY,
+            help='Пауза перед первым повтором в секундах, далее удваивается '
+                 f'(default: {settings.EMAIL_OUTBOX_RETRY_DELAY})'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Отправить накопившиеся письма и завершиться'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Пауза между проверками пустой очереди, с (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size должен быть больше нуля')
+        if options['max_attempts'] <= 0:
+            raise CommandError('--max-attempts должен быть больше нуля')
+        self.token = uuid.uuid4().hex
+        self.max_attempts = options['max_attempts']
+        self.retry_delay = options['retry_delay']
+        self.sent = self.failed = 0
+
+        with get_connection() as connection:
+            while True:
+                batch = list(OutboxEmail.objects.claim(
+                    self.token, options['batch_size'], CLAIM_LEASE
+                ))
+                if batch:
+                    self.send_batch(connection, batch)
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Отправлено писем: {self.sent}, ошибок: {self.failed}'
+        ))
+
+    def send_batch(self, connection, batch):
+        sent = []
+        try:
+            for index, email in enumerate(batch):
+                try:
+                    connection.send_messages([email.to_message(connection)])
+                except OSError as error:
+                    self.failed += 1
+                    self.retry_later(email, error)
+                    if not self.reconnect(connection, batch[index + 1:]):
+                        return
+                except Exception as error:
+                    # Ошибка самого письма (например, перевод строки в
+                    # заголовке): соединение цело, пачка продолжается, а
+                    # письмо после max_attempts помечается неотправленным.
+                    self.failed += 1
+                    self.retry_later(email, error)
+                else:
+                    sent.append(email.pk)
+        finally:
+            # Доставленные письма отмечаются и при сбое посреди пачки:
+            # иначе после CLAIM_LEASE их отправил бы другой обработчик.
+            self.mark_sent(sent)
+
+    def reconnect(self, connection, rest):
+        """Переоткрывает соединение после ошибки отправки.
+
+        Если сервер недоступен, остаток пачки откладывается на повтор,
+        а обработчик продолжает работу со следующей пачкой.
+        """
+        # После ошибки соединение может быть разорвано.
+        connection.close()
+        try:
+            connection.open()
+        except OSError as error:
+            self.failed += len(rest)
+            for email in rest:
+                self.retry_later(email, error)
+            return False
+        return True
+
+    def mark_sent(self, pks):
+        OutboxEmail.objects.filter(pk__in=pks).update(
+            status=OutboxEmail.SENT,
+            sent_at=timezone.now(),
+            attempts=F('attempts') + 1,
+            claimed_by='',
+            claimed_at=None,
+            last_error='',
+        )
+        self.sent += len(pks)
+
+    def retry_later(self, email, error):
+        attempts = email.attempts + 1
+        status = (
+            OutboxEmail.FAILED if attempts >= self.max_attempts
+            else OutboxEmail.PENDING
+        )
+        OutboxEmail.objects.filter(pk=email.pk).update(
+            status=status,
+            attempts=attempts,
+            next_attempt_at=timezone.now() + timedelta(
+                seconds=self.retry_delay * 2 ** (attempts - 1)
+            ),
+            claimed_by='',
+            claimed_at=None,
+            last_error=str(error),
+        )
+        if status == OutboxEmail.FAILED:
+            self.stdout.write(self.style.ERROR(
+                f'Письмо {email.pk} не отправлено после {attempts} '
+                f'попыток: {error}'
+            ))
@@ -0,0 +1,58 @@
+# Generated by Django 3.2.25 on 2026-10-17 09:10
+
+from importlib import import_module
+
+from django.db import migrations, models
+import django.utils.timezone
+
+# SQLite пересоздаёт таблицу при добавлении столбца, и триггеры
+# полнотекстового индекса reviews_title_fts удаляются вместе с ней.
+title_fts = import_module('reviews.migrations.0004_title_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_outbox_email'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            title_fts.run_sqlite(title_fts.DROP_SQL),
+            title_fts.run_sqlite(title_fts.CREATE_SQL),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(
+            title_fts.run_sqlite(title_fts.CREATE_SQL),
+            title_fts.run_sqlite(title_fts.DROP_SQL),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-17 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=32, verbose_name='Таблица')),
+                ('row_id', models.CharField(max_length=64, verbose_name='Ключ строки')),
+                ('row_hash', models.CharField(max_length=32, verbose_name='Хэш строки')),
+            ],
+            options={
+                'verbose_name': 'Строка манифеста импорта',
+                'verbose_name_plural': 'Манифест импорта',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importmanifest',
+            constraint=models.UniqueConstraint(fields=('table', 'row_id'), name='import_manifest_unique'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-17 09:10
+
+from django.db import migrations
+import reviews.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', reviews.models.UserManager()),
+            ],
+        ),
+    ]
@@ -1,7 +1,14 @@
+from functools import partial
+
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as DjangoUserManager
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (
+    Case, Count, F, OuterRef, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from reviews.validators import validate_username_value
@@ -28,6 +35,24 @@ def current_year():
     return timezone.now().year
 
 
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """update() и bulk_update() минуют сигналы моделей: после
+        фиксации отправляется users_updated (reviews/signals.py)."""
+        from reviews.signals import users_updated
+
+        rows = super().update(**kwargs)
+        transaction.on_commit(
+            partial(users_updated.send, sender=self.model),
+            using=self.db,
+        )
+        return rows
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     username = models.CharField(
         verbose_name="Логин",
@@ -65,6 +90,8 @@ class User(AbstractUser):
         blank=True,
     )
 
+    objects = UserManager()
+
     @property
     def is_admin(self):
         return self.role == ADMIN or self.is_staff
@@ -82,6 +109,9 @@ class BaseNameSlugModel(models.Model):
         verbose_name='Название',
     )
     slug = models.SlugField(unique=True, verbose_name='Слаг')
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения'
+    )
 
     class Meta:
         ordering = ('name',)
@@ -107,6 +137,60 @@ class Genre(BaseNameSlugModel):
         verbose_name_plural = 'Жанры'
 
 
+class TitleQuerySet(models.QuerySet):
+    """Операции над хранимым рейтингом произведений."""
+
+    def apply_review_delta(self, count_delta, score_delta):
+        """Атомарно сдвигает счётчики отзывов и пересчитывает рейтинг.
+
+        Все выражения вычисляются из старых значений строки,
+        поэтому обновление выполняется одним UPDATE.
+        """
+        new_count = F('review_count') + count_delta
+        new_sum = F('score_sum') + score_delta
+        return self.update(
+            review_count=new_count,
+            score_sum=new_sum,
+            updated_at=timezone.now(),
+            rating=Case(
+                When(review_count=-count_delta, then=Value(None)),
+                default=new_sum / new_count,
+                output_field=models.PositiveSmallIntegerField(),
+            ),
+        )
+
+    def recalculate_ratings(self):
+        """Пересчитывает рейтинг по таблице отзывов с нуля."""
+        reviews = (
+            Review.objects.filter(title=OuterRef('pk'))
+            .order_by().values('title')
+        )
+        with transaction.atomic(using=self.db):
+            updated = self.update(
+                review_count=Coalesce(
+                    Subquery(
+                        reviews.annotate(value=Count('id')).values('value')
+                    ),
+                    0,
+                ),
+                score_sum=Coalesce(
+                    Subquery(
+                        reviews.annotate(value=Sum('score')).values('value')
+                    ),
+                    0,
+                ),
+            )
+            self.update(
+                rating=Case(
+                    When(review_count=0, then=Value(None)),
+                    default=F('score_sum') / F('review_count'),
+                    output_field=models.PositiveSmallIntegerField(),
+                ),
+                updated_at=timezone.now(),
+            )
+        return updated
+
+
 class Title(models.Model):
     """Модель описывает таблицу с произведениями,
     на которые можно писать отзывы.
@@ -136,12 +220,38 @@ class Title(models.Model):
         Genre,
         verbose_name='Жанр'
     )
+    rating = models.PositiveSmallIntegerField(
+        verbose_name='Рейтинг',
+        null=True,
+        default=None,
+        editable=False,
+    )
+    review_count = models.PositiveIntegerField(
+        verbose_name='Количество отзывов',
+        default=0,
+        editable=False,
+    )
+    score_sum = models.PositiveIntegerField(
+        verbose_name='Сумма оценок',
+        default=0,
+        editable=False,
+    )
+    # Меняется и при изменении рейтинга, категории или жанров
+    # (reviews/signals.py): по нему строятся ETag и Last-Modified.
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения'
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         ordering = ('name',)
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         default_related_name = 'titles'
+        indexes = (
+            models.Index(fields=('name', 'id'), name='title_name_id_idx'),
+        )
 
     def __str__(self):
         return (
@@ -162,6 +272,10 @@ class BaseContentModel(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -201,6 +315,17 @@ class Review(BaseContentModel):
                 name='reviews_unique',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('title', 'pub_date', 'id'),
+                name='review_title_pub_date_idx',
+            ),
+        )
+
+    def save(self, *args, **kwargs):
+        # Счётчики произведения обновляются сигналами в той же транзакции.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 
 class Comment(BaseContentModel):
@@ -215,3 +340,167 @@ class Comment(BaseContentModel):
     class Meta(BaseContentModel.Meta):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(
+                fields=('review', 'pub_date', 'id'),
+                name='comment_review_pub_date_idx',
+            ),
+        )
+
+
+class OutboxEmailQuerySet(models.QuerySet):
+    """Очередь писем для фоновой отправки (команда send_outbox)."""
+
+    def enqueue(self, message):
+        """Ставит в очередь письмо django.core.mail.EmailMessage."""
+        html_body = next(
+            (
+                content for content, mimetype
+                in getattr(message, 'alternatives', ())
+                if mimetype == 'text/html'
+            ),
+            '',
+        )
+        return self.create(
+            subject=message.subject,
+            body=message.body,
+            html_body=html_body,
+            from_email=message.from_email,
+            recipients=','.join(message.to),
+        )
+
+    def due(self):
+        return self.filter(
+            status=OutboxEmail.PENDING,
+            next_attempt_at__lte=timezone.now(),
+        )
+
+    def claim(self, token, batch_size, lease):
+        """Захватывает пачку писем для отправки.
+
+        Захват — условный UPDATE по метке `token`, поэтому несколько
+        обработчиков не получат одно письмо дважды. Захват старше
+        `lease` считается брошенным и может быть перехвачен.
+        """
+        now = timezone.now()
+        ids = list(
+            self.due().filter(
+                models.Q(claimed_at__isnull=True)
+                | models.Q(claimed_at__lt=now - lease)
+            ).order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        self.filter(
+            models.Q(claimed_at__isnull=True)
+            | models.Q(claimed_at__lt=now - lease),
+            pk__in=ids,
+        ).update(claimed_by=token, claimed_at=now)
+        return self.filter(pk__in=ids, claimed_by=token).order_by('id')
+
+
+class OutboxEmail(models.Model):
+    """Письмо, ожидающее отправки."""
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Ожидает отправки'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    ]
+
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    body = models.TextField(verbose_name='Текст')
+    html_body = models.TextField(blank=True, verbose_name='HTML')
+    from_email = models.CharField(max_length=EMAIL_MAX_LENGTH,
+                                  verbose_name='Отправитель')
+    recipients = models.TextField(verbose_name='Получатели')
+    status = models.CharField(
+        max_length=max(len(status) for status, _ in STATUS_CHOICES),
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name='Статус',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Попыток'
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, verbose_name='Следующая попытка'
+    )
+    claimed_by = models.CharField(max_length=32, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(auto_now_add=True,
+                                      verbose_name='Создано')
+    sent_at = models.DateTimeField(null=True, blank=True,
+                                   verbose_name='Отправлено')
+
+    objects = OutboxEmailQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        indexes = (
+            models.Index(
+                fields=('status', 'next_attempt_at'),
+                name='outbox_status_next_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipients}: {self.subject[:MAX_DISPLAY_LENGTH]}'
+
+    def to_message(self, connection):
+        from django.core.mail import EmailMultiAlternatives
+
+        message = EmailMultiAlternatives(
+            self.subject, self.body, self.from_email,
+            self.recipients.split(','), connection=connection,
+        )
+        if self.html_body:
+            message.attach_alternative(self.html_body, 'text/html')
+        return message
+
+
+class ImportManifest(models.Model):
+    """Хэш строки CSV, загруженной import_db --incremental."""
+
+    table = models.CharField(max_length=32, verbose_name='Таблица')
+    row_id = models.CharField(max_length=64, verbose_name='Ключ строки')
+    row_hash = models.CharField(max_length=32, verbose_name='Хэш строки')
+
+    class Meta:
+        verbose_name = 'Строка манифеста импорта'
+        verbose_name_plural = 'Манифест импорта'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('table', 'row_id'), name='import_manifest_unique'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.table}:{self.row_id}'
+
+
+class ImportCheckpoint(models.Model):
+    """Контрольная точка import_db --commit-every для --resume."""
+
+    source = models.CharField(
+        max_length=255, unique=True, verbose_name='Каталог файлов'
+    )
+    table = models.CharField(max_length=32, verbose_name='Таблица')
+    offset = models.PositiveBigIntegerField(
+        default=0, verbose_name='Загружено строк таблицы'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения'
+    )
+
+    class Meta:
+        verbose_name = 'Контрольная точка импорта'
+        verbose_name_plural = 'Контрольные точки импорта'
+
+    def __str__(self):
+        return f'{self.source}: {self.table}, {self.offset}'
@@ -0,0 +1,121 @@
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+# import_db пишет сырым SQL, минуя сигналы моделей; после фиксации
+# импорта он отправляет data_imported(models=[модели таблиц]).
+data_imported = Signal()
+# QuerySet.update() пользователей тоже минует сигналы моделей; после
+# фиксации отправляется users_updated.
+users_updated = Signal()
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_score(sender, instance, raw, **kwargs):
+    """Запоминает прежние произведение и оценку изменяемого отзыва."""
+    instance._previous_score = None
+    if raw or instance._state.adding:
+        return
+    instance._previous_score = (
+        Review.objects.filter(pk=instance.pk)
+        .values_list('title_id', 'score')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_score', None)
+    if previous is None:
+        Title.objects.filter(pk=instance.title_id).apply_review_delta(
+            1, instance.score
+        )
+        return
+    previous_title_id, previous_score = previous
+    if previous_title_id == instance.title_id:
+        if previous_score != instance.score:
+            Title.objects.filter(pk=instance.title_id).apply_review_delta(
+                0, instance.score - previous_score
+            )
+        return
+    Title.objects.filter(pk=previous_title_id).apply_review_delta(
+        -1, -previous_score
+    )
+    Title.objects.filter(pk=instance.title_id).apply_review_delta(
+        1, instance.score
+    )
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """Срабатывает и при каскадном удалении пользователя/произведения."""
+    Title.objects.filter(pk=instance.title_id).apply_review_delta(
+        -1, -instance.score
+    )
+
+
+# Представление произведения включает категорию, жанры и рейтинг,
+# отзыва и комментария — имя автора: их изменение обновляет updated_at
+# зависимых записей, чтобы менялись ETag и Last-Modified.
+
+def touch(queryset):
+    queryset.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+def touch_titles_on_save(sender, instance, raw, created, **kwargs):
+    if raw or created:
+        return
+    touch(Title.objects.filter(**{sender._meta.model_name: instance}))
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Genre)
+def touch_titles_on_delete(sender, instance, **kwargs):
+    touch(Title.objects.filter(**{sender._meta.model_name: instance}))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_titles_on_genres_change(sender, instance, action, reverse,
+                                  pk_set, **kwargs):
+    if action in ('post_add', 'post_remove'):
+        titles = Title.objects.filter(
+            pk__in=pk_set if reverse else [instance.pk]
+        )
+    elif action == 'pre_clear':
+        titles = (
+            Title.objects.filter(genre=instance) if reverse
+            else Title.objects.filter(pk=instance.pk)
+        )
+    else:
+        return
+    touch(titles)
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_username(sender, instance, raw, update_fields,
+                               **kwargs):
+    instance._username_changed = False
+    if raw or instance._state.adding or (
+        update_fields is not None and 'username' not in update_fields
+    ):
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list(
+        'username', flat=True
+    ).first()
+    instance._username_changed = previous != instance.username
+
+
+@receiver(post_save, sender=User)
+def touch_content_on_username_change(sender, instance, raw, **kwargs):
+    if raw or not getattr(instance, '_username_changed', False):
+        return
+    touch(Review.objects.filter(author=instance))
+    touch(Comment.objects.filter(author=instance))
@@ -17,3 +17,10 @@ def validate_username_value(value):
         raise ValidationError(
             f'Имя содержит недопустимые символы: {unique_invalids}'
         )
+
+
+def validate_slug_value(value):
+    if value == settings.RESERVED_SLUG:
+        raise ValidationError(
+            f'Slug "{settings.RESERVED_SLUG}" не разрешён.'
+        )
@@ -0,0 +1,111 @@
+import pytest
+from django.core.management import call_command
+from django.db.models import Avg, Count, Sum
+
+from tests.utils import create_reviews, create_single_review
+
+
+def check_stored_rating():
+    from reviews.models import Title
+
+    live = Title.objects.annotate(
+        live_rating=Avg('reviews__score'),
+        live_count=Count('reviews'),
+        live_sum=Sum('reviews__score'),
+    )
+    for title in live:
+        expected_rating = (
+            None if title.live_rating is None else int(title.live_rating)
+        )
+        assert title.rating == expected_rating, (
+            f'Хранимый рейтинг произведения `{title.name}` не совпадает '
+            'со средней оценкой отзывов.'
+        )
+        assert title.review_count == title.live_count, (
+            f'Хранимое число отзывов произведения `{title.name}` не '
+            'совпадает с числом отзывов в базе.'
+        )
+        assert title.score_sum == (title.live_sum or 0), (
+            f'Хранимая сумма оценок произведения `{title.name}` не '
+            'совпадает с суммой оценок отзывов.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08StoredRating:
+
+    REVIEW_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/'
+    )
+
+    def test_01_rating_follows_reviews(self, admin_client, admin,
+                                       user_client, user,
+                                       moderator_client, moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client,
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        check_stored_rating()
+
+        create_single_review(user_client, titles[1]['id'], 'text', 3)
+        check_stored_rating()
+
+        admin_client.patch(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[0]['id']
+            ),
+            data={'score': 10}
+        )
+        check_stored_rating()
+
+        admin_client.delete(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[1]['id']
+            )
+        )
+        check_stored_rating()
+
+        response = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.json()['rating'] == 7, (
+            'Проверьте, что эндпоинт произведения возвращает хранимый '
+            'рейтинг.'
+        )
+
+    def test_02_rating_after_cascades(self, admin_client, admin,
+                                      user_client, user,
+                                      moderator_client, moderator):
+        from reviews.models import Title
+
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client,
+        }
+        _, titles = create_reviews(admin_client, author_map)
+        create_single_review(user_client, titles[1]['id'], 'text', 3)
+
+        user.delete()
+        check_stored_rating()
+
+        Title.objects.get(pk=titles[1]['id']).delete()
+        check_stored_rating()
+
+        moderator.delete()
+        admin.delete()
+        check_stored_rating()
+        assert Title.objects.get(pk=titles[0]['id']).rating is None, (
+            'Рейтинг произведения без отзывов должен быть `None`.'
+        )
+
+    def test_03_recalculate_command(self, admin_client, admin,
+                                    user_client, user):
+        from reviews.models import Review, Title
+
+        create_reviews(admin_client, {admin: admin_client, user: user_client})
+        Review.objects.update(score=1)
+        Title.objects.update(rating=None, review_count=0, score_sum=0)
+
+        call_command('recalculate_ratings')
+        check_stored_rating()
@@ -0,0 +1,115 @@
+from http import HTTPStatus
+
+import pytest
+
+
+def walk(client, url, direction='next'):
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{url}` возвращает ответ со '
+            'статусом 200.'
+        )
+        data = response.json()
+        assert 'count' not in data, (
+            'Курсорная пагинация не должна считать общее число объектов.'
+        )
+        pages.append([item['id'] for item in data['results']])
+        url = data[direction]
+    return pages
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09CursorPagination:
+
+    TITLES_URL = '/api/v1/titles/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+    @pytest.fixture
+    def titles(self):
+        from reviews.models import Category, Title
+
+        category = Category.objects.create(name='Фильм', slug='films')
+        return [
+            Title.objects.create(
+                name=f'Фильм {index % 7}', year=2000, category=category
+            )
+            for index in range(25)
+        ]
+
+    def test_01_titles_cursor_walk(self, client, titles):
+        expected = [
+            title.id for title in sorted(titles, key=lambda t: (t.name, t.id))
+        ]
+        pages = walk(client, f'{self.TITLES_URL}?cursor=&limit=10')
+        assert [len(page) for page in pages] == [10, 10, 5], (
+            'Проверьте, что курсорная пагинация возвращает страницы '
+            'размера `limit`.'
+        )
+        assert sum(pages, []) == expected, (
+            'Проверьте, что курсорная пагинация произведений обходит все '
+            'объекты по порядку `(name, id)` без пропусков и повторов.'
+        )
+
+        last_page = client.get(
+            f'{self.TITLES_URL}?cursor=&limit=10'
+        ).json()
+        for _ in range(2):
+            last_page = client.get(last_page['next']).json()
+        back_pages = walk(client, last_page['previous'], 'previous')
+        assert sum(reversed(back_pages), []) == expected[:20], (
+            'Проверьте, что ссылка `previous` курсорной пагинации '
+            'возвращает предыдущие страницы.'
+        )
+
+    def test_02_cursor_is_stable_and_validated(self, client, titles):
+        from reviews.models import Title
+
+        first = client.get(f'{self.TITLES_URL}?cursor=&limit=10').json()
+        Title.objects.create(
+            name='Аааа', year=2000, category=titles[0].category
+        )
+        second = client.get(first['next']).json()
+        assert (
+            set(item['id'] for item in first['results'])
+            .isdisjoint(item['id'] for item in second['results'])
+        ), (
+            'Вставка перед курсором не должна сдвигать следующую страницу.'
+        )
+
+        response = client.get(f'{self.TITLES_URL}?cursor=broken')
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что некорректный курсор приводит к ответу 404.'
+        )
+
+        response = client.get(self.TITLES_URL)
+        assert 'count' in response.json(), (
+            'Без параметра `cursor` должна работать прежняя пагинация.'
+        )
+
+    def test_03_reviews_cursor_walk(self, client, titles,
+                                    django_user_model):
+        from reviews.models import Review
+
+        title = titles[0]
+        for index in range(15):
+            author = django_user_model.objects.create(
+                username=f'user{index}', email=f'user{index}@yamdb.fake'
+            )
+            Review.objects.create(
+                title=title, author=author, text='text', score=5
+            )
+        expected = list(
+            Review.objects.order_by('-pub_date', '-id')
+            .values_list('id', flat=True)
+        )
+        pages = walk(
+            client,
+            self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+            + '?cursor=&limit=4'
+        )
+        assert sum(pages, []) == expected, (
+            'Проверьте, что курсорная пагинация отзывов обходит все '
+            'объекты по порядку `(pub_date, id)`.'
+        )
@@ -0,0 +1,60 @@
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10TitleQueries:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    @pytest.fixture
+    def titles(self):
+        from reviews.models import Category, Genre, Title
+
+        categories = [
+            Category.objects.create(name=f'Категория {index}',
+                                    slug=f'category{index}')
+            for index in range(3)
+        ]
+        genres = [
+            Genre.objects.create(name=f'Жанр {index}', slug=f'genre{index}')
+            for index in range(3)
+        ]
+        titles = []
+        for index in range(100):
+            title = Title.objects.create(
+                name=f'Произведение {index}',
+                year=2000,
+                category=categories[index % 3],
+            )
+            title.genre.set(genres[:index % 3 + 1])
+            titles.append(title)
+        return titles
+
+    @pytest.mark.parametrize('query', ('', '&genre=genre2', '&category=1'))
+    @pytest.mark.parametrize('limit', (10, 100))
+    def test_01_list_query_count(self, client, titles, query, limit,
+                                 django_assert_num_queries):
+        # Состояние для ETag, COUNT(*), выборка страницы с категориями
+        # и prefetch жанров.
+        with django_assert_num_queries(4):
+            response = client.get(f'{self.TITLES_URL}?limit={limit}{query}')
+        data = response.json()
+        assert data['results'], (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` возвращает '
+            'произведения.'
+        )
+        assert all(
+            title['genre'] and title['category'] for title in data['results']
+        ), (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` возвращает '
+            'жанры и категории произведений.'
+        )
+
+    def test_02_detail_query_count(self, client, titles,
+                                   django_assert_num_queries):
+        with django_assert_num_queries(3):
+            response = client.get(f'{self.TITLES_URL}{titles[2].id}/')
+        assert len(response.json()['genre']) == 3, (
+            'Проверьте, что ответ на GET-запрос к произведению содержит '
+            'все его жанры.'
+        )
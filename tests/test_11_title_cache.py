@@ -0,0 +1,107 @@
+import pytest
+
+
+@pytest.fixture(params=('locmem', 'filebased'))
+def cache_backend(request, settings, tmp_path):
+    backends = {
+        'locmem': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'filebased': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path),
+        },
+    }
+    settings.CACHES = {'default': backends[request.param]}
+    yield request.param
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11TitleCache:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    @pytest.fixture
+    def title(self):
+        from reviews.models import Category, Genre, Title
+
+        category = Category.objects.create(name='Фильм', slug='films')
+        genre = Genre.objects.create(name='Драма', slug='drama')
+        title = Title.objects.create(name='Фильм', year=2000,
+                                     category=category)
+        title.genre.set([genre])
+        return title
+
+    def test_01_hit_and_miss(self, client, title, cache_backend):
+        from api.cache import get_stats
+
+        url = f'{self.TITLES_URL}?genre=drama&year=2000'
+        first = client.get(url)
+        second = client.get(f'{self.TITLES_URL}?year=2000&genre=drama')
+        assert first['X-Cache'] == 'MISS' and second['X-Cache'] == 'HIT', (
+            'Повторный GET-запрос к списку произведений с теми же '
+            'параметрами фильтра должен обслуживаться из кэша.'
+        )
+        assert first.json() == second.json(), (
+            'Ответ из кэша должен совпадать с исходным ответом.'
+        )
+        assert client.get(f'{url}&limit=1')['X-Cache'] == 'MISS', (
+            'Параметры пагинации должны входить в ключ кэша.'
+        )
+        detail_url = f'{self.TITLES_URL}{title.id}/'
+        client.get(detail_url)
+        assert client.get(detail_url)['X-Cache'] == 'HIT', (
+            'Повторный GET-запрос к произведению должен обслуживаться '
+            'из кэша.'
+        )
+        assert get_stats() == {'hit': 2, 'miss': 3}, (
+            'Проверьте счётчики попаданий и промахов кэша.'
+        )
+
+    def test_02_invalidation(self, client, title, user, cache_backend):
+        from reviews.models import Genre, Review
+
+        detail_url = f'{self.TITLES_URL}{title.id}/'
+        client.get(detail_url)
+
+        Review.objects.create(title=title, author=user, text='t', score=8)
+        response = client.get(detail_url)
+        assert response['X-Cache'] == 'MISS', (
+            'Запись в таблицу отзывов должна инвалидировать кэш.'
+        )
+        assert response.json()['rating'] == 8
+
+        title.genre.add(Genre.objects.create(name='Комедия', slug='comedy'))
+        response = client.get(detail_url)
+        assert len(response.json()['genre']) == 2, (
+            'Изменение жанров произведения должно инвалидировать кэш.'
+        )
+
+        title.category.name = 'Кино'
+        title.category.save()
+        response = client.get(detail_url)
+        assert response.json()['category']['name'] == 'Кино', (
+            'Изменение категории должно инвалидировать кэш.'
+        )
+
+    @pytest.mark.parametrize('options', (
+        {}, {'incremental': True}, {'commit_every': 50},
+    ))
+    def test_03_import_invalidation(self, client, options):
+        import io
+
+        from django.core.management import call_command
+
+        from tests.test_13_import_db import DATA_PATH, count_csv_rows
+
+        client.get(self.TITLES_URL)
+        assert client.get(self.TITLES_URL)['X-Cache'] == 'HIT'
+        call_command('import_db', path=DATA_PATH, stdout=io.StringIO(),
+                     **options)
+        response = client.get(self.TITLES_URL)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что `import_db` инвалидирует кэш ответов.'
+        )
+        assert response.json()['count'] == count_csv_rows(
+            f'{DATA_PATH}/titles.csv'
+        )
@@ -0,0 +1,87 @@
+from http import HTTPStatus
+
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12TitleSearch:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    @pytest.fixture
+    def titles(self):
+        from reviews.models import Title
+
+        return [
+            Title.objects.create(name=name, year=2000, description=text)
+            for name, text in (
+                ('Марсианские хроники', 'Рассказы о Марсе'),
+                ('Хроники Нарнии', 'Сказка про льва'),
+                ('Винни-Пух', 'Сказка про медведя и его хроники'),
+                ('Крестный отец', 'Драма'),
+            )
+        ]
+
+    def search(self, client, query):
+        response = client.get(self.TITLES_URL, {'search': query})
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что поиск по `{query}` возвращает ответ со '
+            'статусом 200.'
+        )
+        return [title['name'] for title in response.json()['results']]
+
+    def test_01_ranked_search(self, client, titles):
+        names = self.search(client, 'хроники')
+        assert set(names) == {
+            'Марсианские хроники', 'Хроники Нарнии', 'Винни-Пух'
+        }, (
+            'Поиск должен находить произведения по названию и описанию '
+            'без учёта регистра.'
+        )
+        assert names[-1] == 'Винни-Пух', (
+            'Совпадения в коротком названии должны ранжироваться выше '
+            'совпадений в длинном описании.'
+        )
+        assert self.search(client, 'сказ льва') == ['Хроники Нарнии'], (
+            'Слова запроса должны искаться по префиксу и объединяться по И.'
+        )
+        assert self.search(client, '"OR (') == [], (
+            'Спецсимволы в запросе не должны приводить к ошибке.'
+        )
+
+    def test_02_index_follows_changes(self, client, titles):
+        title = titles[3]
+        title.name = 'Гарри Поттер'
+        title.save()
+        assert self.search(client, 'поттер') == ['Гарри Поттер'], (
+            'Изменение названия должно отражаться в поисковом индексе.'
+        )
+        assert self.search(client, 'крестный') == []
+        title.delete()
+        assert self.search(client, 'поттер') == [], (
+            'Удалённые произведения не должны находиться поиском.'
+        )
+
+    def test_03_database_of_queryset(self, monkeypatch):
+        from types import SimpleNamespace
+
+        from django.db import connection
+
+        from api import filters
+        from reviews.models import Title
+
+        monkeypatch.setattr(filters, 'connections', {
+            'default': connection,
+            'replica': SimpleNamespace(vendor='postgresql'),
+        })
+        search = filters.TitleFilter().filter_search
+        queryset = search(Title.objects.all(), 'search', 'побег')
+        assert 'MATCH' in str(queryset.query)
+        assert not queryset.query.extra, (
+            'Проверьте, что поиск не использует устаревший QuerySet.extra().'
+        )
+        queryset = search(Title.objects.using('replica'), 'search', 'побег')
+        assert 'MATCH' not in str(queryset.query), (
+            'Проверьте, что СУБД определяется по базе queryset, а не по '
+            'соединению по умолчанию.'
+        )
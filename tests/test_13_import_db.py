@@ -0,0 +1,126 @@
+import csv
+import io
+import os
+import shutil
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from tests.conftest import MANAGE_PATH
+
+DATA_PATH = os.path.join(MANAGE_PATH, 'static', 'data')
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    path = tmp_path / 'data'
+    shutil.copytree(DATA_PATH, path)
+    return path
+
+
+def rewrite_csv(path, update):
+    with open(path, encoding='utf-8', newline='') as file:
+        rows = list(csv.DictReader(file))
+        fieldnames = list(rows[0])
+    update(rows)
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def count_csv_rows(path):
+    with open(path, encoding='utf-8', newline='') as file:
+        return sum(1 for _ in csv.DictReader(file))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13ImportDb:
+
+    def test_01_import(self, csv_dir):
+        from reviews.models import Comment, Review, Title, User
+
+        out = io.StringIO()
+        call_command('import_db', path=str(csv_dir), chunk_size=10,
+                     stdout=out)
+        for model, filename in (
+            (User, 'users.csv'), (Title, 'titles.csv'),
+            (Review, 'review.csv'), (Comment, 'comments.csv'),
+        ):
+            assert model.objects.count() == count_csv_rows(
+                csv_dir / filename
+            ), f'Проверьте, что `import_db` загружает все строки {filename}.'
+        assert 'строк/с' in out.getvalue(), (
+            'Проверьте, что `import_db` выводит скорость загрузки таблиц.'
+        )
+        title = Title.objects.filter(review_count__gt=0).first()
+        assert title.rating == title.score_sum // title.review_count, (
+            'Проверьте, что после импорта пересчитан рейтинг произведений.'
+        )
+
+    def test_02_errors_rollback(self, csv_dir):
+        from reviews.models import Review, User
+
+        def break_reviews(rows):
+            rows[0]['author'] = '999999'
+            rows[1]['pub_date'] = 'вчера'
+
+        rewrite_csv(csv_dir / 'review.csv', break_reviews)
+        out = io.StringIO()
+        with pytest.raises(CommandError):
+            call_command('import_db', path=str(csv_dir), stdout=out)
+        report = out.getvalue()
+        assert 'reviews: 2 ошибочных строк' in report, (
+            'Проверьте, что `import_db` перечисляет все ошибочные строки.'
+        )
+        assert 'вчера' in report and 'reviews_user' in report
+        assert not User.objects.exists() and not Review.objects.exists(), (
+            'При ошибках импорт должен откатываться целиком.'
+        )
+
+    def dump_tables(self):
+        from django.db import connection
+
+        from reviews.dataset import TABLES
+
+        dump = {}
+        with connection.cursor() as cursor:
+            for table in TABLES:
+                columns = [
+                    column for column in table.columns
+                    if column not in ('date_joined', 'updated_at')
+                ]
+                cursor.execute(
+                    f'SELECT {", ".join(columns)} FROM {table.db_table} '
+                    'ORDER BY id'
+                )
+                dump[table.name] = cursor.fetchall()
+        return dump
+
+    def test_03_parallel_matches_serial(self, csv_dir):
+        call_command('import_db', path=str(csv_dir), stdout=io.StringIO())
+        serial = self.dump_tables()
+        call_command('import_db', path=str(csv_dir), clear=True,
+                     workers=3, chunk_size=7, stdout=io.StringIO())
+        assert self.dump_tables() == serial, (
+            'Проверьте, что импорт с `--workers` даёт ту же базу, что и '
+            'последовательный импорт.'
+        )
+
+    def test_04_parallel_errors(self, csv_dir):
+        def break_reviews(rows):
+            rows[5]['pub_date'] = 'вчера'
+
+        rewrite_csv(csv_dir / 'review.csv', break_reviews)
+        reports = []
+        for workers in (1, 2):
+            out = io.StringIO()
+            with pytest.raises(CommandError):
+                call_command('import_db', path=str(csv_dir),
+                             workers=workers, stdout=out)
+            reports.append(
+                out.getvalue()[out.getvalue().index('Ошибки импорта'):]
+            )
+        assert reports[0] == reports[1], (
+            'Отчёт об ошибках не должен зависеть от числа процессов.'
+        )
@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14BenchmarkApi:
+
+    OPTIONS = {'titles': 5, 'reviews': 3, 'iterations': 2}
+
+    def test_01_baseline_and_compare(self, tmp_path):
+        baseline_path = tmp_path / 'baseline.json'
+        call_command('benchmark_api', save=str(baseline_path),
+                     stdout=io.StringIO(), **self.OPTIONS)
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+        routes = baseline['routes']
+        for route in ('titles-list', 'reviews-create', 'comments-list',
+                      'auth-signup', 'auth-token', 'titles-filter'):
+            assert route in routes, (
+                f'Проверьте, что бенчмарк замеряет маршрут `{route}`.'
+            )
+        assert set(routes['titles-list']) == {
+            'p50_ms', 'p95_ms', 'p99_ms', 'queries'
+        }
+
+        call_command('benchmark_api', compare=str(baseline_path),
+                     tolerance=1000, stdout=io.StringIO(), **self.OPTIONS)
+
+        routes['titles-list']['queries'] -= 1
+        baseline_path.write_text(json.dumps(baseline), encoding='utf-8')
+        out = io.StringIO()
+        with pytest.raises(CommandError):
+            call_command('benchmark_api', compare=str(baseline_path),
+                         tolerance=1000, stdout=out, **self.OPTIONS)
+        assert 'titles-list: SQL-запросов' in out.getvalue(), (
+            'Рост числа SQL-запросов должен считаться регрессией.'
+        )
+
+    def test_02_every_api_route(self, monkeypatch):
+        from api.management.commands.benchmark_api import Command, api_routes
+
+        routes = api_routes()
+        for route in (
+            ('genres-detail', 'delete'), ('comments-detail', 'patch'),
+            ('users-self-profile', 'patch'), ('titles-bulk', 'post'),
+            ('export', 'get'), ('query-stats', 'get'),
+        ):
+            assert route in routes, (
+                'Проверьте, что список маршрутов строится по api/urls.py: '
+                f'нет {route}.'
+            )
+
+        get_routes = Command.get_routes
+
+        def without_genre_delete(command):
+            routes = get_routes(command)
+            del routes['genres-delete']
+            return routes
+
+        monkeypatch.setattr(Command, 'get_routes', without_genre_delete)
+        with pytest.raises(CommandError, match='DELETE genres-detail'):
+            call_command('benchmark_api', stdout=io.StringIO(),
+                         **self.OPTIONS)
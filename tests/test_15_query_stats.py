@@ -0,0 +1,110 @@
+import io
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15QueryStats:
+
+    STATS_URL = '/api/v1/stats/queries/'
+
+    def test_01_stats_collected(self, client, admin_client, settings):
+        from api.instrumentation import collector
+
+        settings.DEBUG = False
+        collector.reset()
+        for _ in range(3):
+            client.get('/api/v1/titles/')
+        client.get('/api/v1/genres/')
+
+        response = admin_client.get(self.STATS_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос администратора к `{self.STATS_URL}` '
+            'возвращает ответ со статусом 200.'
+        )
+        stats = response.json()
+        assert stats['titles-list:list']['requests'] == 3, (
+            'Проверьте, что статистика ведётся по маршруту и действию '
+            'вьюсета при DEBUG=False.'
+        )
+        assert stats['titles-list:list']['queries'] == 2, (
+            'Проверьте подсчёт SQL-запросов: пустой список произведений '
+            'требует состояния для ETag и COUNT(*), повторные запросы '
+            'отдаются из кэша вместе с ETag без запросов к базе.'
+        )
+        assert stats['genres-list:list']['avg_total_time_ms'] >= (
+            stats['genres-list:list']['avg_db_time_ms']
+        )
+
+        out = io.StringIO()
+        call_command('query_stats', stdout=out)
+        assert 'titles-list:list' in out.getvalue(), (
+            'Проверьте, что команда `query_stats` выводит статистику.'
+        )
+
+    def test_02_stats_admin_only(self, client, user_client):
+        assert client.get(self.STATS_URL).status_code == (
+            HTTPStatus.UNAUTHORIZED
+        )
+        assert user_client.get(self.STATS_URL).status_code == (
+            HTTPStatus.FORBIDDEN
+        )
+
+    def test_03_streaming_export(self, admin_client, settings):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from api.instrumentation import collector
+        from reviews.models import Title
+
+        settings.EXPORT_CHUNK_SIZE = 2
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {index}', year=2000)
+            for index in range(5)
+        )
+        collector.reset()
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get('/api/v1/export/titles/')
+            collector.flush()
+            assert 'export:GET' not in collector.snapshot(), (
+                'Проверьте, что потоковый ответ учитывается после чтения '
+                'тела, а не при возврате из вьюхи.'
+            )
+            assert len(b''.join(response.streaming_content).splitlines()) == 5
+        collector.flush()
+        stats = collector.snapshot()['export:GET']
+        assert stats['requests'] == 1
+        assert stats['queries'] == len(context.captured_queries), (
+            'Проверьте, что запросы, выполненные при чтении потоковой '
+            'выгрузки, попадают в статистику.'
+        )
+
+    def test_04_overhead_modes(self, settings, monkeypatch):
+        from api.instrumentation import collector
+        from api.management.commands.query_stats import (
+            MIDDLEWARE, Command,
+        )
+
+        settings.DEBUG = False
+        runs = []
+        time_requests = Command.time_requests
+
+        def record(self, count):
+            collector.reset()
+            result = time_requests(self, count)
+            collector.flush()
+            runs.append((
+                MIDDLEWARE in settings.MIDDLEWARE, bool(collector.snapshot())
+            ))
+            return result
+
+        monkeypatch.setattr(Command, 'time_requests', record)
+        call_command('query_stats', overhead=3, stdout=io.StringIO())
+        assert (False, False) in runs and (True, True) in runs
+        assert all(enabled == recorded for enabled, recorded in runs), (
+            'Проверьте, что замер без middleware идёт без него: клиент '
+            'собирает цепочку middleware при первом запросе, поэтому '
+            'в каждом режиме нужен новый клиент.'
+        )
@@ -0,0 +1,207 @@
+import io
+from http import HTTPStatus
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+
+BACKEND = 'tests.test_16_email_outbox.{}'
+
+
+class CountingBackend(EmailBackend):
+    """Почтовый бэкенд, считающий открытые соединения."""
+
+    connections = 0
+
+    def open(self):
+        type(self).connections += 1
+        return super().open()
+
+
+class FlakyBackend(EmailBackend):
+    """Почтовый бэкенд, который не может отправить ни одного письма."""
+
+    def send_messages(self, messages):
+        raise ConnectionRefusedError('SMTP недоступен')
+
+
+class BrokenReconnectBackend(EmailBackend):
+    """Почтовый бэкенд: второе письмо рвёт соединение, а открыть его
+    заново не удаётся."""
+
+    def open(self):
+        if getattr(self, 'opened', False):
+            raise ConnectionRefusedError('SMTP не отвечает')
+        self.opened = True
+        return super().open()
+
+    def send_messages(self, messages):
+        if len(mail.outbox) == 1:
+            raise ConnectionResetError('Соединение разорвано')
+        return super().send_messages(messages)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16EmailOutbox:
+
+    SIGNUP_URL = '/api/v1/auth/signup/'
+
+    @pytest.fixture(autouse=True)
+    def enable_outbox(self, settings):
+        settings.EMAIL_OUTBOX_ENABLED = True
+
+    def send_outbox(self, *args):
+        out = io.StringIO()
+        call_command('send_outbox', '--once', *args, stdout=out)
+        return out.getvalue()
+
+    def test_01_signup_does_not_send(self, client):
+        from reviews.models import OutboxEmail
+
+        response = client.post(self.SIGNUP_URL, data={
+            'username': 'outbox_user', 'email': 'outbox_user@yamdb.fake'
+        })
+        assert response.status_code == HTTPStatus.OK
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что при включённой очереди регистрация не '
+            'отправляет письмо сама, а ставит его в очередь.'
+        )
+        email = OutboxEmail.objects.get()
+        assert email.recipients == 'outbox_user@yamdb.fake'
+        assert email.status == OutboxEmail.PENDING
+
+    def test_02_batched_delivery(self, client, settings):
+        from reviews.models import OutboxEmail, User
+
+        settings.EMAIL_BACKEND = BACKEND.format('CountingBackend')
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {
+                'signup-ip': None, 'signup-username': None,
+            },
+        }
+        CountingBackend.connections = 0
+        total = 1000
+        for index in range(total):
+            client.post(self.SIGNUP_URL, data={
+                'username': f'outbox{index}',
+                'email': f'outbox{index}@yamdb.fake',
+            })
+        assert OutboxEmail.objects.count() == total
+        assert CountingBackend.connections == 0
+
+        self.send_outbox('--batch-size', '100')
+        assert len(mail.outbox) == total, (
+            'Проверьте, что send_outbox отправляет все письма из очереди.'
+        )
+        assert CountingBackend.connections == 1, (
+            'Проверьте, что все пачки отправляются через одно соединение '
+            'с почтовым сервером.'
+        )
+        assert not OutboxEmail.objects.exclude(
+            status=OutboxEmail.SENT
+        ).exists()
+        user = User.objects.get(username='outbox7')
+        message = next(
+            message for message in mail.outbox if message.to == [user.email]
+        )
+        assert user.confirmation_code in message.body
+        assert message.alternatives[0][1] == 'text/html'
+
+        self.send_outbox()
+        assert len(mail.outbox) == total, (
+            'Проверьте, что отправленные письма не отправляются повторно.'
+        )
+
+    def test_03_retry_with_backoff(self, client, settings):
+        from reviews.models import OutboxEmail
+
+        client.post(self.SIGNUP_URL, data={
+            'username': 'outbox_retry', 'email': 'outbox_retry@yamdb.fake'
+        })
+        settings.EMAIL_BACKEND = BACKEND.format('FlakyBackend')
+        self.send_outbox('--retry-delay', '0', '--max-attempts', '3')
+        email = OutboxEmail.objects.get()
+        assert email.status == OutboxEmail.FAILED, (
+            'Проверьте, что после исчерпания попыток письмо помечается '
+            'неотправленным.'
+        )
+        assert email.attempts == 3
+        assert 'SMTP недоступен' in email.last_error
+
+        OutboxEmail.objects.update(status=OutboxEmail.PENDING, attempts=0)
+        self.send_outbox('--retry-delay', '60')
+        email.refresh_from_db()
+        assert email.status == OutboxEmail.PENDING
+        assert email.attempts == 1
+        assert email.next_attempt_at > email.created_at, (
+            'Проверьте, что повтор откладывается на --retry-delay секунд.'
+        )
+
+        settings.EMAIL_BACKEND = (
+            'django.core.mail.backends.locmem.EmailBackend'
+        )
+        self.send_outbox()
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что письмо не отправляется раньше времени повтора.'
+        )
+
+    def test_04_reconnect_fails(self, client, settings):
+        from reviews.models import OutboxEmail
+
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {
+                'signup-ip': None, 'signup-username': None,
+            },
+        }
+        for index in range(4):
+            client.post(self.SIGNUP_URL, data={
+                'username': f'outbox{index}',
+                'email': f'outbox{index}@yamdb.fake',
+            })
+        settings.EMAIL_BACKEND = BACKEND.format('BrokenReconnectBackend')
+        report = self.send_outbox('--retry-delay', '60')
+        assert 'Отправлено писем: 1, ошибок: 3' in report, (
+            'Проверьте, что сбой повторного соединения откладывает остаток '
+            'пачки, а не завершает обработчик.'
+        )
+        emails = list(OutboxEmail.objects.order_by('pk'))
+        assert emails[0].status == OutboxEmail.SENT, (
+            'Проверьте, что доставленное письмо отмечается отправленным и '
+            'при сбое посреди пачки: иначе оно уйдёт повторно.'
+        )
+        assert [email.status for email in emails[1:]] == [
+            OutboxEmail.PENDING
+        ] * 3
+        assert 'Соединение разорвано' in emails[1].last_error
+        assert {email.last_error for email in emails[2:]} == {
+            'SMTP не отвечает'
+        }
+        assert not any(email.claimed_by for email in emails)
+
+    def test_05_broken_message(self):
+        from reviews.models import OutboxEmail
+
+        broken = OutboxEmail.objects.create(
+            subject='Тема\nBcc: all@yamdb.fake', body='Текст',
+            from_email='noreply@yamdb.fake', recipients='a@yamdb.fake',
+        )
+        OutboxEmail.objects.create(
+            subject='Тема', body='Текст',
+            from_email='noreply@yamdb.fake', recipients='b@yamdb.fake',
+        )
+        report = self.send_outbox('--retry-delay', '0', '--max-attempts', '2')
+        assert 'Отправлено писем: 1, ошибок: 2' in report, (
+            'Проверьте, что ошибка одного письма не останавливает '
+            'обработчик и не мешает остальным письмам пачки.'
+        )
+        assert [message.to for message in mail.outbox] == [['b@yamdb.fake']]
+        broken.refresh_from_db()
+        assert broken.status == OutboxEmail.FAILED, (
+            'Проверьте, что письмо с ошибкой после исчерпания попыток '
+            'помечается неотправленным, а не захватывается снова.'
+        )
+        assert broken.attempts == 2
+        assert broken.last_error and not broken.claimed_by
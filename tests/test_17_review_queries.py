@@ -0,0 +1,67 @@
+from http import HTTPStatus
+
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17ReviewQueries:
+
+    @pytest.fixture
+    def title(self):
+        from reviews.models import Title
+
+        return Title.objects.create(name='Произведение', year=2000)
+
+    def add_reviews(self, title, count):
+        from reviews.models import Review, User
+
+        for index in range(count):
+            author = User.objects.create(
+                username=f'reviewer{index}',
+                email=f'reviewer{index}@yamdb.fake',
+            )
+            Review.objects.create(
+                title=title, author=author, text='Отзыв', score=5
+            )
+
+    @pytest.mark.parametrize('count', (2, 25))
+    def test_01_list_query_count(self, client, title, count,
+                                 django_assert_num_queries):
+        self.add_reviews(title, count)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        # Проверка произведения, состояние для ETag, COUNT(*) и страница
+        # отзывов с авторами.
+        with django_assert_num_queries(4):
+            response = client.get(url)
+        results = response.json()['results']
+        assert results and all(
+            review['author'].startswith('reviewer') for review in results
+        ), (
+            f'Проверьте, что GET-запрос к `{url}` возвращает отзывы '
+            'с именами авторов.'
+        )
+
+    @pytest.mark.parametrize('limit', (5, 50))
+    def test_02_cursor_query_count(self, client, title, limit,
+                                   django_assert_num_queries):
+        self.add_reviews(title, 30)
+        url = f'/api/v1/titles/{title.id}/reviews/?cursor=&limit={limit}'
+        with django_assert_num_queries(3):
+            response = client.get(url)
+        assert len(response.json()['results']) == min(limit, 30)
+
+    def test_03_create_query_count(self, user_client, title,
+                                   django_assert_num_queries):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        # Пользователь из токена, произведение, BEGIN, вставка
+        # и обновление рейтинга.
+        with django_assert_num_queries(5):
+            response = user_client.post(url, data={'text': 'Отзыв',
+                                                   'score': 7})
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['author'] == 'TestUser'
+
+    def test_04_missing_title(self, client, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = client.get('/api/v1/titles/100500/reviews/')
+        assert response.status_code == HTTPStatus.NOT_FOUND
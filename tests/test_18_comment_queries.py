@@ -0,0 +1,84 @@
+from http import HTTPStatus
+
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18CommentQueries:
+
+    @pytest.fixture
+    def reviews(self, admin):
+        from reviews.models import Review, Title
+
+        return [
+            Review.objects.create(
+                title=Title.objects.create(name=f'Произведение {index}',
+                                           year=2000),
+                author=admin, text='Отзыв', score=5,
+            )
+            for index in range(2)
+        ]
+
+    def add_comments(self, review, count):
+        from reviews.models import Comment, User
+
+        for index in range(count):
+            author = User.objects.create(
+                username=f'commenter{index}',
+                email=f'commenter{index}@yamdb.fake',
+            )
+            Comment.objects.create(
+                review=review, author=author, text='Комментарий'
+            )
+
+    def comments_url(self, review, title=None):
+        title_id = (title or review.title).id
+        return f'/api/v1/titles/{title_id}/reviews/{review.id}/comments/'
+
+    @pytest.mark.parametrize('count', (2, 25))
+    def test_01_list_query_count(self, client, reviews, count,
+                                 django_assert_num_queries):
+        review = reviews[0]
+        self.add_comments(review, count)
+        # Отзыв вместе с проверкой произведения, состояние для ETag,
+        # COUNT(*) и страница комментариев с авторами.
+        with django_assert_num_queries(4):
+            response = client.get(self.comments_url(review))
+        results = response.json()['results']
+        assert results and all(
+            comment['author'].startswith('commenter') for comment in results
+        ), (
+            'Проверьте, что список комментариев возвращает имена авторов.'
+        )
+
+    def test_02_detail_query_count(self, client, reviews,
+                                   django_assert_num_queries):
+        review = reviews[0]
+        self.add_comments(review, 1)
+        comment = review.comments.get()
+        with django_assert_num_queries(3):
+            response = client.get(
+                f'{self.comments_url(review)}{comment.id}/'
+            )
+        assert response.json()['author'] == 'commenter0'
+
+    def test_03_mismatched_title(self, client, user_client, reviews,
+                                 django_assert_num_queries):
+        review, other = reviews
+        self.add_comments(review, 3)
+        url = self.comments_url(review, title=other.title)
+        with django_assert_num_queries(1):
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что запрос к комментариям отзыва с чужим '
+            'произведением в URL возвращает 404.'
+        )
+        comment = review.comments.first()
+        response = client.get(f'{url}{comment.id}/')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        response = user_client.post(url, data={'text': 'Комментарий'})
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что комментарий нельзя создать к отзыву '
+            'через URL чужого произведения.'
+        )
+        assert review.comments.count() == 3
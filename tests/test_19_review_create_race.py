@@ -0,0 +1,82 @@
+import threading
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19ReviewCreateRace:
+
+    @pytest.fixture
+    def title(self):
+        from reviews.models import Title
+
+        return Title.objects.create(name='Произведение', year=2000)
+
+    def test_01_duplicate_is_validation_error(self, user_client, title,
+                                              django_assert_num_queries):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        data = {'text': 'Отзыв', 'score': 7}
+        assert user_client.post(url, data=data).status_code == (
+            HTTPStatus.CREATED
+        )
+        # Произведение, BEGIN и отклонённая ограничением reviews_unique
+        # вставка; пользователь после первого запроса берётся из кэша.
+        with django_assert_num_queries(3):
+            response = user_client.post(url, data=data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что повторный отзыв на произведение возвращает 400.'
+        )
+        assert response.json() == {'non_field_errors': [
+            'Вы уже оставляли отзыв на произведение "Произведение"'
+        ]}
+        title.refresh_from_db()
+        assert (title.review_count, title.rating) == (1, 7), (
+            'Проверьте, что отклонённый отзыв не меняет рейтинг.'
+        )
+
+    def test_02_concurrent_duplicates(self, user_client, title,
+                                      monkeypatch):
+        from reviews.models import Review
+
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        requests = 8
+        # Все запросы доходят до вставки одновременно, то есть после
+        # любых проверок в представлении. Сами вставки выполняются по
+        # очереди: SQLite в памяти не допускает параллельной записи.
+        barrier = threading.Barrier(requests, timeout=10)
+        write_lock = threading.Lock()
+        save = Review.save
+
+        def racing_save(review, *args, **kwargs):
+            barrier.wait()
+            with write_lock:
+                return save(review, *args, **kwargs)
+
+        monkeypatch.setattr(Review, 'save', racing_save)
+        statuses = []
+
+        def post():
+            try:
+                statuses.append(user_client.post(
+                    url, data={'text': 'Отзыв', 'score': 5}
+                ).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post) for _ in range(requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(statuses) == (
+            [HTTPStatus.CREATED] + [HTTPStatus.BAD_REQUEST] * (requests - 1)
+        ), (
+            'Проверьте, что из одновременных одинаковых запросов создаётся '
+            'ровно один отзыв, а остальные получают ошибку валидации.'
+        )
+        assert Review.objects.filter(title=title).count() == 1
+        title.refresh_from_db()
+        assert title.review_count == 1
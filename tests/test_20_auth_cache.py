@@ -0,0 +1,156 @@
+from http import HTTPStatus
+
+import pytest
+from django.test import Client
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20AuthCache:
+
+    ME_URL = '/api/v1/users/me/'
+    CATEGORIES_URL = '/api/v1/categories/'
+
+    def test_01_cached_user(self, user_client, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = user_client.get(self.ME_URL)
+        assert response.status_code == HTTPStatus.OK
+        # Повторно читается только профиль: пользователь — из кэша.
+        with django_assert_num_queries(1):
+            response = user_client.get(self.ME_URL)
+        assert response.json()['username'] == 'TestUser', (
+            'Проверьте, что повторный запрос с тем же токеном берёт '
+            'пользователя из кэша без запроса к базе.'
+        )
+
+    def test_02_profile_change_invalidates(self, user_client, admin_client,
+                                           user):
+        user_client.get(self.ME_URL)
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'bio': 'новое'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert user_client.get(self.ME_URL).json()['bio'] == 'новое'
+
+    def test_03_role_change_invalidates(self, user_client, admin_client,
+                                        user):
+        data = {'name': 'Категория', 'slug': 'auth-cache'}
+        response = user_client.post(self.CATEGORIES_URL, data=data)
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'admin'}
+        )
+        response = user_client.post(self.CATEGORIES_URL, data=data)
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что смена роли сразу сбрасывает пользователя '
+            'в кэше аутентификации.'
+        )
+
+    def test_04_admin_list_editable(self, user_client, user_superuser, user):
+        data = {'name': 'Категория', 'slug': 'auth-cache'}
+        assert user_client.post(
+            self.CATEGORIES_URL, data=data
+        ).status_code == HTTPStatus.FORBIDDEN
+
+        client = Client()
+        client.force_login(user_superuser)
+        response = client.post('/admin/reviews/user/', data={
+            'form-TOTAL_FORMS': '1',
+            'form-INITIAL_FORMS': '1',
+            'form-0-id': str(user.id),
+            'form-0-role': 'admin',
+            '_save': 'Сохранить',
+        })
+        assert response.status_code == HTTPStatus.FOUND
+        user.refresh_from_db()
+        assert user.role == 'admin'
+        response = user_client.post(self.CATEGORIES_URL, data=data)
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что смена роли через list_editable в админке '
+            'сбрасывает пользователя в кэше аутентификации.'
+        )
+
+    def test_05_deactivated_user(self, user_client, user):
+        user_client.get(self.ME_URL)
+        user.is_active = False
+        user.save()
+        response = user_client.get(self.ME_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что деактивированный пользователь сразу теряет '
+            'доступ, даже если был в кэше.'
+        )
+
+    def test_06_token_cache_bounds(self, settings, monkeypatch):
+        from api import authentication
+        from api.authentication import TokenCache
+
+        settings.AUTH_TOKEN_CACHE_SIZE = 2
+        tokens = TokenCache()
+        for key in 'abc':
+            tokens.set(key, key.upper(), 60)
+        assert len(tokens.items) == 2, (
+            'Проверьте, что размер кэша токенов ограничен '
+            'AUTH_TOKEN_CACHE_SIZE.'
+        )
+        assert tokens.get('a') is None
+        assert tokens.get('b') == 'B'
+        tokens.set('d', 'D', 60)
+        assert tokens.get('c') is None, (
+            'Проверьте, что вытесняется давно не использованный токен.'
+        )
+
+        now = authentication.time.monotonic()
+        monkeypatch.setattr(
+            authentication.time, 'monotonic', lambda: now + 61
+        )
+        assert tokens.get('b') is None, (
+            'Проверьте, что записи кэша токенов истекают.'
+        )
+
+    def test_07_cached_fields(self, user_client, user):
+        from django.core.cache import cache
+
+        from api.authentication import USER_KEY
+
+        user_client.get(self.ME_URL)
+        cached = repr(cache.get(USER_KEY.format(user.id)))
+        assert user.username in cached
+        for field in ('password', 'confirmation_code', 'email'):
+            assert field not in cached, (
+                'Проверьте, что в кэше аутентификации хранятся только поля '
+                f'для прав доступа: нашлось `{field}`.'
+            )
+        response = user_client.get(self.ME_URL)
+        assert response.json()['email'] == user.email, (
+            'Проверьте, что профиль пользователя из кэша читается из базы.'
+        )
+
+    @pytest.mark.parametrize('write', ['update', 'bulk_update', 'import'])
+    def test_08_writes_without_signals(self, user_client, user, write):
+        from django.db import connection
+
+        from reviews.models import User
+        from reviews.signals import data_imported
+
+        data = {'name': 'Категория', 'slug': 'auth-cache'}
+        assert user_client.post(
+            self.CATEGORIES_URL, data=data
+        ).status_code == HTTPStatus.FORBIDDEN
+        if write == 'update':
+            User.objects.filter(pk=user.pk).update(role='admin')
+        elif write == 'bulk_update':
+            user.role = 'admin'
+            User.objects.bulk_update([user], ['role'])
+        else:
+            # import_db пишет сырым SQL и сообщает об импорте сигналом.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'UPDATE reviews_user SET role = %s WHERE id = %s',
+                    ['admin', user.pk],
+                )
+            data_imported.send(sender=None, models=[User])
+        response = user_client.post(self.CATEGORIES_URL, data=data)
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Проверьте, что {write} пользователей сбрасывает кэш '
+            'аутентификации.'
+        )
@@ -0,0 +1,180 @@
+import time
+from http import HTTPStatus
+
+import pytest
+
+RATES = {
+    'signup-ip': '5/min',
+    'signup-username': '3/min',
+    'token-ip': '5/min',
+    'token-username': '3/min',
+    'content-write-user': '2/min',
+    'content-write-ip': '3/min',
+}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21Throttling:
+
+    SIGNUP_URL = '/api/v1/auth/signup/'
+    TOKEN_URL = '/api/v1/auth/token/'
+
+    @pytest.fixture(autouse=True)
+    def rates(self, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': RATES,
+        }
+
+    def signup(self, client, username, ip='10.0.0.1'):
+        return client.post(self.SIGNUP_URL, data={
+            'username': username, 'email': f'{username}@yamdb.fake',
+        }, REMOTE_ADDR=ip)
+
+    def test_01_signup_per_username(self, client):
+        statuses = [
+            self.signup(client, 'throttled', ip=f'10.0.0.{index}')
+            .status_code
+            for index in range(4)
+        ]
+        assert statuses == [HTTPStatus.OK] * 3 + [
+            HTTPStatus.TOO_MANY_REQUESTS
+        ], (
+            'Проверьте, что частота регистрации ограничена для имени '
+            'пользователя, даже если запросы идут с разных адресов.'
+        )
+        response = self.signup(client, 'throttled', ip='10.0.0.100')
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        assert int(response['Retry-After']) > 0, (
+            'Проверьте, что ответ 429 сообщает время ожидания.'
+        )
+
+    def test_02_signup_per_ip(self, client):
+        statuses = [
+            self.signup(client, f'user{index}').status_code
+            for index in range(6)
+        ]
+        assert statuses == [HTTPStatus.OK] * 5 + [
+            HTTPStatus.TOO_MANY_REQUESTS
+        ], (
+            'Проверьте, что частота регистрации ограничена для IP-адреса.'
+        )
+        assert self.signup(
+            client, 'other', ip='10.0.0.2'
+        ).status_code == HTTPStatus.OK
+
+    def test_03_token_brute_force(self, client, user):
+        statuses = [
+            client.post(self.TOKEN_URL, data={
+                'username': user.username,
+                'confirmation_code': f'{code:06}',
+            }, REMOTE_ADDR=f'10.0.1.{code}').status_code
+            for code in range(5)
+        ]
+        assert statuses[:3] == [HTTPStatus.BAD_REQUEST] * 3
+        assert statuses[3:] == [HTTPStatus.TOO_MANY_REQUESTS] * 2, (
+            'Проверьте, что подбор кода подтверждения для одного '
+            'пользователя ограничен по частоте.'
+        )
+
+    def test_04_review_posts(self, user_client, client):
+        from reviews.models import Title
+
+        titles = [
+            Title.objects.create(name=f'Произведение {index}', year=2000)
+            for index in range(3)
+        ]
+        statuses = [
+            user_client.post(
+                f'/api/v1/titles/{title.id}/reviews/',
+                data={'text': 'Отзыв', 'score': 5},
+            ).status_code
+            for title in titles
+        ]
+        assert statuses == [HTTPStatus.CREATED] * 2 + [
+            HTTPStatus.TOO_MANY_REQUESTS
+        ], (
+            'Проверьте, что частота создания отзывов ограничена.'
+        )
+        url = f'/api/v1/titles/{titles[0].id}/reviews/'
+        for _ in range(5):
+            assert client.get(url).status_code == HTTPStatus.OK, (
+                'Проверьте, что чтение отзывов не ограничено.'
+            )
+
+    def test_05_bucket_refills(self, client, monkeypatch):
+        from api.throttling import TokenBucketThrottle
+
+        now = [1000.0]
+        monkeypatch.setattr(TokenBucketThrottle, 'timer', lambda self: now[0])
+        for index in range(3):
+            assert self.signup(client, 'refill').status_code == HTTPStatus.OK
+        assert self.signup(
+            client, 'refill'
+        ).status_code == HTTPStatus.TOO_MANY_REQUESTS
+        # 3/min: один токен возвращается за 20 секунд.
+        now[0] += 20
+        assert self.signup(client, 'refill').status_code == HTTPStatus.OK, (
+            'Проверьте, что ведро токенов наполняется со временем.'
+        )
+        assert self.signup(
+            client, 'refill'
+        ).status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+    def test_06_constant_state(self, client):
+        from django.core.cache import cache
+
+        from api.throttling import SignupIPThrottle
+
+        for index in range(5):
+            self.signup(client, f'state{index}')
+        throttle = SignupIPThrottle()
+        tokens, updated = cache.get(throttle.get_ident_key('10.0.0.1'))
+        assert 0 <= tokens < 1, (
+            'Проверьте, что для клиента хранится одна пара '
+            '(токены, время), а не история запросов.'
+        )
+
+    def test_07_parallel_requests(self, rf, monkeypatch):
+        from concurrent.futures import ThreadPoolExecutor
+        from threading import Barrier
+
+        from django.core.cache.backends.locmem import LocMemCache
+
+        from api.throttling import SignupIPThrottle
+
+        get = LocMemCache.get
+
+        def slow_get(*args, **kwargs):
+            # Расширяет окно между чтением и записью ведра.
+            value = get(*args, **kwargs)
+            time.sleep(0.01)
+            return value
+
+        monkeypatch.setattr(LocMemCache, 'get', slow_get)
+        workers = 20
+        barrier = Barrier(workers)
+
+        def request(_):
+            barrier.wait()
+            return SignupIPThrottle().allow_request(
+                rf.post('/', REMOTE_ADDR='10.0.2.1'), None
+            )
+
+        with ThreadPoolExecutor(workers) as executor:
+            allowed = sum(executor.map(request, range(workers)))
+        assert allowed == 5, (
+            'Проверьте, что параллельные запросы одного клиента не '
+            'проходят сверх лимита: пополнение и списание токена должны '
+            f'быть атомарными (пропущено {allowed} из 5).'
+        )
+
+    @pytest.mark.parametrize('body', ([], [1], 'username'))
+    def test_08_not_an_object(self, client, body):
+        for url in (self.SIGNUP_URL, self.TOKEN_URL):
+            response = client.post(
+                url, data=body, content_type='application/json'
+            )
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                f'Проверьте, что тело запроса к `{url}`, которое не '
+                'объект JSON, даёт 400, а не ошибку сервера.'
+            )
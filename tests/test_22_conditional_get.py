@@ -0,0 +1,172 @@
+from http import HTTPStatus
+
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22ConditionalGet:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    @pytest.fixture
+    def title(self):
+        from reviews.models import Category, Genre, Title
+
+        title = Title.objects.create(
+            name='Произведение', year=2000,
+            category=Category.objects.create(name='Книги', slug='books'),
+        )
+        title.genre.set([Genre.objects.create(name='Драма', slug='drama')])
+        return title
+
+    def revalidate(self, client, url, response):
+        return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    @pytest.mark.parametrize('suffix', ('', '?year=2000', '?search=произв'))
+    def test_01_not_modified(self, client, title, suffix, monkeypatch,
+                             django_assert_num_queries):
+        from api.serializers import TitleViewSerializer
+
+        url = f'{self.TITLES_URL}{suffix}'
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert response['ETag'].startswith('"'), (
+            'Проверьте, что список произведений отдаёт сильный ETag.'
+        )
+        assert response.has_header('Last-Modified')
+        assert response['Cache-Control'] == 'no-cache'
+
+        def fail(*args, **kwargs):
+            raise AssertionError('Ответ 304 не должен сериализоваться.')
+
+        monkeypatch.setattr(TitleViewSerializer, 'to_representation', fail)
+        with django_assert_num_queries(0):
+            not_modified = self.revalidate(client, url, response)
+        assert not_modified.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что запрос с совпадающим If-None-Match получает '
+            '304 без сериализации, а закэшированный ответ — без запросов '
+            'к базе.'
+        )
+        assert not_modified['ETag'] == response['ETag']
+        assert client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_02_related_changes(self, client, user_client, title):
+        url = f'{self.TITLES_URL}{title.id}/'
+        response = client.get(url)
+
+        user_client.post(f'{url}reviews/', data={'text': 'Отзыв',
+                                                 'score': 8})
+        changed = self.revalidate(client, url, response)
+        assert changed.status_code == HTTPStatus.OK, (
+            'Проверьте, что изменение рейтинга меняет ETag произведения.'
+        )
+        assert changed.json()['rating'] == 8
+
+        category = title.category
+        category.name = 'Романы'
+        category.save()
+        renamed = self.revalidate(client, url, changed)
+        assert renamed.status_code == HTTPStatus.OK, (
+            'Проверьте, что переименование категории меняет ETag '
+            'произведения.'
+        )
+        assert renamed.json()['category']['name'] == 'Романы'
+
+        title.genre.clear()
+        assert self.revalidate(
+            client, url, renamed
+        ).status_code == HTTPStatus.OK, (
+            'Проверьте, что изменение жанров меняет ETag произведения.'
+        )
+
+    def test_03_reviews_and_comments(self, client, admin, user, title):
+        from reviews.models import Comment, Review
+
+        reviews_url = f'{self.TITLES_URL}{title.id}/reviews/'
+        review = Review.objects.create(
+            title=title, author=admin, text='Отзыв', score=5
+        )
+        Review.objects.create(title=title, author=user, text='Отзыв',
+                              score=6)
+        response = client.get(reviews_url)
+        assert self.revalidate(
+            client, reviews_url, response
+        ).status_code == HTTPStatus.NOT_MODIFIED
+
+        review.delete()
+        assert self.revalidate(
+            client, reviews_url, response
+        ).status_code == HTTPStatus.OK, (
+            'Проверьте, что удаление отзыва меняет ETag списка.'
+        )
+
+        review = Review.objects.get()
+        comment = Comment.objects.create(review=review, author=admin,
+                                         text='Комментарий')
+        comment_url = f'{reviews_url}{review.id}/comments/{comment.id}/'
+        response = client.get(comment_url)
+        assert response['Cache-Control'] == 'no-cache'
+        assert self.revalidate(
+            client, comment_url, response
+        ).status_code == HTTPStatus.NOT_MODIFIED
+
+        admin.username = 'RenamedAdmin'
+        admin.save()
+        changed = self.revalidate(client, comment_url, response)
+        assert changed.status_code == HTTPStatus.OK, (
+            'Проверьте, что смена имени автора меняет ETag комментария.'
+        )
+        assert changed.json()['author'] == 'RenamedAdmin'
+
+    def test_04_reference_data_max_age(self, client, title, settings):
+        settings.REFERENCE_DATA_MAX_AGE = 120
+        for url in ('/api/v1/genres/', '/api/v1/categories/'):
+            response = client.get(url)
+            assert response['Cache-Control'] == 'max-age=120', (
+                f'Проверьте, что `{url}` отдаёт Cache-Control с max-age '
+                'из настройки REFERENCE_DATA_MAX_AGE.'
+            )
+            assert self.revalidate(
+                client, url, response
+            ).status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_05_missing_object(self, client, title):
+        url = f'{self.TITLES_URL}{title.id + 1}/'
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        assert not response.has_header('ETag')
+        for headers in (
+            {'HTTP_IF_NONE_MATCH': '*'},
+            {'HTTP_IF_MODIFIED_SINCE': 'Fri, 01 Jan 2100 00:00:00 GMT'},
+        ):
+            assert client.get(url, **headers).status_code == (
+                HTTPStatus.NOT_FOUND
+            ), (
+                'Проверьте, что несуществующий объект даёт 404 и при '
+                'условном запросе, а не 304.'
+            )
+        for url in (
+            f'{self.TITLES_URL}abc/',
+            f'{self.TITLES_URL}{title.id}/reviews/abc/',
+            f'{self.TITLES_URL}{title.id}/reviews/1/comments/abc/',
+        ):
+            assert client.get(url).status_code == HTTPStatus.NOT_FOUND, (
+                f'Проверьте, что `{url}` с нечисловым id даёт 404.'
+            )
+
+    def test_06_shared_cache_check(self, settings, tmp_path):
+        from django.core.checks import run_checks
+
+        settings.DEBUG = False
+        assert 'api.W001' in [message.id for message in run_checks()], (
+            'Проверьте, что кэш одного процесса при DEBUG = False даёт '
+            'предупреждение: отметки удалений и версии таблиц должны '
+            'быть общими для процессов.'
+        )
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path),
+        }}
+        assert 'api.W001' not in [message.id for message in run_checks()]
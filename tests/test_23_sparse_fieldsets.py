@@ -0,0 +1,109 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23SparseFieldsets:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    @pytest.fixture
+    def title(self, admin):
+        from reviews.models import Category, Comment, Genre, Review, Title
+
+        category = Category.objects.create(name='Книги', slug='books')
+        genre = Genre.objects.create(name='Драма', slug='drama')
+        for index in range(5):
+            title = Title.objects.create(
+                name=f'Произведение {index}', year=2000,
+                description='Длинное описание', category=category,
+            )
+            title.genre.set([genre])
+        review = Review.objects.create(title=title, author=admin,
+                                       text='Отзыв', score=9)
+        Comment.objects.create(review=review, author=admin,
+                               text='Комментарий')
+        return title
+
+    def get(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, response.content
+        return response.json(), [
+            query['sql'] for query in context.captured_queries
+        ]
+
+    def test_01_title_fields(self, client, title):
+        data, queries = self.get(
+            client, f'{self.TITLES_URL}?fields=id,name,rating'
+        )
+        assert all(
+            set(item) == {'id', 'name', 'rating'} for item in data['results']
+        ), (
+            'Проверьте, что `?fields=` оставляет в ответе только '
+            'перечисленные поля.'
+        )
+        page_sql = queries[-1]
+        assert 'description' not in page_sql, (
+            'Проверьте, что невыбранные поля не читаются из базы (only()).'
+        )
+        assert 'reviews_category' not in page_sql
+        assert not any('reviews_genre' in sql for sql in queries), (
+            'Проверьте, что без поля `genre` жанры не загружаются.'
+        )
+
+    def test_02_title_omit(self, client, title, django_assert_num_queries):
+        url = f'{self.TITLES_URL}{title.id}/?omit=genre,description'
+        # Состояние для ETag и сам объект, без prefetch жанров.
+        with django_assert_num_queries(2):
+            response = client.get(url)
+        assert set(response.json()) == {
+            'id', 'name', 'year', 'rating', 'category'
+        }
+        assert response.json()['category']['slug'] == 'books'
+
+    def test_03_title_cursor(self, client, title, django_assert_num_queries):
+        with django_assert_num_queries(2):
+            response = client.get(
+                f'{self.TITLES_URL}?cursor=&limit=2&fields=id'
+            )
+        data = response.json()
+        assert [set(item) for item in data['results']] == [{'id'}] * 2
+        assert data['next'], (
+            'Проверьте, что курсорная пагинация работает с `?fields=`.'
+        )
+
+    def test_04_reviews_and_comments(self, client, title):
+        reviews_url = f'{self.TITLES_URL}{title.id}/reviews/'
+        data, queries = self.get(client, f'{reviews_url}?fields=id,score')
+        assert data['results'] == [
+            {'id': title.reviews.get().id, 'score': 9}
+        ]
+        assert 'reviews_user' not in queries[-1], (
+            'Проверьте, что без поля `author` автор не загружается.'
+        )
+
+        review_id = data['results'][0]['id']
+        data, queries = self.get(
+            client, f'{reviews_url}{review_id}/comments/?omit=author'
+        )
+        assert set(data['results'][0]) == {'id', 'text', 'pub_date'}
+        assert 'reviews_user' not in queries[-1]
+
+    def test_05_unknown_field(self, client, title):
+        response = client.get(f'{self.TITLES_URL}?fields=id,secret')
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что неизвестное поле в `?fields=` даёт ошибку 400.'
+        )
+        assert 'secret' in response.json()['fields'][0]
+
+    def test_06_cached_separately(self, client, title):
+        full = client.get(self.TITLES_URL).json()
+        sparse = client.get(f'{self.TITLES_URL}?fields=name').json()
+        assert 'description' in full['results'][0]
+        assert set(sparse['results'][0]) == {'name'}, (
+            'Проверьте, что кэш ответов учитывает `?fields=`.'
+        )
@@ -0,0 +1,278 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24BulkApi:
+
+    TITLES_BULK_URL = '/api/v1/titles/bulk/'
+    GENRES_BULK_URL = '/api/v1/genres/bulk/'
+    CATEGORIES_BULK_URL = '/api/v1/categories/bulk/'
+
+    @pytest.fixture
+    def reference_data(self):
+        from reviews.models import Category, Genre
+
+        Category.objects.create(name='Книги', slug='books')
+        Category.objects.create(name='Фильмы', slug='movies')
+        Genre.objects.create(name='Драма', slug='drama')
+        Genre.objects.create(name='Комедия', slug='comedy')
+
+    def titles(self, count, start=0):
+        return [
+            {
+                'name': f'Произведение {index}',
+                'year': 2000 + index % 20,
+                'genre': ['drama', 'comedy'] if index % 2 else ['drama'],
+                'category': 'books',
+            }
+            for index in range(start, start + count)
+        ]
+
+    def post(self, client, url, data):
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(url, data=data, format='json')
+        return response, len(context.captured_queries)
+
+    def test_01_create_titles(self, admin_client, reference_data):
+        from reviews.models import Title
+
+        response = admin_client.post(
+            self.TITLES_BULK_URL, data=self.titles(3), format='json'
+        )
+        assert response.status_code == HTTPStatus.CREATED, response.content
+        data = response.json()
+        assert [item['name'] for item in data] == [
+            f'Произведение {index}' for index in range(3)
+        ]
+        assert len({item['id'] for item in data}) == 3
+        for item in data:
+            title = Title.objects.get(pk=item['id'])
+            assert title.name == item['name'], (
+                'Проверьте, что ответ возвращает id созданных произведений.'
+            )
+            assert sorted(
+                genre['slug'] for genre in item['genre']
+            ) == sorted(title.genre.values_list('slug', flat=True))
+        assert data[1]['category'] == {'name': 'Книги', 'slug': 'books'}
+
+        _, small = self.post(
+            admin_client, self.TITLES_BULK_URL, self.titles(2, start=3)
+        )
+        response, large = self.post(
+            admin_client, self.TITLES_BULK_URL, self.titles(60, start=5)
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        assert large == small, (
+            'Проверьте, что число запросов пакетного создания не зависит '
+            'от размера пакета: без RETURNING (SQLite в Django 3.2) id '
+            'строк читаются одним запросом.'
+        )
+        assert Title.objects.count() == 65
+        assert Title.genre.through.objects.count() == 65 + 32
+
+    def test_02_all_or_nothing(self, admin_client, reference_data):
+        from reviews.models import Title
+
+        batch = self.titles(4)
+        batch[1]['genre'] = ['drama', 'horror']
+        batch[2]['year'] = 3000
+        del batch[3]['category']
+        response = admin_client.post(
+            self.TITLES_BULK_URL, data=batch, format='json'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        errors = response.json()
+        assert len(errors) == 4, (
+            'Проверьте, что ошибки возвращаются по позициям элементов.'
+        )
+        assert errors[0] == {}
+        assert 'horror' in errors[1]['genre'][0]
+        assert set(errors[2]) == {'year'}
+        assert set(errors[3]) == {'category'}
+        assert not Title.objects.exists(), (
+            'Проверьте, что пакет с ошибкой не создаёт ни одного объекта.'
+        )
+
+    @pytest.mark.parametrize('data', ([], {'name': 'Один'}))
+    def test_03_not_a_batch(self, admin_client, data):
+        response = admin_client.post(
+            self.GENRES_BULK_URL, data=data, format='json'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_04_permissions(self, client, user_client, moderator_client):
+        batch = [{'name': 'Драма', 'slug': 'drama'}]
+        assert client.post(
+            self.GENRES_BULK_URL, data=json.dumps(batch),
+            content_type='application/json',
+        ).status_code == HTTPStatus.UNAUTHORIZED
+        for other_client in (user_client, moderator_client):
+            assert other_client.post(
+                self.GENRES_BULK_URL, data=batch, format='json'
+            ).status_code == HTTPStatus.FORBIDDEN, (
+                'Проверьте, что пакетные операции доступны только админу.'
+            )
+
+    def test_05_update_titles(self, client, admin_client, reference_data):
+        from reviews.models import Title
+
+        created = admin_client.post(
+            self.TITLES_BULK_URL, data=self.titles(2), format='json'
+        ).json()
+        detail_url = f'/api/v1/titles/{created[0]["id"]}/'
+        etag = client.get(detail_url)['ETag']
+        client.get('/api/v1/titles/')
+
+        response = admin_client.patch(self.TITLES_BULK_URL, data=[
+            {'id': created[0]['id'], 'name': 'Новое', 'genre': ['comedy'],
+             'category': 'movies'},
+            {'id': created[1]['id'], 'year': 1999},
+        ], format='json')
+        assert response.status_code == HTTPStatus.OK, response.content
+        first, second = Title.objects.order_by('id')
+        assert first.name == 'Новое'
+        assert first.category.slug == 'movies'
+        assert list(first.genre.values_list('slug', flat=True)) == [
+            'comedy'
+        ]
+        assert second.year == 1999
+        assert second.genre.count() == 2, (
+            'Проверьте, что без поля genre жанры произведения не меняются.'
+        )
+        assert client.get(
+            detail_url, HTTP_IF_NONE_MATCH=etag
+        ).status_code == HTTPStatus.OK, (
+            'Проверьте, что пакетное изменение меняет ETag произведения.'
+        )
+        names = [
+            item['name'] for item in client.get('/api/v1/titles/').json()[
+                'results'
+            ]
+        ]
+        assert 'Новое' in names, (
+            'Проверьте, что пакетное изменение сбрасывает кэш ответов.'
+        )
+
+        response = admin_client.patch(self.TITLES_BULK_URL, data=[
+            {'id': first.id, 'name': 'Ещё новее'},
+            {'name': 'Без id'},
+            {'id': first.id + 100, 'name': 'Нет такого'},
+        ], format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        errors = response.json()
+        assert errors[0] == {} and 'id' in errors[1] and 'id' in errors[2]
+        first.refresh_from_db()
+        assert first.name == 'Новое'
+
+    def test_06_delete_titles(self, admin_client, reference_data):
+        from reviews.models import Title
+
+        ids = [
+            item['id'] for item in admin_client.post(
+                self.TITLES_BULK_URL, data=self.titles(3), format='json'
+            ).json()
+        ]
+        response = admin_client.delete(
+            self.TITLES_BULK_URL, data=[ids[0], ids[-1] + 1], format='json'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json()[0] == {}
+        assert Title.objects.count() == 3, (
+            'Проверьте, что пакет удаления с ошибкой ничего не удаляет.'
+        )
+        response = admin_client.delete(
+            self.TITLES_BULK_URL, data=ids[:2], format='json'
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert list(Title.objects.values_list('id', flat=True)) == ids[2:]
+
+    def test_07_genres_and_categories(self, admin_client, reference_data):
+        from reviews.models import Category, Genre, Title
+
+        response = admin_client.post(self.GENRES_BULK_URL, data=[
+            {'name': 'Ужасы', 'slug': 'horror'},
+            {'name': 'Драма 2', 'slug': 'drama'},
+            {'name': 'Ужасы 2', 'slug': 'horror'},
+        ], format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        errors = response.json()
+        assert errors[0] == {}
+        assert 'slug' in errors[1], (
+            'Проверьте, что пакет не создаёт жанр с занятым slug.'
+        )
+        assert 'slug' in errors[2], (
+            'Проверьте, что slug не может повторяться внутри пакета.'
+        )
+        assert Genre.objects.count() == 2
+
+        response = admin_client.post(self.CATEGORIES_BULK_URL, data=[
+            {'name': 'Музыка', 'slug': 'music'},
+            {'name': 'Игры', 'slug': 'games'},
+        ], format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json() == [
+            {'name': 'Музыка', 'slug': 'music'},
+            {'name': 'Игры', 'slug': 'games'},
+        ]
+
+        title = Title.objects.create(
+            name='Произведение', year=2000,
+            category=Category.objects.get(slug='books'),
+        )
+        updated_at = title.updated_at
+        response = admin_client.patch(self.CATEGORIES_BULK_URL, data=[
+            {'slug': 'books', 'name': 'Литература'},
+        ], format='json')
+        assert response.status_code == HTTPStatus.OK
+        assert admin_client.get(
+            f'/api/v1/titles/{title.id}/'
+        ).json()['category']['name'] == 'Литература'
+        title.refresh_from_db()
+        assert title.updated_at > updated_at, (
+            'Проверьте, что переименование категории пакетом обновляет '
+            'дату изменения её произведений.'
+        )
+
+        response = admin_client.delete(
+            self.CATEGORIES_BULK_URL, data=['music', 'games'], format='json'
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert set(Category.objects.values_list('slug', flat=True)) == {
+            'books', 'movies'
+        }
+
+    def test_08_reserved_slug_and_id(self, admin_client, reference_data):
+        from reviews.models import Category, Genre, Title
+
+        for url in ('/api/v1/genres/', '/api/v1/categories/'):
+            response = admin_client.post(
+                url, data={'name': 'Пакет', 'slug': 'bulk'}
+            )
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                f'Проверьте, что `{url}` не создаёт объект со slug `bulk`: '
+                'его детальный маршрут перекрыт пакетными операциями.'
+            )
+        response = admin_client.post(self.GENRES_BULK_URL, data=[
+            {'name': 'Пакет', 'slug': 'bulk'},
+        ], format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'slug' in response.json()[0]
+        assert not Genre.objects.filter(slug='bulk').exists()
+        assert not Category.objects.filter(slug='bulk').exists()
+
+        batch = self.titles(2)
+        batch[1]['id'] = 1000
+        response = admin_client.post(
+            self.TITLES_BULK_URL, data=batch, format='json'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        errors = response.json()
+        assert errors[0] == {} and set(errors[1]) == {'id'}, (
+            'Проверьте, что при пакетном создании id не принимается.'
+        )
+        assert not Title.objects.exists()
@@ -0,0 +1,104 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25ExportApi:
+
+    EXPORT_URL = '/api/v1/export/{}/'
+
+    @pytest.fixture
+    def titles(self, admin, user):
+        from reviews.models import Category, Comment, Genre, Review, Title
+
+        category = Category.objects.create(name='Книги', slug='books')
+        genres = [
+            Genre.objects.create(name='Драма', slug='drama'),
+            Genre.objects.create(name='Комедия', slug='comedy'),
+        ]
+        titles = []
+        for index in range(5):
+            title = Title.objects.create(
+                name=f'Произведение {index}', year=2000,
+                description='Описание',
+                category=category if index % 2 else None,
+            )
+            title.genre.set(genres[:index % 3])
+            titles.append(title)
+        for author in (admin, user):
+            review = Review.objects.create(
+                title=titles[0], author=author, text='Отзыв', score=7
+            )
+            Comment.objects.create(review=review, author=user,
+                                   text='Комментарий')
+        return titles
+
+    def read(self, response):
+        chunks = list(response.streaming_content)
+        return chunks, [
+            json.loads(line)
+            for line in b''.join(chunks).decode().splitlines()
+        ]
+
+    def test_01_titles(self, client, admin_client, titles, settings):
+        settings.EXPORT_CHUNK_SIZE = 2
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get(self.EXPORT_URL.format('titles'))
+        assert response.status_code == HTTPStatus.OK
+        assert response.streaming, (
+            'Проверьте, что выгрузка отдаётся StreamingHttpResponse.'
+        )
+        assert response['Content-Type'] == 'application/x-ndjson'
+        assert not any(
+            'reviews_title' in query['sql']
+            for query in context.captured_queries
+        ), (
+            'Проверьте, что строки читаются из базы только при чтении '
+            'ответа, а не до его отправки.'
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            chunks, items = self.read(response)
+        assert len(chunks) == 3, (
+            'Проверьте, что выгрузка идёт пачками по EXPORT_CHUNK_SIZE.'
+        )
+        # По два запроса на пачку (произведения и их жанры) и пустая
+        # последняя выборка.
+        assert len(context.captured_queries) == 3 * 2 + 1
+        assert [item['id'] for item in items] == sorted(
+            title.id for title in titles
+        )
+        for item in items:
+            assert item == client.get(
+                f'/api/v1/titles/{item["id"]}/'
+            ).json(), (
+                'Проверьте, что произведение в выгрузке совпадает с его '
+                'представлением в API.'
+            )
+
+    @pytest.mark.parametrize('resource', ('reviews', 'comments'))
+    def test_02_reviews_and_comments(self, client, admin_client, titles,
+                                     resource):
+        _, items = self.read(
+            admin_client.get(self.EXPORT_URL.format(resource))
+        )
+        assert len(items) == 2
+        for item in items:
+            url = f'/api/v1/titles/{item.pop("title")}/reviews/'
+            if resource == 'comments':
+                url += f'{item.pop("review")}/comments/'
+            assert item == client.get(f'{url}{item["id"]}/').json()
+
+    def test_03_permissions(self, client, user_client, titles):
+        url = self.EXPORT_URL.format('titles')
+        assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED
+        assert user_client.get(url).status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что выгрузка доступна только админу.'
+        )
+        assert client.get(
+            self.EXPORT_URL.format('users')
+        ).status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,114 @@
+import gzip
+import io
+import os
+import shutil
+
+import pytest
+from django.core.management import call_command
+
+from tests.test_13_import_db import DATA_PATH, count_csv_rows
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    path = tmp_path / 'data'
+    shutil.copytree(DATA_PATH, path)
+    return path
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26ExportDb:
+
+    def dump_tables(self):
+        from reviews.dataset import TABLES
+
+        dump = {}
+        for table in TABLES:
+            fields = [field for _, field in table.csv_columns]
+            if table.name == 'titles':
+                fields.append('rating')
+            dump[table.name] = list(
+                table.model.objects.order_by('pk').values_list(*fields)
+            )
+        return dump
+
+    def export(self, path, **options):
+        out = io.StringIO()
+        call_command('export_db', path=str(path), stdout=out, **options)
+        return out.getvalue()
+
+    def test_01_round_trip(self, csv_dir, tmp_path):
+        call_command('import_db', path=str(csv_dir), stdout=io.StringIO())
+        imported = self.dump_tables()
+
+        report = self.export(tmp_path / 'export', chunk_size=7)
+        assert 'строк/с' in report
+        for filename in os.listdir(csv_dir):
+            assert count_csv_rows(
+                tmp_path / 'export' / filename
+            ) == count_csv_rows(csv_dir / filename), (
+                f'Проверьте, что `export_db` выгружает все строки {filename}.'
+            )
+
+        call_command('import_db', path=str(tmp_path / 'export'), clear=True,
+                     stdout=io.StringIO())
+        assert self.dump_tables() == imported, (
+            'Проверьте, что импорт выгрузки `export_db` восстанавливает '
+            'базу.'
+        )
+
+    def test_02_round_trip_api_data(self, tmp_path, admin, user):
+        from reviews.models import Category, Comment, Genre, Review, Title
+
+        title = Title.objects.create(
+            name='Без категории, "с кавычками"', year=1999,
+            description='Строка 1\nСтрока 2',
+        )
+        title.genre.set([Genre.objects.create(name='Драма', slug='drama')])
+        Title.objects.create(
+            name='С категорией', year=2000,
+            category=Category.objects.create(name='Книги', slug='books'),
+        )
+        review = Review.objects.create(title=title, author=user,
+                                       text='Отзыв', score=8)
+        Comment.objects.create(review=review, author=admin, text='Ответ')
+        expected = self.dump_tables()
+
+        self.export(tmp_path)
+        call_command('import_db', path=str(tmp_path), clear=True,
+                     stdout=io.StringIO())
+        assert self.dump_tables() == expected, (
+            'Проверьте, что выгрузка сохраняет пустую категорию, переводы '
+            'строк, кавычки и микросекунды дат.'
+        )
+
+    def test_03_gzip_and_workers(self, csv_dir, tmp_path):
+        call_command('import_db', path=str(csv_dir), stdout=io.StringIO())
+        self.export(tmp_path / 'plain')
+        self.export(tmp_path / 'packed', gzip=True, workers=3, chunk_size=5)
+        for filename in os.listdir(tmp_path / 'plain'):
+            packed = tmp_path / 'packed' / f'{filename}.gz'
+            assert packed.exists(), (
+                'Проверьте, что `--gzip` пишет файлы с суффиксом .gz.'
+            )
+            assert gzip.decompress(packed.read_bytes()) == (
+                tmp_path / 'plain' / filename
+            ).read_bytes(), (
+                'Проверьте, что сжатая выгрузка в пуле процессов совпадает '
+                'с последовательной.'
+            )
+
+    def test_04_default_path(self, csv_dir, tmp_path, monkeypatch):
+        call_command('import_db', path=str(csv_dir), stdout=io.StringIO())
+        data_path = tmp_path / 'static' / 'data'
+        shutil.copytree(csv_dir, data_path)
+        (data_path / 'genre.csv').write_text('id,name,slug\n')
+        monkeypatch.chdir(tmp_path)
+        call_command('export_db', stdout=io.StringIO())
+        assert (data_path / 'genre.csv').read_text() == 'id,name,slug\n', (
+            'Проверьте, что `export_db` без `--path` не перезаписывает '
+            'файлы, которые читает `import_db`.'
+        )
+        assert count_csv_rows(
+            tmp_path / 'static' / 'export' / 'genre.csv'
+        ) == count_csv_rows(csv_dir / 'genre.csv')
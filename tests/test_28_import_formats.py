@@ -0,0 +1,266 @@
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+from django.core.management import call_command
+
+from tests import test_13_import_db
+from tests.conftest import MANAGE_PATH
+from tests.test_13_import_db import DATA_PATH
+
+OPENERS = {'': open, '.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+RSS_SETTINGS = '''
+from api_yamdb.settings import *
+
+DATABASES = {{
+    'default': {{
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': {database!r},
+    }},
+}}
+'''
+
+RSS_SCRIPT = '''
+import os
+import sys
+
+import django
+
+django.setup()
+
+from django.core.management import call_command
+
+from reviews.management.commands.import_db import Command
+from reviews.models import Review
+
+
+def peak_rss():
+    # Пик RSS этого процесса (ru_maxrss унаследовал бы пик родителя).
+    with open('/proc/self/status') as status:
+        peak = next(line for line in status if line.startswith('VmHWM'))
+    return int(peak.split()[1])
+
+
+call_command('migrate', verbosity=0)
+peaks = []
+validate_inputs = Command.validate_inputs
+
+
+def measured(command, options):
+    validate_inputs(command, options)
+    peaks.append(peak_rss())
+
+
+Command.validate_inputs = measured
+Command.mmap_threshold = int(sys.argv[2])
+with open(os.devnull, 'w') as devnull:
+    call_command('import_db', path=sys.argv[1], stdout=devnull)
+print(Review.objects.count(), *peaks)
+'''
+
+
+def convert_data(target, extension, suffix):
+    '''Копия static/data в формате `extension` со сжатием `suffix`.'''
+    os.makedirs(target)
+    for filename in os.listdir(DATA_PATH):
+        with open(os.path.join(DATA_PATH, filename), encoding='utf-8',
+                  newline='') as file:
+            rows = list(csv.DictReader(file))
+        name = os.path.splitext(filename)[0] + extension + suffix
+        with OPENERS[suffix](os.path.join(target, name), 'wt',
+                             encoding='utf-8', newline='') as file:
+            if extension == '.jsonl':
+                for row in rows:
+                    file.write(json.dumps(row, ensure_ascii=False) + '\n')
+            else:
+                writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test28ImportFormats:
+
+    dump_tables = test_13_import_db.Test13ImportDb.dump_tables
+
+    def import_db(self, path, **options):
+        call_command('import_db', path=str(path), stdout=io.StringIO(),
+                     **options)
+        return self.dump_tables()
+
+    @pytest.mark.parametrize('extension, suffix', (
+        ('.csv', '.gz'), ('.csv', '.bz2'), ('.csv', '.xz'),
+        ('.jsonl', ''), ('.jsonl', '.gz'),
+    ))
+    def test_01_formats(self, tmp_path, extension, suffix):
+        expected = self.import_db(DATA_PATH)
+        convert_data(tmp_path / 'data', extension, suffix)
+        assert self.import_db(tmp_path / 'data', clear=True) == expected, (
+            f'Проверьте, что `import_db` читает файлы {extension}{suffix} '
+            'так же, как CSV.'
+        )
+
+    def test_02_mmap(self, tmp_path, monkeypatch):
+        from reviews.management.commands import _import_readers
+        from reviews.management.commands.import_db import Command
+
+        expected = self.import_db(DATA_PATH)
+        opened = []
+        mapped_lines = _import_readers.MappedLines
+
+        def spy(path):
+            opened.append(path)
+            return mapped_lines(path)
+
+        monkeypatch.setattr(_import_readers, 'MappedLines', spy)
+        monkeypatch.setattr(_import_readers, 'MMAP_RELEASE_STEP', 4096)
+        monkeypatch.setattr(Command, 'mmap_threshold', 0)
+        assert self.import_db(DATA_PATH, clear=True) == expected
+        assert len(set(opened)) == len(os.listdir(DATA_PATH)), (
+            'Проверьте, что большие несжатые файлы читаются через mmap.'
+        )
+
+    def test_03_export_gzip(self, tmp_path):
+        expected = self.import_db(DATA_PATH)
+        call_command('export_db', path=str(tmp_path), gzip=True,
+                     stdout=io.StringIO())
+        assert self.import_db(tmp_path, clear=True) == expected, (
+            'Проверьте, что `import_db` читает выгрузку `export_db --gzip`.'
+        )
+
+    def test_04_missing_column(self, tmp_path):
+        from django.core.management import CommandError
+
+        shutil.copytree(DATA_PATH, tmp_path / 'data')
+        path = tmp_path / 'data' / 'genre.csv'
+        path.write_text(
+            path.read_text(encoding='utf-8').replace('slug', 'code', 1),
+            encoding='utf-8',
+        )
+        out = io.StringIO()
+        with pytest.raises(CommandError):
+            call_command('import_db', path=str(tmp_path / 'data'),
+                         stdout=out)
+        assert "genres: 15 ошибочных строк" in out.getvalue()
+        assert "'slug'" in out.getvalue()
+
+    @pytest.mark.parametrize('options', (
+        {}, {'no_validate': True}, {'no_validate': True, 'incremental': True},
+    ))
+    def test_05_malformed_jsonl(self, tmp_path, options):
+        from django.core.management import CommandError
+
+        convert_data(tmp_path / 'data', '.jsonl', '')
+        with open(tmp_path / 'data' / 'genre.jsonl', 'a',
+                  encoding='utf-8') as file:
+            file.write('{"id": "99", "name": "Жанр"\n[1]\n')
+        out = io.StringIO()
+        with pytest.raises(CommandError):
+            call_command('import_db', path=str(tmp_path / 'data'),
+                         stdout=out, **options)
+        report = out.getvalue()
+        for expected in (
+            'genres: 2 ошибочных строк', 'строка 16', 'некорректный JSON',
+            'строка 17', 'должна быть объектом',
+        ):
+            assert expected in report, (
+                'Проверьте, что некорректные строки JSON Lines дают ошибки '
+                f'строк, а не прерывают импорт: нет «{expected}».\n{report}'
+            )
+
+
+def write_rss_data(directory, filename, rows):
+    '''Набор данных с `rows` отзывами: у каждого своя пара
+    (произведение, автор), на 100 отзывов — новый пользователь.'''
+    titles = 100
+    files = {
+        'category.csv': ['id,name,slug', '1,Книги,books'],
+        'genre.csv': ['id,name,slug', '1,Драма,drama'],
+        'genre_title.csv': ['id,title_id,genre_id'],
+        'comments.csv': ['id,review_id,text,author,pub_date'],
+        'titles.csv': ['id,name,year,category'] + [
+            f'{index},Произведение {index},2000,1'
+            for index in range(1, titles + 1)
+        ],
+        'users.csv': ['id,username,email,role,bio,first_name,last_name'] + [
+            f'{index},user{index},user{index}@yamdb.fake,user,,,'
+            for index in range(1, rows // titles + 2)
+        ],
+    }
+    for name, lines in files.items():
+        (directory / name).write_text(
+            '\n'.join(lines) + '\n', encoding='utf-8'
+        )
+    opener = OPENERS.get(os.path.splitext(filename)[1], open)
+    with opener(directory / filename, 'wt', encoding='utf-8',
+                newline='') as file:
+        if '.jsonl' not in filename:
+            file.write('id,title_id,text,author,score,pub_date\n')
+        for index in range(1, rows + 1):
+            row = {
+                'id': index, 'title_id': index % titles + 1,
+                'text': f'Текст отзыва номер {index}',
+                'author': index // titles + 1, 'score': 5,
+                'pub_date': '2019-09-24T21:08:21.567Z',
+            }
+            if '.jsonl' in filename:
+                file.write(json.dumps(row, ensure_ascii=False) + '\n')
+            else:
+                file.write(
+                    '{id},{title_id},"{text}",{author},{score},'
+                    '{pub_date}\n'.format(**row)
+                )
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'),
+                    reason='пик RSS читается из /proc/self/status')
+@pytest.mark.parametrize('filename', (
+    'review.csv', 'review.csv.gz', 'review.jsonl.xz',
+))
+def test_28_constant_rss(tmp_path, filename):
+    def peak_rss(rows):
+        directory = tmp_path / str(rows)
+        directory.mkdir()
+        write_rss_data(directory, filename, rows)
+        (directory / 'rss_settings.py').write_text(RSS_SETTINGS.format(
+            database=str(directory / 'db.sqlite3')
+        ))
+        result = subprocess.run(
+            # Несжатый файл читается через mmap.
+            [sys.executable, '-c', RSS_SCRIPT, str(directory), '0'],
+            cwd=MANAGE_PATH, capture_output=True, text=True, check=True,
+            env={
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': 'rss_settings',
+                'PYTHONPATH': os.pathsep.join((
+                    str(directory), MANAGE_PATH, os.path.dirname(MANAGE_PATH)
+                )),
+            },
+        )
+        count, rss = map(int, result.stdout.split())
+        assert count == rows
+        return rss
+
+    # Пик после предварительной проверки: чтение файлов и ключи
+    # уникальности. Дальше пик задаёт кэш страниц SQLite
+    # (IMPORT_PRAGMAS), он растёт с базой до cache_size. Id по
+    # возрастанию занимают 8 байт на строку, упакованный ключ
+    # уникальности в set — около 72, с запасом на распределитель
+    # памяти — до 150; словари ключей с номерами строк занимали
+    # около 175.
+    small = peak_rss(10_000)
+    large = peak_rss(200_000)
+    assert large - small < 28 * 1024, (
+        'Проверьте, что пиковая память импорта с проверкой файлов '
+        f'растёт медленно: {small} КБ для 10 тыс. строк, '
+        f'{large} КБ для 200 тыс.'
+    )
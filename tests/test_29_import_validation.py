@@ -0,0 +1,175 @@
+import io
+import shutil
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.test_13_import_db import DATA_PATH, rewrite_csv
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    path = tmp_path / 'data'
+    shutil.copytree(DATA_PATH, path)
+    return path
+
+
+@pytest.mark.django_db(transaction=True)
+class Test29ImportValidation:
+
+    def import_db(self, path, **options):
+        out = io.StringIO()
+        call_command('import_db', path=str(path), stdout=out, **options)
+        return out.getvalue()
+
+    def break_data(self, csv_dir):
+        def break_reviews(rows):
+            rows[0]['author'] = '999999'
+            rows[1]['score'] = '11'
+            rows[2]['pub_date'] = 'вчера'
+            rows[3]['title_id'] = rows[4]['title_id']
+            rows[3]['author'] = rows[4]['author']
+
+        def break_comments(rows):
+            rows[0]['review_id'] = '999999'
+
+        def break_genres(rows):
+            rows[1]['slug'] = rows[0]['slug']
+
+        def break_titles(rows):
+            rows[0]['year'] = '3000'
+            rows[1]['category'] = 'фильм'
+
+        rewrite_csv(csv_dir / 'review.csv', break_reviews)
+        rewrite_csv(csv_dir / 'comments.csv', break_comments)
+        rewrite_csv(csv_dir / 'genre.csv', break_genres)
+        rewrite_csv(csv_dir / 'titles.csv', break_titles)
+
+    def test_01_report_before_writes(self, csv_dir):
+        from reviews.models import Review, Title, User
+
+        self.break_data(csv_dir)
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as context:
+            with pytest.raises(CommandError):
+                call_command('import_db', path=str(csv_dir), stdout=out)
+        report = out.getvalue()
+        for expected in (
+            'reviews: 4 ошибочных строк',
+            'comments: 1 ошибочных строк',
+            'genres: 1 ошибочных строк',
+            'titles: 2 ошибочных строк',
+            'author: 999999: нет связанной записи в reviews_user',
+            'review_id: 999999: нет связанной записи в reviews_review',
+            'score:', 'вчера', 'year:', "некорректное число 'фильм'",
+            'title_id, author: значение уже есть в строке',
+            'slug: значение уже есть в строке 2',
+        ):
+            assert expected in report, (
+                'Проверьте, что предварительная проверка сообщает обо всех '
+                f'ошибках сразу: нет «{expected}» в отчёте.\n{report}'
+            )
+        assert not any(
+            query['sql'].startswith(WRITE_STATEMENTS)
+            for query in context.captured_queries
+        ), 'Проверьте, что при ошибках в файлах в базу ничего не пишется.'
+        assert not User.objects.exists() and not Title.objects.exists()
+        assert not Review.objects.exists()
+
+    def test_02_conflicts_with_database(self, csv_dir):
+        from reviews.models import Genre
+
+        Genre.objects.create(id=500, name='Драма', slug='drama')
+        with pytest.raises(CommandError):
+            self.import_db(csv_dir)
+        assert Genre.objects.count() == 1, (
+            'Проверьте, что слаг, занятый строкой базы с другим id, '
+            'находится до записи: иначе строка CSV молча пропускается.'
+        )
+        self.import_db(csv_dir, clear=True)
+        assert Genre.objects.filter(slug='drama').exclude(id=500).exists(), (
+            'Проверьте, что с `--clear` строки базы не мешают импорту.'
+        )
+
+    def test_03_references_to_database(self, csv_dir):
+        from reviews.models import Category
+
+        self.import_db(csv_dir)
+        rewrite_csv(csv_dir / 'category.csv', lambda rows: rows.clear())
+        report = self.import_db(csv_dir)
+        assert 'Файлы проверены' in report
+        assert Category.objects.exists(), (
+            'Проверьте, что ссылки на строки, уже загруженные в базу, '
+            'не считаются ошибкой.'
+        )
+
+    def test_04_no_validate(self, csv_dir):
+        self.break_data(csv_dir)
+        out = io.StringIO()
+        with pytest.raises(CommandError):
+            call_command('import_db', path=str(csv_dir), no_validate=True,
+                         stdout=out)
+        assert 'Файлы проверены' not in out.getvalue()
+        assert 'reviews_user' in out.getvalue(), (
+            'Проверьте, что без предварительной проверки ошибки по-прежнему '
+            'находятся при записи.'
+        )
+
+    def test_05_packed_key_collisions(self, csv_dir, monkeypatch):
+        from reviews.management.commands import _import_checks
+        from reviews.models import Genre
+
+        # Все ключи уникальности упаковываются в одно число: совпадения
+        # разбираются повторным чтением и сверкой со строками базы.
+        monkeypatch.setattr(_import_checks, 'pack_key', lambda key: 1)
+        Genre.objects.create(id=500, name='Драма', slug='drama')
+        out = io.StringIO()
+        with pytest.raises(CommandError):
+            call_command('import_db', path=str(csv_dir), stdout=out)
+        report = out.getvalue()
+        assert 'genres: 1 ошибочных строк' in report, report
+        assert 'slug: значение занято строкой базы id=500' in report
+        assert 'reviews:' not in report, (
+            'Проверьте, что совпадение упакованных ключей при разных '
+            f'значениях не считается ошибкой.\n{report}'
+        )
+
+        Genre.objects.all().delete()
+        assert 'Файлы проверены' in self.import_db(csv_dir)
+
+        self.break_data(csv_dir)
+        out = io.StringIO()
+        with pytest.raises(CommandError):
+            call_command('import_db', path=str(csv_dir), stdout=out)
+        report = out.getvalue()
+        for expected in (
+            'reviews: 4 ошибочных строк',
+            'genres: 1 ошибочных строк',
+            'title_id, author: значение уже есть в строке',
+            'slug: значение уже есть в строке 2',
+        ):
+            assert expected in report, (
+                'Проверьте, что настоящие повторы находятся и при '
+                f'совпадении упакованных ключей: нет «{expected}».\n{report}'
+            )
+
+    def test_06_short_row(self, csv_dir):
+        with open(csv_dir / 'genre.csv', 'a', encoding='utf-8') as file:
+            file.write('\n999,Короткая\n')
+        reports = []
+        for no_validate in (False, True):
+            out = io.StringIO()
+            with pytest.raises(CommandError):
+                call_command('import_db', path=str(csv_dir), stdout=out,
+                             no_validate=no_validate)
+            reports.append(out.getvalue())
+        for report in reports:
+            assert 'genres: 1 ошибочных строк' in report, (
+                'Проверьте, что строка короче заголовка даёт ошибку строки, '
+                f'а не прерывает проверку.\n{report}'
+            )
+            assert 'index out of range' in report
@@ -0,0 +1,204 @@
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests import test_13_import_db
+from tests.conftest import MANAGE_PATH
+from tests.test_13_import_db import DATA_PATH
+
+OTHER_DATABASE_SETTINGS = '''
+from api_yamdb.settings import *
+
+DATABASES = {{
+    'default': {{
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': {default!r},
+    }},
+    'other': {{
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': {other!r},
+    }},
+}}
+'''
+
+OTHER_DATABASE_SCRIPT = '''
+import io
+import json
+import sys
+
+import django
+
+django.setup()
+
+from django.core.management import call_command
+
+from reviews.models import Comment, ImportCheckpoint
+
+for alias in ('default', 'other'):
+    call_command('migrate', database=alias, verbosity=0)
+call_command(
+    'import_db', path=sys.argv[1], database='other', commit_every=5,
+    stdout=io.StringIO(),
+)
+print(json.dumps({
+    alias: [
+        ImportCheckpoint.objects.using(alias).count(),
+        Comment.objects.using(alias).count(),
+    ]
+    for alias in ('default', 'other')
+}))
+'''
+
+
+class Killed(BaseException):
+    '''Имитация гибели процесса: не перехватывается `except Exception`.'''
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    path = tmp_path / 'data'
+    shutil.copytree(DATA_PATH, path)
+    return path
+
+
+@pytest.mark.django_db(transaction=True)
+class Test30ResumableImport:
+
+    dump_tables = test_13_import_db.Test13ImportDb.dump_tables
+
+    def import_db(self, path, **options):
+        out = io.StringIO()
+        call_command('import_db', path=str(path), stdout=out,
+                     chunk_size=7, **options)
+        return out.getvalue()
+
+    def kill_after(self, monkeypatch, calls):
+        '''Прерывает импорт на `calls`-й вставке пачки или записи
+        контрольной точки.'''
+        from reviews.management.commands.import_db import Command
+        from reviews.models import ImportCheckpoint
+
+        counter = {'calls': 0}
+
+        def wrap(original):
+            def wrapper(*args, **kwargs):
+                counter['calls'] += 1
+                if counter['calls'] == calls:
+                    raise Killed
+                return original(*args, **kwargs)
+            return wrapper
+
+        monkeypatch.setattr(
+            Command, 'insert_chunk', wrap(Command.insert_chunk)
+        )
+        monkeypatch.setattr(
+            ImportCheckpoint, 'save', wrap(ImportCheckpoint.save)
+        )
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_01_resume_converges(self, csv_dir, monkeypatch, seed):
+        from reviews.models import ImportCheckpoint
+
+        self.import_db(csv_dir)
+        expected = self.dump_tables()
+        call_command('import_db', path=str(csv_dir), clear=True,
+                     stdout=io.StringIO())
+
+        generator = random.Random(seed)
+        options = {'clear': True, 'commit_every': 20}
+        for _ in range(50):
+            with monkeypatch.context() as patch:
+                self.kill_after(patch, generator.randint(1, 40))
+                try:
+                    self.import_db(csv_dir, **options)
+                except Killed:
+                    options = {'resume': True, 'commit_every': 20}
+                    continue
+            break
+        else:
+            pytest.fail('Импорт не завершился за 50 перезапусков.')
+
+        assert self.dump_tables() == expected, (
+            'Проверьте, что импорт, прерванный в случайных местах и '
+            'продолженный с `--resume`, даёт ту же базу, что и импорт '
+            'без прерываний.'
+        )
+        assert not ImportCheckpoint.objects.exists(), (
+            'Проверьте, что после завершения импорта контрольная точка '
+            'удаляется.'
+        )
+
+    def test_02_resume_skips_committed(self, csv_dir, monkeypatch):
+        from reviews.management.commands.import_db import Command
+        from reviews.models import Comment, ImportCheckpoint, Review
+
+        with monkeypatch.context() as patch:
+            original = Command.import_table_checkpointed
+
+            def die_on_comments(command, checkpoint, table, offset):
+                if table.name == 'comments':
+                    raise Killed
+                return original(command, checkpoint, table, offset)
+
+            patch.setattr(
+                Command, 'import_table_checkpointed', die_on_comments
+            )
+            with pytest.raises(Killed):
+                self.import_db(csv_dir, commit_every=10)
+        checkpoint = ImportCheckpoint.objects.get()
+        assert checkpoint.table == 'reviews'
+        assert checkpoint.offset == Review.objects.count()
+        assert not Comment.objects.exists()
+
+        with CaptureQueriesContext(connection) as context:
+            report = self.import_db(csv_dir, resume=True)
+        assert 'Продолжение с таблицы reviews' in report
+        assert not any(
+            query['sql'].startswith('INSERT')
+            and 'reviews_review' in query['sql']
+            for query in context.captured_queries
+        ), 'Проверьте, что `--resume` не загружает зафиксированные строки.'
+        assert Comment.objects.exists()
+
+    def test_03_resume_without_checkpoint(self, csv_dir):
+        with pytest.raises(CommandError):
+            self.import_db(csv_dir, resume=True)
+        with pytest.raises(CommandError):
+            self.import_db(csv_dir, resume=True, clear=True)
+        with pytest.raises(CommandError):
+            self.import_db(csv_dir, commit_every=10, workers=2)
+
+    def test_04_other_database(self, csv_dir, tmp_path):
+        (tmp_path / 'other_settings.py').write_text(
+            OTHER_DATABASE_SETTINGS.format(
+                default=str(tmp_path / 'default.sqlite3'),
+                other=str(tmp_path / 'other.sqlite3'),
+            )
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', OTHER_DATABASE_SCRIPT, str(csv_dir)],
+            cwd=MANAGE_PATH, capture_output=True, text=True, check=True,
+            env={
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': 'other_settings',
+                'PYTHONPATH': os.pathsep.join((
+                    str(tmp_path), MANAGE_PATH, os.path.dirname(MANAGE_PATH)
+                )),
+            },
+        )
+        counts = json.loads(result.stdout.splitlines()[-1])
+        assert counts['default'] == [0, 0]
+        assert counts['other'][0] == 0, (
+            'Проверьте, что после импорта с `--database` и '
+            '`--commit-every` контрольная точка удаляется из той же базы.'
+        )
+        assert counts['other'][1] > 0
@@ -0,0 +1,265 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from django.http import HttpResponse
+
+from tests.conftest import MANAGE_PATH
+
+REPO_PATH = os.path.dirname(MANAGE_PATH)
+
+SETTINGS = '''
+from api_yamdb.settings import *
+
+DATABASES = {{
+    'default': {{
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': {primary!r},
+    }},
+    'replica': {{
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': {replica!r},
+    }},
+    'other': {{
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': {other!r},
+    }},
+}}
+DATABASE_REPLICAS = ['replica']
+REPLICA_STICKY_SECONDS = 1
+'''
+
+SCRIPT = '''
+import json
+import time
+
+import django
+
+django.setup()
+
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import Category, Title, User
+
+# Реплика отстаёт: категории и произведения в базах различаются,
+# пользователи совпадают.
+for alias in ('default', 'replica'):
+    call_command('migrate', database=alias, verbosity=0)
+    admin = User.objects.db_manager(alias).create_user(
+        id=1, username='admin', email='admin@yamdb.fake', role='admin',
+    )
+    Category.objects.using(alias).create(name=alias, slug=alias)
+    Title.objects.using(alias).create(id=1, name=alias, year=2000)
+
+
+def slugs(client):
+    response = client.get('/api/v1/categories/')
+    return [item['slug'] for item in response.json()['results']]
+
+
+def title_name(client):
+    return client.get('/api/v1/titles/1/').json()['name']
+
+
+anonymous = APIClient()
+client = APIClient()
+client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}')
+result = {
+    'anonymous': slugs(anonymous),
+    'before_write': slugs(client),
+    'title_before_write': title_name(client),
+    'users_me': client.get('/api/v1/users/me/').status_code,
+}
+result['post'] = client.post(
+    '/api/v1/categories/', {'name': 'Новая', 'slug': 'new'}
+).status_code
+result.update({
+    'after_write': slugs(client),
+    'title_after_write': title_name(client),
+    'anonymous_after_write': slugs(anonymous),
+    'new_on_primary': Category.objects.using('default')
+    .filter(slug='new').exists(),
+    'new_on_replica': Category.objects.using('replica')
+    .filter(slug='new').exists(),
+})
+time.sleep(1.2)
+result['after_sticky_window'] = slugs(client)
+
+# База не из DATABASE_REPLICAS: объекты пишутся туда, откуда прочитаны.
+call_command('migrate', database='other', verbosity=0)
+Category.objects.using('other').create(name='other', slug='other')
+category = Category.objects.using('other').get()
+category.name = 'Другая'
+category.save()
+result['other_saved'] = Category.objects.using('other').get().name
+category.delete()
+result['other_left'] = Category.objects.using('other').count()
+print(json.dumps(result))
+'''
+
+
+def last_replica(replicas, request):
+    return replicas[-1]
+
+
+@pytest.fixture
+def replica_settings(settings):
+    settings.DATABASE_REPLICAS = ['replica-1', 'replica-2']
+    settings.DATABASE_REPLICA_SELECTOR = (
+        'tests.test_31_read_replicas.last_replica'
+    )
+    return settings
+
+
+class Test31ReadReplicas:
+
+    def route(self, request, view_func):
+        '''Псевдонимы баз чтения до и после записи в запросе.'''
+        from api.replicas import ReplicaMiddleware, ReplicaRouter
+        from reviews.models import Title
+
+        router = ReplicaRouter()
+        reads = []
+
+        def get_response(request):
+            middleware.process_view(request, view_func, (), {})
+            reads.append(router.db_for_read(Title))
+            if request.method == 'POST':
+                router.db_for_write(Title)
+                reads.append(router.db_for_read(Title))
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(get_response)
+        middleware(request)
+        return reads
+
+    def test_01_safe_methods_of_content_views(self, rf, replica_settings):
+        from api.views import (
+            CategoryViewSet, CommentViewSet, GenreViewSet, ReviewViewSet,
+            TitleViewSet, UserViewSet,
+        )
+
+        for view in (TitleViewSet, ReviewViewSet, CommentViewSet,
+                     GenreViewSet, CategoryViewSet):
+            view_func = view.as_view({'get': 'list'})
+            for method in ('get', 'head'):
+                assert self.route(
+                    getattr(rf, method)('/'), view_func
+                ) == ['replica-2'], (
+                    f'Проверьте, что {method.upper()} к {view.__name__} '
+                    'читает с реплики, выбранной '
+                    'DATABASE_REPLICA_SELECTOR.'
+                )
+        assert self.route(
+            rf.get('/'), UserViewSet.as_view({'get': 'list'})
+        ) == [None], 'Проверьте, что остальные вьюсеты читают из основной.'
+
+    def test_02_read_after_write(self, rf, replica_settings):
+        from api.views import TitleViewSet
+
+        view_func = TitleViewSet.as_view({'get': 'list', 'post': 'create'})
+        headers = {'HTTP_AUTHORIZATION': 'Bearer writer'}
+        assert self.route(rf.post('/', **headers), view_func) == [
+            None, None
+        ], 'Проверьте, что запросы на запись читают из основной базы.'
+        assert self.route(rf.get('/', **headers), view_func) == [None], (
+            'Проверьте, что после записи клиент некоторое время читает '
+            'из основной базы.'
+        )
+        assert self.route(
+            rf.get('/', HTTP_AUTHORIZATION='Bearer reader'), view_func
+        ) == ['replica-2'], (
+            'Проверьте, что запись одного клиента не переводит на основную '
+            'базу остальных.'
+        )
+
+    def test_03_no_replicas(self, rf, settings):
+        from api.views import TitleViewSet
+
+        settings.DATABASE_REPLICAS = []
+        assert self.route(
+            rf.get('/'), TitleViewSet.as_view({'get': 'list'})
+        ) == [None]
+
+    def test_04_sqlite_primary_and_replica(self, tmp_path):
+        (tmp_path / 'replica_settings.py').write_text(SETTINGS.format(
+            primary=str(tmp_path / 'primary.sqlite3'),
+            replica=str(tmp_path / 'replica.sqlite3'),
+            other=str(tmp_path / 'other.sqlite3'),
+        ))
+        result = subprocess.run(
+            [sys.executable, '-c', SCRIPT],
+            cwd=MANAGE_PATH, capture_output=True, text=True, check=True,
+            env={
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': 'replica_settings',
+                'PYTHONPATH': os.pathsep.join(
+                    (str(tmp_path), MANAGE_PATH, REPO_PATH)
+                ),
+            },
+        )
+        result = json.loads(result.stdout.splitlines()[-1])
+        assert result['anonymous'] == ['replica'], (
+            'Проверьте, что список категорий читается с реплики.'
+        )
+        assert result['before_write'] == ['replica']
+        assert result['title_before_write'] == 'replica'
+        assert result['users_me'] == 200
+        assert result['post'] == 201
+        assert result['new_on_primary'] and not result['new_on_replica'], (
+            'Проверьте, что запись идёт в основную базу.'
+        )
+        assert result['after_write'] == ['default', 'new'], (
+            'Проверьте, что после записи клиент читает из основной базы.'
+        )
+        assert result['title_after_write'] == 'default'
+        assert result['anonymous_after_write'] == ['replica']
+        assert result['after_sticky_window'] == ['replica'], (
+            'Проверьте, что по истечении REPLICA_STICKY_SECONDS клиент '
+            'снова читает с реплики.'
+        )
+        assert result['other_saved'] == 'Другая'
+        assert result['other_left'] == 0, (
+            'Проверьте, что объекты из других баз сохраняются и удаляются '
+            'в своей базе.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_replica_responses_expire(self, client, settings,
+                                         monkeypatch):
+        from api import cache
+        from api.replicas import REPLICA
+        from reviews.models import Title
+
+        Title.objects.create(name='Произведение', year=2000)
+        settings.API_CACHE_TIMEOUT = 300
+        settings.REPLICA_STICKY_SECONDS = 1
+        monkeypatch.setattr(cache, 'read_source', lambda: REPLICA)
+        assert client.get('/api/v1/titles/')['X-Cache'] == 'MISS'
+        assert client.get('/api/v1/titles/')['X-Cache'] == 'HIT'
+        time.sleep(1.2)
+        assert client.get('/api/v1/titles/')['X-Cache'] == 'MISS', (
+            'Проверьте, что ответ, прочитанный с реплики, хранится в кэше '
+            'не дольше REPLICA_STICKY_SECONDS: иначе отставшие данные '
+            'остаются под ключом новой версии на весь API_CACHE_TIMEOUT.'
+        )
+
+    def test_06_other_databases(self, rf, replica_settings):
+        from api.replicas import ReplicaRouter
+        from reviews.models import Genre, Title
+
+        router = ReplicaRouter()
+        title, genre = Title(name='Произведение', year=2000), Genre()
+        title._state.db = genre._state.db = 'other'
+        assert router.db_for_write(Title, instance=title) is None, (
+            'Проверьте, что вне запроса роутер не выбирает базу записи: '
+            'объект пишется в базу, из которой прочитан.'
+        )
+        assert router.allow_relation(title, genre) is None, (
+            'Проверьте, что роутер не решает за связи объектов других баз.'
+        )